@@ -5,39 +5,103 @@ FastAPI application with async background plan generation.
 import asyncio
 import time
 import os
+import secrets
+import uuid
 import stripe
 from contextlib import asynccontextmanager
-from typing import Dict, Any
-from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Header, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response, StreamingResponse
 
 from config.settings import settings
-from config.logging_config import logger, log_api_request, log_api_response, log_error
+from config.logging_config import logger, log_api_request, log_api_response, log_error, dropped_log_records
 from prompts.json_formats.meal_plan_format import MEAL_PLAN_JSON_FORMAT
 from prompts.json_formats.workout_plan_format import WORKOUT_PLAN_JSON_FORMAT
 from models.quiz import GeneratePlansRequest, Calculations, Macros
 from services.ai_service import ai_service
 from services.database import db_service
+from services.entitlements import entitlement_cache
+from services.invoice_cache import invoice_cache
+from services.stripe_bulk import BulkOperationRun, validate_operations
+from services.stripe_catalog import stripe_catalog, UNKNOWN_PLAN
+from services.stripe_events import stripe_event_log, handle_event
+from services.stripe_gateway import stripe_gateway
+from services.stripe_mirror import stripe_mirror, RESOURCES as MIRROR_RESOURCES, SUBSCRIPTION_STATUSES
 from utils.calculations import calculate_nutrition_profile
+from utils.projection import parse_fields
+from utils.saas_metrics import build_saas_metrics
+from utils.subscription_analytics import (
+    compute_saas_aggregates,
+    invoices_frame,
+    subscription_analytics,
+    subscriptions_frame,
+)
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry
+from utils.pagination import decode_cursor, encode_cursor
+from utils.serialization import dumps_bytes, loads
+from utils.tracing import TracingMiddleware, span, start_trace
+from utils import profiling
 from prompts.meal_plan import MEAL_PLAN_PROMPT
 from prompts.workout_plan import WORKOUT_PLAN_PROMPT
 
 
+# Share of SERVER_WARMUP_TIMEOUT_S each provider ping gets, so a slow provider
+# is reported as such before the overall limit cancels the whole warm-up
+WARMUP_PING_SHARE = 0.8
+
+
+async def _warm_up() -> None:
+    """Open DB and provider connections before the worker accepts traffic"""
+    start = time.perf_counter()
+    try:
+        warmed_pools, providers = await asyncio.wait_for(
+            asyncio.gather(
+                db_service.warm_up(settings.DB_POOL_WARM_SIZE),
+                ai_service.warm_up(settings.SERVER_WARMUP_TIMEOUT_S * WARMUP_PING_SHARE)
+            ),
+            settings.SERVER_WARMUP_TIMEOUT_S
+        )
+        logger.info(
+            f"Warm-up done in {(time.perf_counter() - start) * 1000:.0f} ms "
+            f"(db connections {warmed_pools}, providers {providers})"
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"Warm-up did not finish within {settings.SERVER_WARMUP_TIMEOUT_S}s; serving anyway")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager for startup and shutdown events"""
     logger.info(f"Starting {settings.APP_TITLE} v{settings.APP_VERSION}")
+    if settings.METRICS_WORKER_LABEL:
+        # Each worker process has its own registry; sum without (worker) to aggregate
+        registry.constant_labels["worker"] = str(os.getpid())
     
     try:
         await db_service.initialize()
     except Exception as e:
         logger.warning(f"Database initialization failed: {e}. Continuing without database.")
+
+    if db_service.pool and settings.STRIPE_MIRROR_ENABLED:
+        stripe_mirror.start_reconcile_loop(settings.STRIPE_MIRROR_RECONCILE_INTERVAL_S)
+    if db_service.pool:
+        stripe_event_log.start()
+        await entitlement_cache.start()
+        await invoice_cache.start()
+    if settings.STRIPE_SECRET_KEY and settings.STRIPE_CATALOG_PRELOAD:
+        stripe_catalog.start_preload()
+    if settings.SERVER_WARMUP:
+        await _warm_up()
     
     yield
     
     logger.info("Shutting down application...")
+    await stripe_event_log.stop()
+    await stripe_mirror.stop()
+    await stripe_catalog.stop()
     await db_service.close()
     logger.info("Application shutdown complete")
 
@@ -45,6 +109,7 @@ app = FastAPI(
     title=settings.APP_TITLE,
     description=settings.APP_DESCRIPTION,
     version=settings.APP_VERSION,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -55,6 +120,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 @app.get("/health")
 async def health_check() -> Dict[str, Any]:
@@ -69,7 +136,25 @@ async def health_check() -> Dict[str, Any]:
             "gemini": settings.has_gemini,
             "llama": settings.has_llama,
         },
-        "database": db_service.pool is not None
+        "database": db_service.pool is not None,
+        "read_replica": db_service.replica_pool is not None
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/health/database")
+async def database_health() -> Dict[str, Any]:
+    """Connection pool saturation stats (in use, idle, acquire wait)"""
+    return {
+        "database": db_service.pool is not None,
+        "pools": db_service.get_pool_stats(),
+        "entitlement_cache": entitlement_cache.get_stats(),
+        "invoice_cache": invoice_cache.get_stats()
     }
 
 
@@ -91,68 +176,72 @@ async def _generate_meal_plan_background(
             else "Not provided"
         )
         
-        prompt = MEAL_PLAN_PROMPT.format(
-            age=request.answers.age,
-            gender=request.answers.gender,
-            current_weight=display["weight"],
-            target_weight=display["targetWeight"],
-            height=display["height"],
-            main_goal=request.answers.mainGoal,
-            secondary_goals=request.answers.secondaryGoals,
-            time_frame=request.answers.timeFrame,
-            body_type=request.answers.bodyType,
-            body_fat=body_fat_str,
-            health_conditions=request.answers.healthConditions,
-            health_conditions_other=request.answers.healthConditions_other,
-            medications=request.answers.medications,
-            lifestyle=request.answers.lifestyle,
-            stress_level=request.answers.stressLevel,
-            sleep_quality=request.answers.sleepQuality,
-            motivation_level=request.answers.motivationLevel,
-            occupation_activity=request.answers.occupation_activity,
-            country=request.answers.country,
-            cooking_skill=request.answers.cookingSkill,
-            cooking_time=request.answers.cookingTime,
-            grocery_budget=request.answers.groceryBudget,
-            dietary_style=request.answers.dietaryStyle,
-            disliked_foods=request.answers.dislikedFoods,
-            foodAllergies=request.answers.foodAllergies,
-            meals_per_day=request.answers.mealsPerDay,
-            challenges=request.answers.challenges,
-            exercise_frequency=request.answers.exerciseFrequency,
-            preferred_exercise=request.answers.preferredExercise,
-            daily_calories=nutrition["goalCalories"],
-            protein=macros["protein_g"],
-            carbs=macros["carbs_g"],
-            fats=macros["fat_g"],
-            protein_pct_of_calories=macros["protein_pct_of_calories"],
-            carbs_pct_of_calories=macros["carbs_pct_of_calories"],
-            fat_pct_of_calories=macros["fat_pct_of_calories"],
-            MEAL_PLAN_JSON_FORMAT=MEAL_PLAN_JSON_FORMAT
-        )
+        with span("prompt"):
+            prompt = MEAL_PLAN_PROMPT.format(
+                age=request.answers.age,
+                gender=request.answers.gender,
+                current_weight=display["weight"],
+                target_weight=display["targetWeight"],
+                height=display["height"],
+                main_goal=request.answers.mainGoal,
+                secondary_goals=request.answers.secondaryGoals,
+                time_frame=request.answers.timeFrame,
+                body_type=request.answers.bodyType,
+                body_fat=body_fat_str,
+                health_conditions=request.answers.healthConditions,
+                health_conditions_other=request.answers.healthConditions_other,
+                medications=request.answers.medications,
+                lifestyle=request.answers.lifestyle,
+                stress_level=request.answers.stressLevel,
+                sleep_quality=request.answers.sleepQuality,
+                motivation_level=request.answers.motivationLevel,
+                occupation_activity=request.answers.occupation_activity,
+                country=request.answers.country,
+                cooking_skill=request.answers.cookingSkill,
+                cooking_time=request.answers.cookingTime,
+                grocery_budget=request.answers.groceryBudget,
+                dietary_style=request.answers.dietaryStyle,
+                disliked_foods=request.answers.dislikedFoods,
+                foodAllergies=request.answers.foodAllergies,
+                meals_per_day=request.answers.mealsPerDay,
+                challenges=request.answers.challenges,
+                exercise_frequency=request.answers.exerciseFrequency,
+                preferred_exercise=request.answers.preferredExercise,
+                daily_calories=nutrition["goalCalories"],
+                protein=macros["protein_g"],
+                carbs=macros["carbs_g"],
+                fats=macros["fat_g"],
+                protein_pct_of_calories=macros["protein_pct_of_calories"],
+                carbs_pct_of_calories=macros["carbs_pct_of_calories"],
+                fat_pct_of_calories=macros["fat_pct_of_calories"],
+                MEAL_PLAN_JSON_FORMAT=MEAL_PLAN_JSON_FORMAT
+            )
         
-        full_prompt = (
-            prompt + "\n\nDouble-check all values align with the user's "
-            "calorie/macro targets before finalizing the JSON output."
-        )
+            full_prompt = (
+                prompt + "\n\nDouble-check all values align with the user's "
+                "calorie/macro targets before finalizing the JSON output."
+            )
         
         meal_plan = await ai_service.generate_plan(
             full_prompt,
             request.ai_provider,
             request.model_name,
-            user_id
-        )
-        
-        await db_service.save_meal_plan(
             user_id,
-            quiz_result_id,
-            meal_plan,
-            nutrition["goalCalories"],
-            request.answers.preferredExercise,
-            request.answers.dietaryStyle
+            plan_type="meal"
         )
         
-        await db_service.update_plan_status(user_id, "meal", "completed")
+        with span("db.save"):
+            await db_service.save_meal_plan(
+                user_id,
+                quiz_result_id,
+                meal_plan,
+                nutrition["goalCalories"],
+                request.answers.preferredExercise,
+                request.answers.dietaryStyle
+            )
+        
+        with span("db.status"):
+            await db_service.update_plan_status(user_id, "meal", "completed")
         logger.info(f"Meal plan generated successfully for user {user_id}")
         
     except Exception as e:
@@ -176,58 +265,132 @@ async def _generate_workout_plan_background(
             else "Not provided"
         )
         
-        prompt = WORKOUT_PLAN_PROMPT.format(
-            age=request.answers.age,
-            gender=request.answers.gender,
-            current_weight=display["weight"],
-            target_weight=display["targetWeight"],
-            height=display["height"],
-            main_goal=request.answers.mainGoal,
-            secondary_goals=request.answers.secondaryGoals,
-            time_frame=request.answers.timeFrame,
-            body_type=request.answers.bodyType,
-            body_fat=body_fat_str,
-            health_conditions=request.answers.healthConditions,
-            health_conditions_other=request.answers.healthConditions_other,
-            injuries=request.answers.injuries,
-            medications=request.answers.medications,
-            lifestyle=request.answers.lifestyle,
-            stress_level=request.answers.stressLevel,
-            sleep_quality=request.answers.sleepQuality,
-            motivation_level=request.answers.motivationLevel,
-            occupation_activity=request.answers.occupation_activity,
-            country=request.answers.country,
-            challenges=request.answers.challenges,
-            exercise_frequency=request.answers.exerciseFrequency,
-            preferred_exercise=request.answers.preferredExercise,
-            training_environment=request.answers.trainingEnvironment,
-            equipment=request.answers.equipment,
-            WORKOUT_PLAN_JSON_FORMAT=WORKOUT_PLAN_JSON_FORMAT
-        )
+        with span("prompt"):
+            prompt = WORKOUT_PLAN_PROMPT.format(
+                age=request.answers.age,
+                gender=request.answers.gender,
+                current_weight=display["weight"],
+                target_weight=display["targetWeight"],
+                height=display["height"],
+                main_goal=request.answers.mainGoal,
+                secondary_goals=request.answers.secondaryGoals,
+                time_frame=request.answers.timeFrame,
+                body_type=request.answers.bodyType,
+                body_fat=body_fat_str,
+                health_conditions=request.answers.healthConditions,
+                health_conditions_other=request.answers.healthConditions_other,
+                injuries=request.answers.injuries,
+                medications=request.answers.medications,
+                lifestyle=request.answers.lifestyle,
+                stress_level=request.answers.stressLevel,
+                sleep_quality=request.answers.sleepQuality,
+                motivation_level=request.answers.motivationLevel,
+                occupation_activity=request.answers.occupation_activity,
+                country=request.answers.country,
+                challenges=request.answers.challenges,
+                exercise_frequency=request.answers.exerciseFrequency,
+                preferred_exercise=request.answers.preferredExercise,
+                training_environment=request.answers.trainingEnvironment,
+                equipment=request.answers.equipment,
+                WORKOUT_PLAN_JSON_FORMAT=WORKOUT_PLAN_JSON_FORMAT
+            )
         
         workout_plan = await ai_service.generate_plan(
             prompt,
             request.ai_provider,
             request.model_name,
-            user_id
-        )
-        
-        await db_service.save_workout_plan(
             user_id,
-            quiz_result_id,
-            workout_plan,
-            request.answers.preferredExercise,
-            request.answers.exerciseFrequency,
-            5
+            plan_type="workout"
         )
         
-        await db_service.update_plan_status(user_id, "workout", "completed")
+        with span("db.save"):
+            await db_service.save_workout_plan(
+                user_id,
+                quiz_result_id,
+                workout_plan,
+                request.answers.preferredExercise,
+                request.answers.exerciseFrequency,
+                5
+            )
+        
+        with span("db.status"):
+            await db_service.update_plan_status(user_id, "workout", "completed")
         logger.info(f"Workout plan generated successfully for user {user_id}")
         
     except Exception as e:
         log_error(e, "Background workout plan generation", user_id)
         await db_service.update_plan_status(user_id, "workout", "failed", str(e))
 
+# Background generation tasks by plan type (strong references keep them from being garbage collected)
+_generation_tasks: Dict[str, set] = {"meal": set(), "workout": set()}
+
+GENERATION_DURATION = registry.histogram(
+    "generation_duration_seconds",
+    "Background plan generation time, prompt to saved plan",
+    ("plan_type",),
+)
+registry.gauge(
+    "generation_tasks_in_flight",
+    "Background plan generations currently running",
+    ("plan_type",),
+    collect=lambda: {(plan_type,): len(tasks) for plan_type, tasks in _generation_tasks.items()},
+)
+registry.gauge(
+    "background_queue_depth",
+    "Work waiting in background queues",
+    ("queue",),
+    collect=lambda: {
+        ("status_batch_writer",): db_service.status_writer.pending if db_service.status_writer else 0,
+        ("stripe_gateway",): stripe_gateway.get_stats()["waiting"],
+        ("stripe_events",): stripe_event_log.in_flight,
+    },
+)
+registry.counter(
+    "log_records_dropped_total",
+    "Log records discarded because the async log queue was full",
+    collect=lambda: {(): dropped_log_records()},
+)
+
+
+def _start_generation(plan_type: str, coro: Any, **trace_attributes: Any) -> asyncio.Task:
+    """Run a background generation in its own trace, tracking it for /metrics"""
+    start = time.perf_counter()
+
+    async def traced() -> None:
+        with start_trace(f"generate.{plan_type}", **trace_attributes):
+            await coro
+
+    task = asyncio.create_task(traced())
+    tasks = _generation_tasks[plan_type]
+    tasks.add(task)
+
+    def done(finished: asyncio.Task) -> None:
+        tasks.discard(finished)
+        GENERATION_DURATION.observe(time.perf_counter() - start, plan_type)
+
+    task.add_done_callback(done)
+    return task
+
+async def _authorize_generation(user_id: str) -> None:
+    """Reject a generation request the user's plan does not cover (cached, no DB round trip on a hit)"""
+    if not settings.ENTITLEMENTS_ENFORCED or not db_service.pool:
+        return
+
+    try:
+        entitlement = await entitlement_cache.get(user_id)
+    except Exception as e:
+        # Fail open: the quiz_results quota trigger still guards new quizzes
+        log_error(e, "Entitlement lookup", user_id)
+        return
+
+    if entitlement is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not entitlement.allows_generation:
+        raise HTTPException(
+            status_code=403,
+            detail={"error": "generation_quota_exceeded", **entitlement.to_dict()}
+        )
+
 @app.post("/generate-plans")
 async def generate_plans(
     request: GeneratePlansRequest,
@@ -245,31 +408,35 @@ async def generate_plans(
         request.ai_provider,
         request.model_name
     )
+    await _authorize_generation(request.user_id)
     
     try:
         # Calculate nutrition profile immediately
-        calc_result = calculate_nutrition_profile(request.answers)
-        calculations = Calculations(
-            bmi=calc_result["bmi"],
-            bmr=calc_result["bmr"],
-            tdee=calc_result["tdee"],
-            bodyFatPercentage=calc_result["bodyFatPercentage"],
-            macros=Macros(**calc_result["macros"]),
-            goalCalories=calc_result["goalCalories"],
-            goalWeight=calc_result["targetWeight"] or 0.0,
-        )
+        with span("calculations"):
+            calc_result = calculate_nutrition_profile(request.answers)
+            calculations = Calculations(
+                bmi=calc_result["bmi"],
+                bmr=calc_result["bmr"],
+                tdee=calc_result["tdee"],
+                bodyFatPercentage=calc_result["bodyFatPercentage"],
+                macros=Macros(**calc_result["macros"]),
+                goalCalories=calc_result["goalCalories"],
+                goalWeight=calc_result["targetWeight"] or 0.0,
+            )
         
         # Update quiz results with calculations FIRST
-        await db_service.update_quiz_calculations(
-            request.quiz_result_id,
-            calculations.model_dump()
-        )
+        with span("db.quiz_calculations"):
+            await db_service.update_quiz_calculations(
+                request.quiz_result_id,
+                calculations.model_dump()
+            )
         
         # Initialize plan status as generating
-        await db_service.initialize_plan_status(
-            request.user_id,
-            request.quiz_result_id
-        )
+        with span("db.plan_status_init"):
+            await db_service.initialize_plan_status(
+                request.user_id,
+                request.quiz_result_id
+            )
         
         # Schedule background tasks for AI generation
         # background_tasks.add_task(
@@ -289,11 +456,21 @@ async def generate_plans(
         # )
 
         # 3️⃣ Fire both AI generation tasks concurrently
-        asyncio.create_task(
-            _generate_meal_plan_background(request.user_id, request.quiz_result_id, request, calc_result)
+        trace_attributes = {
+            "user_id": request.user_id,
+            "quiz_result_id": request.quiz_result_id,
+            "provider": request.ai_provider,
+            "model": request.model_name,
+        }
+        _start_generation(
+            "meal",
+            _generate_meal_plan_background(request.user_id, request.quiz_result_id, request, calc_result),
+            **trace_attributes
         )
-        asyncio.create_task(
-            _generate_workout_plan_background(request.user_id, request.quiz_result_id, request, calc_result)
+        _start_generation(
+            "workout",
+            _generate_workout_plan_background(request.user_id, request.quiz_result_id, request, calc_result),
+            **trace_attributes
         )
         
         duration_ms = (time.time() - start_time) * 1000
@@ -337,6 +514,100 @@ async def get_plan_status(user_id: str) -> Dict[str, Any]:
         log_error(e, "Plan status check", user_id)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/plans/{user_id}/{plan_type}")
+async def get_plan(user_id: str, plan_type: str, fields: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get the user's active meal or workout plan.
+
+    fields: Optional comma-separated dotted paths to return instead of the whole
+    plan, e.g. ``meals.meal_name,meals.total_calories,daily_totals``.
+    Arrays are traversed implicitly.
+    """
+    if plan_type not in ("meal", "workout"):
+        raise HTTPException(status_code=404, detail="Plan type must be 'meal' or 'workout'")
+
+    try:
+        projection = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        plan = await db_service.get_active_plan(user_id, plan_type, projection)
+
+        if not plan:
+            raise HTTPException(status_code=404, detail=f"No active {plan_type} plan found for user")
+
+        return {
+            "success": True,
+            "plan_type": plan_type,
+            "plan_id": str(plan["id"]),
+            "quiz_result_id": str(plan["quiz_result_id"]) if plan["quiz_result_id"] else None,
+            "status": plan["status"],
+            "generated_at": plan["generated_at"].isoformat() if plan["generated_at"] else None,
+            "version": plan["version"],
+            "content_hash": plan["content_hash"],
+            "plan": plan["plan_data"]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, f"Get {plan_type} plan", user_id)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/plans/{user_id}/{plan_type}/versions")
+async def get_plan_versions(user_id: str, plan_type: str) -> Dict[str, Any]:
+    """List stored versions of the user's active plan, newest first"""
+    if plan_type not in ("meal", "workout"):
+        raise HTTPException(status_code=404, detail="Plan type must be 'meal' or 'workout'")
+
+    try:
+        versions = await db_service.get_plan_versions(user_id, plan_type)
+        return {
+            "success": True,
+            "plan_type": plan_type,
+            "versions": [
+                {
+                    "version": v["version"],
+                    "content_hash": v["content_hash"],
+                    "size_bytes": v["size_bytes"],
+                    "created_at": v["created_at"].isoformat() if v["created_at"] else None,
+                    "is_current": v["is_current"],
+                }
+                for v in versions
+            ]
+        }
+    except Exception as e:
+        log_error(e, f"List {plan_type} plan versions", user_id)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/plans/{user_id}/{plan_type}/rollback")
+async def rollback_plan(user_id: str, plan_type: str, request: Request) -> Dict[str, Any]:
+    """Restore an earlier plan version (recorded as a new version)"""
+    if plan_type not in ("meal", "workout"):
+        raise HTTPException(status_code=404, detail="Plan type must be 'meal' or 'workout'")
+
+    try:
+        data = await request.json()
+        version = int(data["version"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Body must include an integer 'version'")
+
+    try:
+        new_version = await db_service.rollback_plan(user_id, plan_type, version)
+        if new_version is None:
+            raise HTTPException(status_code=404, detail=f"Version {version} not found for active {plan_type} plan")
+
+        return {"success": True, "plan_type": plan_type, "restored_version": version, "version": new_version}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(e, f"Rollback {plan_type} plan", user_id)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # STRIPE
 @app.post("/api/stripe/create-checkout-session")
 async def create_checkout_session(request: Request):
@@ -350,7 +621,9 @@ async def create_checkout_session(request: Request):
         # You may hardcode your pro plan price_id or product for now:
         price_id = os.getenv("STRIPE_PRICE_ID")
 
-        checkout_session = stripe.checkout.Session.create(
+        checkout_session = await stripe_gateway.mutate(
+            stripe.checkout.Session.create,
+            idempotency_key=request.headers.get("Idempotency-Key"),
             payment_method_types=["card"],
             mode="subscription",
             line_items=[{"price": price_id, "quantity": 1}],
@@ -386,242 +659,175 @@ async def stripe_webhook(request: Request, stripe_signature: str = Header(None))
         return {"error": str(e)}
 
     logger.info(f"Received Stripe webhook: {event['type']}")
-    # Subscription created or upgraded
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        user_id = session["client_reference_id"]
-        customer_id = session["customer"]
-        # Update user profile plan and stripe_customer_id
-        await db_service.set_user_plan(user_id, "pro", customer_id)
-    elif event["type"] == "customer.subscription.deleted":
-        # Downgrade user to free
-        user_id = event["data"]["object"]["client_reference_id"] or await db_service.lookup_user_by_stripe(event["data"]["object"]["customer"])
-        await db_service.set_user_plan(user_id, "free")
-    # Add more Stripe event types as needed
+    stripe_catalog.apply_event(event)
 
-    return {"status": "success"}
+    if not db_service.pool:
+        # No event log without a database: apply inline, non-2xx makes Stripe redeliver
+        try:
+            await handle_event(event)
+        except Exception as e:
+            log_error(e, f"Stripe webhook {event['type']}")
+            raise HTTPException(status_code=500, detail="Failed to process event")
+        return {"status": "success"}
+
+    # Acknowledge once the event is durable; the consumer applies it in order per customer
+    try:
+        recorded = await stripe_event_log.record(event)
+    except Exception as e:
+        log_error(e, f"Stripe event log insert for {event['type']}")
+        raise HTTPException(status_code=500, detail="Failed to record event")
+
+    return {"status": "accepted", "duplicate": not recorded}
 
 
 # ANALYTICS ENDPOINTS
-@app.get("/api/admin/saas-metrics")
-async def get_saas_metrics():
+def _subscription_records_from_stripe(include_invoices: bool = True) -> Tuple[list, list]:
+    """
+    Fetch every subscription (and invoice) from the Stripe API as analytics records.
+
+    Plan names are left empty; callers resolve price_id through the catalog cache.
+    """
     subs_iterator = stripe.Subscription.list(
         status="all",
         limit=100,
         expand=["data.items.data.price", "data.latest_invoice.customer"]
     ).auto_paging_iter()
 
-    invoices_iterator = stripe.Invoice.list(limit=100).auto_paging_iter()
+    subscriptions = []
+    for s in subs_iterator:
+        items_list = dict(s.items())['items'].data
+        customer = s.latest_invoice.customer if s.latest_invoice and s.latest_invoice.customer else None
+        subscriptions.append({
+            "subscription_id": s.id,
+            "status": s.status,
+            "created": s.created,
+            "canceled_at": s.canceled_at,
+            "monthly_amount": sum(
+                item.price.unit_amount or 0 for item in items_list
+                if item.price.recurring and item.price.recurring.interval == "month"
+            ),
+            "price_id": items_list[0].price.id if items_list else None,
+            "plan": None,
+            "customer_email": getattr(customer, "email", None) or "",
+        })
 
-    product_cache = {}
+    invoices = []
+    if include_invoices:
+        invoices = [(i.created, i.amount_paid) for i in stripe.Invoice.list(limit=100).auto_paging_iter()]
 
-    def get_product_name(price_id):
-        if price_id not in product_cache:
-            try:
-                price_with_product = stripe.Price.retrieve(price_id, expand=["product"])
-                product_cache[price_id] = price_with_product.product.name
-            except stripe.error.StripeError:
-                product_cache[price_id] = "Unknown Plan"
-        return product_cache[price_id]
+    return subscriptions, invoices
 
-    all_subs = list(subs_iterator)
-    all_invoices = list(invoices_iterator)
 
-    active_subs = [s for s in all_subs if s.status in ("active", "trialing", "past_due")]
-    canceled_subs = [s for s in all_subs if s.status == "canceled"]
+def _saas_aggregates_from_stripe(now: datetime) -> Dict[str, Any]:
+    """Compute SaaS metric inputs by paging through the Stripe API"""
+    subscriptions, invoices = _subscription_records_from_stripe()
+    return compute_saas_aggregates(subscriptions_frame(subscriptions), invoices_frame(invoices), now)
 
-    # --- MRR
-    mrr = sum(
-        item.price.unit_amount for s in active_subs for item in dict(s.items())['items'].data
-        if item.price.recurring and item.price.recurring.interval == "month"
-    ) / 100
 
-    # --- Earnings
-    all_earnings = sum(i.amount_paid for i in all_invoices) / 100
+@app.get("/api/admin/saas-metrics")
+async def get_saas_metrics():
+    """SaaS metrics, served from the local Stripe mirror once it is backfilled"""
     now = datetime.now(timezone.utc)
-    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    last_30 = now - timedelta(days=30)
-
-    earnings_this_month = sum(
-        i.amount_paid for i in all_invoices if datetime.fromtimestamp(i.created, tz=timezone.utc) >= start_of_month
-    ) / 100
-
-    earnings_last_30 = sum(
-        i.amount_paid for i in all_invoices if datetime.fromtimestamp(i.created, tz=timezone.utc) >= last_30
-    ) / 100
-
-    # --- Subscribers by month
-    by_month = {}
-    for s in all_subs:
-        dt = datetime.fromtimestamp(s.created, tz=timezone.utc)
-        label = dt.strftime("%Y-%m")
-        by_month[label] = by_month.get(label, 0) + 1
-
-    # --- New / churned
-    new_this_month = sum(
-        1 for s in all_subs
-        if datetime.fromtimestamp(s.created, tz=timezone.utc) >= start_of_month and s.status in ("active", "trialing")
-    )
-    new_last_30 = sum(
-        1 for s in all_subs
-        if datetime.fromtimestamp(s.created, tz=timezone.utc) >= last_30 and s.status in ("active", "trialing")
-    )
-    churned_this_month = sum(
-        1 for s in all_subs
-        if s.canceled_at and datetime.fromtimestamp(s.canceled_at, tz=timezone.utc) >= start_of_month
-    )
-
-    # --- Conversion rates
-    total_created = len(all_subs)
-    created_last_30 = sum(1 for s in all_subs if datetime.fromtimestamp(s.created, tz=timezone.utc) >= last_30)
-
-    conversion_rate = (new_this_month / total_created * 100) if total_created > 0 else 0
-    conversion_rate_last_30 = (new_last_30 / created_last_30 * 100) if created_last_30 > 0 else 0
-
-    # --- Recent canceled
-    recent_canceled = []
-    for s in canceled_subs[:20]:
-        items_list = dict(s.items())['items'].data
-        plan_name = get_product_name(items_list[0].price.id) if items_list else "Unknown Plan"
-        customer_email = (
-            s.latest_invoice.customer.email
-            if s.latest_invoice and s.latest_invoice.customer and s.latest_invoice.customer.email
-            else ""
-        )
-        recent_canceled.append({
-            "customer_email": customer_email,
-            "canceled_at": s.canceled_at,
-            "plan": plan_name,
-        })
 
-    # --- Compute LTV for current period (already done)
-    if len(active_subs) > 0:
-        arpu = mrr / len(active_subs)
+    if await stripe_mirror.is_ready():
+        agg = await stripe_mirror.get_saas_aggregates(now)
     else:
-        arpu = 0
+        agg = await stripe_gateway.call(_saas_aggregates_from_stripe, now, timeout=settings.STRIPE_LIST_TIMEOUT_S)
+        names = await stripe_catalog.product_names(c["price_id"] for c in agg["recent_canceled"])
+        for canceled in agg["recent_canceled"]:
+            canceled["plan"] = names.get(canceled.pop("price_id"), UNKNOWN_PLAN)
 
-    if (len(active_subs) + churned_this_month) > 0:
-        churn_rate = churned_this_month / (len(active_subs) + churned_this_month)
-    else:
-        churn_rate = 0
+    return build_saas_metrics(agg)
 
-    if churn_rate > 0:
-        ltv = arpu / churn_rate
-    else:
-        ltv = arpu * 12  # fallback assumption
-
-    # --- Estimate previous month's LTV
-    one_month_ago = now - timedelta(days=30)
-    subs_last_month = [s for s in all_subs if datetime.fromtimestamp(s.created, tz=timezone.utc) < one_month_ago]
-    active_last_month = [s for s in subs_last_month if s.status in ("active", "trialing", "past_due")]
-    churned_last_month = [
-        s for s in subs_last_month
-        if s.canceled_at and datetime.fromtimestamp(s.canceled_at, tz=timezone.utc) >= (one_month_ago - timedelta(days=30))
-    ]
-
-    mrr_last_month = sum(
-        item.price.unit_amount for s in active_last_month for item in dict(s.items())['items'].data
-        if item.price.recurring and item.price.recurring.interval == "month"
-    ) / 100
-
-    if len(active_last_month) > 0:
-        arpu_last_month = mrr_last_month / len(active_last_month)
-    else:
-        arpu_last_month = 0
 
-    if (len(active_last_month) + len(churned_last_month)) > 0:
-        churn_rate_last_month = len(churned_last_month) / (len(active_last_month) + len(churned_last_month))
-    else:
-        churn_rate_last_month = 0
+@app.get("/api/admin/subscription-analytics")
+async def get_subscription_analytics(months: int = Query(12, ge=1, le=60)) -> Dict[str, Any]:
+    """
+    Cohort retention, revenue by plan and churn curve.
 
-    if churn_rate_last_month > 0:
-        ltv_last_month = arpu_last_month / churn_rate_last_month
-    else:
-        ltv_last_month = arpu_last_month * 12
+    Args:
+        months: Number of monthly cohorts / churn months to report
+    """
+    now = datetime.now(timezone.utc)
 
-    # --- LTV Growth
-    if ltv_last_month > 0:
-        ltv_growth_percent = ((ltv - ltv_last_month) / ltv_last_month) * 100
+    if await stripe_mirror.is_ready():
+        records = await stripe_mirror.subscription_records()
     else:
-        ltv_growth_percent = 0
+        records, _ = await stripe_gateway.call(
+            _subscription_records_from_stripe,
+            False,
+            timeout=settings.STRIPE_LIST_TIMEOUT_S
+        )
+        names = await stripe_catalog.product_names(r["price_id"] for r in records)
+        for record in records:
+            record["plan"] = names.get(record["price_id"], UNKNOWN_PLAN)
 
+    # pandas work is CPU-bound; keep it off the event loop
+    return await asyncio.to_thread(
+        lambda: subscription_analytics(subscriptions_frame(records), now, months)
+    )
 
-    return {
-        "mrr": mrr,
-        "totalEarnings": all_earnings,
-        "earningsThisMonth": earnings_this_month,
-        "earningsLast30Days": earnings_last_30,
-        "activeSubscribers": len(active_subs),
-        "totalSubscribers": len(all_subs),
-        "newSubsThisMonth": new_this_month,
-        "churnedThisMonth": churned_this_month,
-        "subscribersByMonth": by_month,
-        "recentCanceled": recent_canceled,
-        "conversionRate": conversion_rate,
-        "conversionRateLast30Days": conversion_rate_last_30,
-        "arpu": round(arpu, 2),
-        "churnRate": round(churn_rate * 100, 2),
-        "ltv": round(ltv, 2),
-        "ltvGrowth": round(ltv_growth_percent, 2),
-    }
 
-@app.get("/api/admin/subscribers")
-async def get_all_subscribers(
-    status: str = None,
-    plan_id: str = None,
-    created_after: int = None,    # unix timestamp
-    created_before: int = None    # unix timestamp
-):
-    """
-    Returns all subscribers, with full plan/item info and filtering:
-    - status: Filter subscriptions by status
-    - plan_id: Only users on a given Stripe price_id
-    - created_after, created_before: Filter by creation time (unix timestamp)
+@app.get("/api/admin/saas-metrics/series")
+async def get_saas_metrics_series(start: date, end: Optional[date] = None) -> Dict[str, Any]:
     """
-    subs_iterator = stripe.Subscription.list(
-        status="all",
-        limit=100,
-        expand=["data.customer", "data.items.data.price"]
-    ).auto_paging_iter()
+    Daily SaaS metrics (MRR, active, new, churned, earnings) for a date range.
 
-    product_cache = {}
-    def get_product_name(price_id):
-        if price_id not in product_cache:
-            try:
-                # Retrieve the price and expand the product in a separate call
-                price_with_product = stripe.Price.retrieve(price_id, expand=["product"])
-                product_cache[price_id] = price_with_product.product.name
-            except stripe.error.StripeError as e:
-                print(f"Error retrieving product for price {price_id}: {e}")
-                product_cache[price_id] = "Unknown Plan"
-        return product_cache[price_id]
+    Args:
+        start: First day (YYYY-MM-DD, UTC)
+        end: Last day, inclusive (defaults to today)
+    """
+    end = end or datetime.now(timezone.utc).date()
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if (end - start).days > settings.SAAS_METRICS_MAX_SERIES_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range exceeds {settings.SAAS_METRICS_MAX_SERIES_DAYS} days"
+        )
+    if not await stripe_mirror.is_ready():
+        raise HTTPException(status_code=503, detail="Stripe mirror is not synced yet")
+
+    series = await stripe_mirror.get_saas_series(start, end)
+    return {"start": start.isoformat(), "end": end.isoformat(), "series": series}
+
+
+def _subscribers_page_from_stripe(
+    status: Optional[str],
+    plan_id: Optional[str],
+    created_after: Optional[int],
+    created_before: Optional[int],
+    starting_after: Optional[str],
+    limit: int
+) -> Tuple[list, bool]:
+    """Fetch one page of subscribers from the Stripe API, with filters applied by Stripe"""
+    params: Dict[str, Any] = {
+        "status": status or "all",
+        "limit": min(limit, 100),
+        "expand": ["data.customer", "data.items.data.price"],
+    }
+    if plan_id:
+        params["price"] = plan_id
+    created = {}
+    if created_after:
+        created["gte"] = int(created_after)
+    if created_before:
+        created["lte"] = int(created_before)
+    if created:
+        params["created"] = created
+    if starting_after:
+        params["starting_after"] = starting_after
+
+    page = stripe.Subscription.list(**params)
 
     user_data = []
 
-    for s in subs_iterator:
-        # --- filters ---
-        if status and getattr(s, "status", None) != status:
-            continue
-
+    for s in page.data:
         try:
             items_list = dict(s.items())["items"].data
         except Exception:
             items_list = []
 
-        # --- Plan/date filtering ---
-        if plan_id or created_after or created_before:
-            match = False
-            for item in items_list:
-                price = getattr(item, "price", None)
-                if plan_id and price and getattr(price, "id", None) == plan_id:
-                    match = True
-                if created_after and getattr(s, "created", 0) < int(created_after):
-                    continue
-                if created_before and getattr(s, "created", 0) > int(created_before):
-                    continue
-            if plan_id and not match:
-                continue
-
         # --- Customer email ---
         customer_email = ""
         if hasattr(s.customer, "email"):
@@ -637,8 +843,8 @@ async def get_all_subscribers(
                 continue
             plans.append({
                 "price_id": getattr(price, "id", None),
-                "product_name": get_product_name(getattr(price, "id", None)),
-                "product_id": getattr(price.product, "id", None) if hasattr(price, "product") else None,
+                "product_name": None,  # filled from the catalog cache
+                "product_id": getattr(price.product, "id", price.product) if hasattr(price, "product") else None,
                 "nickname": getattr(price, "nickname", None),
                 "amount": getattr(price, "unit_amount", None),
                 "currency": getattr(price, "currency", None),
@@ -662,7 +868,256 @@ async def get_all_subscribers(
 
         user_data.append(user_entry)
 
-    return {"subscribers": user_data}
+    return user_data, bool(page.has_more)
+
+
+async def _iter_subscribers(
+    status: Optional[str],
+    plan_id: Optional[str],
+    created_after: Optional[int],
+    created_before: Optional[int],
+    cursor: Optional[str],
+    page_size: int
+) -> AsyncIterator[Tuple[Dict[str, Any], bool]]:
+    """
+    Yield (subscriber, more) newest first, one page at a time.
+
+    `more` is False only for the very last subscriber matching the filters.
+    Pages come from the local mirror once it is backfilled, otherwise from the
+    Stripe API. Either way only one page is held in memory.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    use_mirror = await stripe_mirror.is_ready()
+
+    while True:
+        if use_mirror:
+            entries, has_more = await stripe_mirror.list_subscribers(
+                status, plan_id, created_after, created_before, after=after, limit=page_size
+            )
+        else:
+            entries, has_more = await stripe_gateway.call(
+                _subscribers_page_from_stripe,
+                status,
+                plan_id,
+                created_after,
+                created_before,
+                after[1] if after else None,
+                page_size
+            )
+            plans = [plan for entry in entries for plan in entry["plans"]]
+            names = await stripe_catalog.product_names(plan["price_id"] for plan in plans)
+            for plan in plans:
+                plan["product_name"] = names.get(plan["price_id"], UNKNOWN_PLAN)
+
+        for i, entry in enumerate(entries):
+            yield entry, has_more or i < len(entries) - 1
+
+        if not has_more or not entries:
+            break
+        after = (entries[-1]["created"], entries[-1]["subscription_id"])
+
+
+@app.get("/api/admin/subscribers")
+async def get_all_subscribers(
+    status: str = None,
+    plan_id: str = None,
+    created_after: int = None,    # unix timestamp
+    created_before: int = None,   # unix timestamp
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Returns subscribers newest first, with full plan/item info and filtering:
+    - status: Filter subscriptions by status
+    - plan_id: Only users on a given Stripe price_id
+    - created_after, created_before: Filter by creation time (unix timestamp)
+    - limit, cursor: Page size and the next_cursor of the previous page
+    - format=ndjson: Stream one subscriber per line instead of a JSON document
+
+    Filters run in Postgres (local mirror) or in the Stripe list API.
+    """
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if status == "all":
+        status = None
+    elif status is not None and status not in SUBSCRIPTION_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"status must be one of: all, {', '.join(SUBSCRIPTION_STATUSES)}"
+        )
+
+    page_size = min(limit or settings.SUBSCRIBERS_PAGE_SIZE, settings.SUBSCRIBERS_PAGE_SIZE)
+    subscribers = _iter_subscribers(status, plan_id, created_after, created_before, cursor, page_size)
+
+    if format == "ndjson":
+        async def stream():
+            count = 0
+            async for entry, _ in subscribers:
+                yield dumps_bytes(entry) + b"\n"
+                count += 1
+                if limit and count >= limit:
+                    break
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    user_data = []
+    more = False
+    async for entry, more in subscribers:
+        user_data.append(entry)
+        if limit and len(user_data) >= limit:
+            break
+
+    if limit is None:
+        return {"subscribers": user_data}
+
+    next_cursor = None
+    if user_data and more:
+        last = user_data[-1]
+        next_cursor = encode_cursor(last["created"], last["subscription_id"])
+    return {"subscribers": user_data, "next_cursor": next_cursor}
+
+
+@app.post("/api/admin/stripe/mirror/sync")
+async def sync_stripe_mirror(request: Request) -> Dict[str, Any]:
+    """
+    Start a background backfill/reconcile of the Stripe mirror.
+
+    Body (optional): {"resources": ["subscriptions", ...], "restart": false}
+    """
+    if not db_service.pool:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    body = await request.body()
+    try:
+        data = loads(body) if body else {}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+
+    resources = data.get("resources") or list(MIRROR_RESOURCES)
+    if not isinstance(resources, list):
+        raise HTTPException(status_code=400, detail="'resources' must be a list")
+    unknown = [r for r in resources if r not in MIRROR_RESOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown resources: {', '.join(map(str, unknown))}")
+
+    started = stripe_mirror.start_sync(resources, restart=bool(data.get("restart")))
+    return {"started": started, "resources": resources}
+
+
+@app.get("/api/admin/stripe/mirror/status")
+async def stripe_mirror_status() -> Dict[str, Any]:
+    """Backfill progress and readiness of the Stripe mirror"""
+    if not db_service.pool:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    return {
+        "ready": await stripe_mirror.is_ready(),
+        "resources": await stripe_mirror.get_sync_state(),
+    }
+
+
+@app.get("/api/admin/stripe/events/status")
+async def stripe_events_status() -> Dict[str, Any]:
+    """Webhook event queue depth and consumer counters"""
+    if not db_service.pool:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    return await stripe_event_log.get_stats()
+
+async def _require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Guard for diagnostic and bulk billing endpoints: X-Admin-Token must match ADMIN_API_TOKEN (unset = disabled)"""
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+# One CPU capture at a time: profilers and samplers would skew each other
+_profile_lock = asyncio.Lock()
+
+
+@app.get("/api/admin/debug/profile", dependencies=[Depends(_require_admin)], include_in_schema=False)
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    mode: str = Query("sample", pattern="^(sample|cprofile)$"),
+    all_threads: bool = False,
+    format: str = Query("text", pattern="^(text|prof)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    limit: int = Query(50, ge=1, le=1000)
+) -> Response:
+    """
+    Profile this worker for a few seconds while it keeps serving traffic.
+
+    mode=sample returns folded stacks (speedscope, flamegraph.pl); mode=cprofile
+    returns a pstats report, or the raw .prof file with format=prof.
+    """
+    if seconds > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {settings.PROFILE_MAX_SECONDS}")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+
+    async with _profile_lock:
+        logger.warning(f"Capturing {mode} profile for {seconds}s")
+        if mode == "sample":
+            return PlainTextResponse(await profiling.sample_event_loop(seconds, all_threads))
+
+        profiler = await profiling.cprofile_event_loop(seconds)
+        if format == "prof":
+            return Response(
+                profiling.profile_stats_dump(profiler),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="ml_service-{os.getpid()}.prof"'}
+            )
+        return PlainTextResponse(profiling.profile_stats_text(profiler, sort, limit))
+
+
+@app.post("/api/admin/debug/memory/snapshot", dependencies=[Depends(_require_admin)], include_in_schema=False)
+async def memory_snapshot(
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(25, ge=1, le=500),
+    frames: int = Query(1, ge=1, le=50),
+    types: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    tracemalloc snapshot, diffed against the previous one.
+
+    The first call starts tracemalloc (frames deep); call again after some
+    traffic to see what grew. types="GeneratePlansRequest,Task" also counts
+    live objects of those types.
+    """
+    result = await asyncio.to_thread(profiling.heap_snapshots.take, frames, group_by, limit)
+    if types:
+        result["objects"] = await asyncio.to_thread(
+            profiling.count_objects, [t.strip() for t in types.split(",") if t.strip()]
+        )
+    return result
+
+
+@app.delete("/api/admin/debug/memory", dependencies=[Depends(_require_admin)], include_in_schema=False)
+async def stop_memory_tracing() -> Dict[str, Any]:
+    """Stop tracemalloc and drop the stored snapshot"""
+    was_tracing = profiling.heap_snapshots.tracing
+    profiling.heap_snapshots.stop()
+    return {"stopped": was_tracing}
+
+
+@app.get("/api/admin/debug/tasks", dependencies=[Depends(_require_admin)], include_in_schema=False)
+async def dump_asyncio_tasks(stack_limit: int = Query(20, ge=1, le=200)) -> Dict[str, Any]:
+    """Every asyncio task in this worker with its current stack"""
+    tasks = profiling.dump_tasks(stack_limit)
+    return {
+        "pid": os.getpid(),
+        "count": len(tasks),
+        "generation_tasks": {plan_type: len(t) for plan_type, t in _generation_tasks.items()},
+        "tasks": tasks,
+    }
+
 
 @app.post("/api/admin/stripe/cancel-subscription")
 async def cancel_subscription(request: Request):
@@ -673,8 +1128,10 @@ async def cancel_subscription(request: Request):
         user_id = data["user_id"]
         
         # Cancel the subscription at period end (or immediately)
-        subscription = stripe.Subscription.modify(
+        subscription = await stripe_gateway.mutate(
+            stripe.Subscription.modify,
             subscription_id,
+            idempotency_key=request.headers.get("Idempotency-Key"),
             cancel_at_period_end=True  # Change to False for immediate cancellation
         )
         
@@ -693,25 +1150,7 @@ async def get_invoices(customer_id: str):
         if not customer_id:
             return {"success": False, "error": "Missing customer_id"}
 
-        invoices = stripe.Invoice.list(
-            customer=customer_id,
-            limit=100
-        )
-
-        formatted_invoices = []
-        for invoice in invoices.data:
-            formatted_invoices.append({
-                "id": invoice.id,
-                "amount_due": invoice.amount_due,
-                "amount_paid": invoice.amount_paid,
-                "created": invoice.created,
-                "currency": invoice.currency,
-                "hosted_invoice_url": invoice.hosted_invoice_url,
-                "invoice_pdf": invoice.invoice_pdf,
-                "status": invoice.status,
-                "period_start": invoice.period_start,
-                "period_end": invoice.period_end,
-            })
+        formatted_invoices = await invoice_cache.get_invoices(customer_id)
 
         return {
             "success": True,
@@ -732,17 +1171,17 @@ async def resend_invoice(request: Request):
 
         # Resolve to latest invoice if subscription or customer ID provided
         if invoice_id.startswith("sub_"):
-            invoices = stripe.Invoice.list(subscription=invoice_id, limit=1)
+            invoices = await stripe_gateway.call(stripe.Invoice.list, subscription=invoice_id, limit=1)
+            invoice_id = invoices.data[0].id if invoices.data else None
         elif invoice_id.startswith("cus_"):
-            invoices = stripe.Invoice.list(customer=invoice_id, limit=1)
-        else:
-            invoices = stripe.Invoice.list(limit=1, starting_after=invoice_id)
+            customer_invoices = await invoice_cache.get_invoices(invoice_id)
+            invoice_id = customer_invoices[0]["id"] if customer_invoices else None
 
-        if not invoices.data:
+        if not invoice_id:
             return {"success": False, "error": "No invoices found for given ID."}
 
-        invoice = invoices.data[0]
-        invoice = stripe.Invoice.retrieve(invoice.id, expand=["customer"])
+        # Always fetched live: status and collection method decide what happens next
+        invoice = await stripe_gateway.call(stripe.Invoice.retrieve, invoice_id, expand=["customer"])
 
         # --- Validation & logic ---
         customer_email = getattr(invoice.customer, "email", None)
@@ -768,9 +1207,14 @@ async def resend_invoice(request: Request):
 
             # Make sure it's finalized
             if invoice.status == "draft":
-                invoice = stripe.Invoice.finalize_invoice(invoice.id)
-
-            sent_invoice = stripe.Invoice.send_invoice(invoice.id)
+                invoice = await stripe_gateway.mutate(stripe.Invoice.finalize_invoice, invoice.id)
+
+            sent_invoice = await stripe_gateway.mutate(
+                stripe.Invoice.send_invoice,
+                invoice.id,
+                idempotency_key=request.headers.get("Idempotency-Key")
+            )
+            await invoice_cache.invalidate_everywhere(getattr(invoice.customer, "id", None))
             return {
                 "success": True,
                 "type": "manual_invoice",
@@ -780,7 +1224,7 @@ async def resend_invoice(request: Request):
 
         # 2️⃣ Auto-charge invoice (charge_automatically)
         elif collection_method == "charge_automatically":
-            hosted_url = invoice.hosted_invoice_url or stripe.Invoice.retrieve(invoice.id).hosted_invoice_url
+            hosted_url = invoice.hosted_invoice_url
             return {
                 "success": True,
                 "type": "auto_charge",
@@ -809,11 +1253,13 @@ async def change_plan(request: Request):
         new_price_id = data["new_price_id"]
         
         # Get the subscription
-        subscription = stripe.Subscription.retrieve(subscription_id)
+        subscription = await stripe_gateway.call(stripe.Subscription.retrieve, subscription_id)
         
         # Update the subscription with new price
-        updated_subscription = stripe.Subscription.modify(
+        updated_subscription = await stripe_gateway.mutate(
+            stripe.Subscription.modify,
             subscription_id,
+            idempotency_key=request.headers.get("Idempotency-Key"),
             items=[{
                 'id': subscription['items']['data'][0].id,
                 'price': new_price_id,
@@ -835,8 +1281,10 @@ async def apply_coupon(request: Request):
         coupon_id = data["coupon_id"]
         
         # Apply the coupon
-        subscription = stripe.Subscription.modify(
+        subscription = await stripe_gateway.mutate(
+            stripe.Subscription.modify,
             subscription_id,
+            idempotency_key=request.headers.get("Idempotency-Key"),
             coupon=coupon_id
         )
         
@@ -854,8 +1302,10 @@ async def extend_trial(request: Request):
         trial_end = data["trial_end"]  # Unix timestamp
         
         # Update trial end date
-        subscription = stripe.Subscription.modify(
+        subscription = await stripe_gateway.mutate(
+            stripe.Subscription.modify,
             subscription_id,
+            idempotency_key=request.headers.get("Idempotency-Key"),
             trial_end=trial_end
         )
         
@@ -876,24 +1326,73 @@ async def create_refund(request: Request):
         if amount:
             refund_params["amount"] = amount
         
-        refund = stripe.Refund.create(**refund_params)
+        refund = await stripe_gateway.mutate(
+            stripe.Refund.create,
+            idempotency_key=request.headers.get("Idempotency-Key"),
+            **refund_params
+        )
         
         return {"success": True, "refund": refund}
     except Exception as e:
         logger.error(f"Error creating refund: {e}")
         return {"success": False, "error": str(e)}
 
+@app.post("/api/admin/stripe/bulk", dependencies=[Depends(_require_admin)])
+async def bulk_billing_operations(request: Request):
+    """
+    Run many billing operations in one call, streaming a result line per item.
+
+    Body: {"operations": [{"op": "cancel-subscription", "subscription_id": ..., "user_id": ...}, ...]}
+    Ops: cancel-subscription, apply-coupon, extend-trial, change-plan, refund, with the
+    same fields as their single-object endpoints. Items may set their own
+    idempotency_key; otherwise one is derived from the Idempotency-Key header.
+    """
+    try:
+        data = loads(await request.body() or b"{}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be valid JSON")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise HTTPException(status_code=400, detail="operations must be a non-empty list")
+    if len(operations) > settings.STRIPE_BULK_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.STRIPE_BULK_MAX_OPERATIONS} operations per request"
+        )
+
+    errors = validate_operations(operations)
+    if errors:
+        raise HTTPException(status_code=400, detail={"invalid_operations": errors})
+
+    run = BulkOperationRun(
+        operations,
+        batch_key=request.headers.get("Idempotency-Key") or f"bulk-{uuid.uuid4()}",
+        concurrency=settings.STRIPE_BULK_CONCURRENCY,
+        plan_batch_size=settings.STRIPE_BULK_PLAN_BATCH_SIZE
+    )
+
+    async def stream():
+        async for entry in run.results():
+            yield dumps_bytes(entry) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/api/admin/stripe/customer/{customer_id}")
 async def get_customer_details(customer_id: str):
     """Get detailed information about a customer"""
     try:
-        customer = stripe.Customer.retrieve(
+        customer = await stripe_gateway.call(
+            stripe.Customer.retrieve,
             customer_id,
             expand=["subscriptions", "invoices"]
         )
         
         # Get payment methods
-        payment_methods = stripe.PaymentMethod.list(
+        payment_methods = await stripe_gateway.call(
+            stripe.PaymentMethod.list,
             customer=customer_id,
             type="card"
         )
@@ -915,8 +1414,10 @@ async def update_payment_method(request: Request):
         subscription_id = data["subscription_id"]
         payment_method_id = data["payment_method_id"]
         
-        subscription = stripe.Subscription.modify(
+        subscription = await stripe_gateway.mutate(
+            stripe.Subscription.modify,
             subscription_id,
+            idempotency_key=request.headers.get("Idempotency-Key"),
             default_payment_method=payment_method_id
         )
         
@@ -933,6 +1434,7 @@ async def generate_meal_plan(request: GeneratePlansRequest) -> Dict[str, Any]:
     """Legacy endpoint - generates meal plan synchronously"""
     start_time = time.time()
     log_api_request("/generate-meal-plan", request.user_id, request.ai_provider, request.model_name)
+    await _authorize_generation(request.user_id)
     
     try:
         nutrition = calculate_nutrition_profile(request.answers)
@@ -945,58 +1447,60 @@ async def generate_meal_plan(request: GeneratePlansRequest) -> Dict[str, Any]:
             else "Not provided"
         )
         
-        prompt = MEAL_PLAN_PROMPT.format(
-            age=request.answers.age,
-            gender=request.answers.gender,
-            current_weight=display["weight"],
-            target_weight=display["targetWeight"],
-            height=display["height"],
-            main_goal=request.answers.mainGoal,
-            secondary_goals=request.answers.secondaryGoals,
-            time_frame=request.answers.timeFrame,
-            body_type=request.answers.bodyType,
-            body_fat=body_fat_str,
-            health_conditions=request.answers.healthConditions,
-            health_conditions_other=request.answers.healthConditions_other,
-            medications=request.answers.medications,
-            lifestyle=request.answers.lifestyle,
-            stress_level=request.answers.stressLevel,
-            sleep_quality=request.answers.sleepQuality,
-            motivation_level=request.answers.motivationLevel,
-            occupation_activity=request.answers.occupation_activity,
-            country=request.answers.country,
-            cooking_skill=request.answers.cookingSkill,
-            cooking_time=request.answers.cookingTime,
-            grocery_budget=request.answers.groceryBudget,
-            dietary_style=request.answers.dietaryStyle,
-            disliked_foods=request.answers.dislikedFoods,
-            foodAllergies=request.answers.foodAllergies,
-            meals_per_day=request.answers.mealsPerDay,
-            challenges=request.answers.challenges,
-            exercise_frequency=request.answers.exerciseFrequency,
-            preferred_exercise=request.answers.preferredExercise,
-            daily_calories=nutrition["goalCalories"],
-            protein=macros["protein_g"],
-            carbs=macros["carbs_g"],
-            fats=macros["fat_g"],
-            protein_pct_of_calories=macros["protein_pct_of_calories"],
-            carbs_pct_of_calories=macros["carbs_pct_of_calories"],
-            fat_pct_of_calories=macros["fat_pct_of_calories"],
-            MEAL_PLAN_JSON_FORMAT=MEAL_PLAN_JSON_FORMAT
-        )
+        with span("prompt"):
+            prompt = MEAL_PLAN_PROMPT.format(
+                age=request.answers.age,
+                gender=request.answers.gender,
+                current_weight=display["weight"],
+                target_weight=display["targetWeight"],
+                height=display["height"],
+                main_goal=request.answers.mainGoal,
+                secondary_goals=request.answers.secondaryGoals,
+                time_frame=request.answers.timeFrame,
+                body_type=request.answers.bodyType,
+                body_fat=body_fat_str,
+                health_conditions=request.answers.healthConditions,
+                health_conditions_other=request.answers.healthConditions_other,
+                medications=request.answers.medications,
+                lifestyle=request.answers.lifestyle,
+                stress_level=request.answers.stressLevel,
+                sleep_quality=request.answers.sleepQuality,
+                motivation_level=request.answers.motivationLevel,
+                occupation_activity=request.answers.occupation_activity,
+                country=request.answers.country,
+                cooking_skill=request.answers.cookingSkill,
+                cooking_time=request.answers.cookingTime,
+                grocery_budget=request.answers.groceryBudget,
+                dietary_style=request.answers.dietaryStyle,
+                disliked_foods=request.answers.dislikedFoods,
+                foodAllergies=request.answers.foodAllergies,
+                meals_per_day=request.answers.mealsPerDay,
+                challenges=request.answers.challenges,
+                exercise_frequency=request.answers.exerciseFrequency,
+                preferred_exercise=request.answers.preferredExercise,
+                daily_calories=nutrition["goalCalories"],
+                protein=macros["protein_g"],
+                carbs=macros["carbs_g"],
+                fats=macros["fat_g"],
+                protein_pct_of_calories=macros["protein_pct_of_calories"],
+                carbs_pct_of_calories=macros["carbs_pct_of_calories"],
+                fat_pct_of_calories=macros["fat_pct_of_calories"],
+                MEAL_PLAN_JSON_FORMAT=MEAL_PLAN_JSON_FORMAT
+            )
         
-        full_prompt = prompt + "\n\nDouble-check all values align with the user's calorie/macro targets before finalizing the JSON output."
+            full_prompt = prompt + "\n\nDouble-check all values align with the user's calorie/macro targets before finalizing the JSON output."
         
-        meal_plan = await ai_service.generate_plan(full_prompt, request.ai_provider, request.model_name, request.user_id)
+        meal_plan = await ai_service.generate_plan(full_prompt, request.ai_provider, request.model_name, request.user_id, plan_type="meal")
         
-        await db_service.save_meal_plan(
-            request.user_id,
-            request.quiz_result_id,
-            meal_plan,
-            nutrition["goalCalories"],
-            request.answers.preferredExercise,
-            request.answers.dietaryStyle
-        )
+        with span("db.save"):
+            await db_service.save_meal_plan(
+                request.user_id,
+                request.quiz_result_id,
+                meal_plan,
+                nutrition["goalCalories"],
+                request.answers.preferredExercise,
+                request.answers.dietaryStyle
+            )
         
         duration_ms = (time.time() - start_time) * 1000
         log_api_response("/generate-meal-plan", request.user_id, True, duration_ms)
@@ -1021,6 +1525,7 @@ async def generate_workout_plan(request: GeneratePlansRequest) -> Dict[str, Any]
     """Legacy endpoint - generates workout plan synchronously"""
     start_time = time.time()
     log_api_request("/generate-workout-plan", request.user_id, request.ai_provider, request.model_name)
+    await _authorize_generation(request.user_id)
     
     try:
         nutrition = calculate_nutrition_profile(request.answers)
@@ -1032,45 +1537,47 @@ async def generate_workout_plan(request: GeneratePlansRequest) -> Dict[str, Any]
             else "Not provided"
         )
         
-        prompt = WORKOUT_PLAN_PROMPT.format(
-            age=request.answers.age,
-            gender=request.answers.gender,
-            current_weight=display["weight"],
-            target_weight=display["targetWeight"],
-            height=display["height"],
-            main_goal=request.answers.mainGoal,
-            secondary_goals=request.answers.secondaryGoals,
-            time_frame=request.answers.timeFrame,
-            body_type=request.answers.bodyType,
-            body_fat=body_fat_str,
-            health_conditions=request.answers.healthConditions,
-            health_conditions_other=request.answers.healthConditions_other,
-            injuries=request.answers.injuries,
-            medications=request.answers.medications,
-            lifestyle=request.answers.lifestyle,
-            stress_level=request.answers.stressLevel,
-            sleep_quality=request.answers.sleepQuality,
-            motivation_level=request.answers.motivationLevel,
-            occupation_activity=request.answers.occupation_activity,
-            country=request.answers.country,
-            challenges=request.answers.challenges,
-            exercise_frequency=request.answers.exerciseFrequency,
-            preferred_exercise=request.answers.preferredExercise,
-            training_environment=request.answers.trainingEnvironment,
-            equipment=request.answers.equipment,
-            WORKOUT_PLAN_JSON_FORMAT=WORKOUT_PLAN_JSON_FORMAT
-        )
+        with span("prompt"):
+            prompt = WORKOUT_PLAN_PROMPT.format(
+                age=request.answers.age,
+                gender=request.answers.gender,
+                current_weight=display["weight"],
+                target_weight=display["targetWeight"],
+                height=display["height"],
+                main_goal=request.answers.mainGoal,
+                secondary_goals=request.answers.secondaryGoals,
+                time_frame=request.answers.timeFrame,
+                body_type=request.answers.bodyType,
+                body_fat=body_fat_str,
+                health_conditions=request.answers.healthConditions,
+                health_conditions_other=request.answers.healthConditions_other,
+                injuries=request.answers.injuries,
+                medications=request.answers.medications,
+                lifestyle=request.answers.lifestyle,
+                stress_level=request.answers.stressLevel,
+                sleep_quality=request.answers.sleepQuality,
+                motivation_level=request.answers.motivationLevel,
+                occupation_activity=request.answers.occupation_activity,
+                country=request.answers.country,
+                challenges=request.answers.challenges,
+                exercise_frequency=request.answers.exerciseFrequency,
+                preferred_exercise=request.answers.preferredExercise,
+                training_environment=request.answers.trainingEnvironment,
+                equipment=request.answers.equipment,
+                WORKOUT_PLAN_JSON_FORMAT=WORKOUT_PLAN_JSON_FORMAT
+            )
         
-        workout_plan = await ai_service.generate_plan(prompt, request.ai_provider, request.model_name, request.user_id)
+        workout_plan = await ai_service.generate_plan(prompt, request.ai_provider, request.model_name, request.user_id, plan_type="workout")
         
-        await db_service.save_workout_plan(
-            request.user_id,
-            request.quiz_result_id,
-            workout_plan,
-            request.answers.preferredExercise,
-            request.answers.exerciseFrequency,
-            workout_plan.get('weekly_summary', {}).get('total_workout_days', 5)
-        )
+        with span("db.save"):
+            await db_service.save_workout_plan(
+                request.user_id,
+                request.quiz_result_id,
+                workout_plan,
+                request.answers.preferredExercise,
+                request.answers.exerciseFrequency,
+                workout_plan.get('weekly_summary', {}).get('total_workout_days', 5)
+            )
         
         duration_ms = (time.time() - start_time) * 1000
         log_api_response("/generate-workout-plan", request.user_id, True, duration_ms)
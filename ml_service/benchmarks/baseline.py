@@ -0,0 +1,269 @@
+"""
+JSON baselines for micro-benchmarks.
+
+A benchmark produces {case: microseconds per call}. --save writes it to
+benchmarks/baselines/<name>.json together with the interpreter and machine it
+was measured on; --check compares a fresh run with that file and exits
+non-zero when any case is slower than the baseline by more than the
+threshold.
+
+The check scales the baseline by how much faster or slower the machine is
+running right now, so a busy or throttled machine does not read as a
+regression (--no-normalize compares raw times). The scale is the median of
+current / baseline over all cases: a single timed loop swings by more than the
+threshold between runs, while the median across many cases is stable and is
+not moved by the few cases that actually regressed. Benchmarks with fewer than
+MIN_CASES_FOR_MEDIAN shared cases fall back to a fixed pure-Python calibration
+loop. Single cases still vary by 20-30% between runs on a shared machine
+(more for sub-microsecond cases), so the default threshold is 50%, slowdowns
+under NOISE_FLOOR_US are ignored, and a flagged case only fails if it is over
+the threshold again in each of CONFIRM_RUNS full re-measurements (each with
+its own scale). Some cases settle at a different speed in each interpreter
+(memory layout), so in-process benchmarks re-measure in a fresh one via
+rerun_in_subprocess(). Baselines are still best compared on the machine that recorded
+them: re-save after changing hardware or Python version.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+DEFAULT_THRESHOLD = 0.5
+CONFIRM_RUNS = 3
+MIN_CASES_FOR_MEDIAN = 3
+# Slowdowns smaller than this are call-overhead noise, whatever the ratio
+NOISE_FLOOR_US = 1.0
+
+
+class Regression(NamedTuple):
+    case: str
+    baseline_us: float
+    current_us: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_us / self.baseline_us
+
+
+def per_call_us(fn: Callable[[], Any], repeat: int = 5, min_time_s: float = 0.1) -> float:
+    """Best-of-`repeat` time per call in microseconds, each repeat lasting about min_time_s"""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= 0.01:
+            break
+        number *= 10
+    number = max(1, int(number * min_time_s / elapsed))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def _calibration_workload() -> int:
+    total = 0
+    for i in range(2000):
+        total += i * i % 7
+    return total
+
+
+def calibration_us() -> float:
+    """Time of a fixed interpreter-bound loop, to factor out machine speed"""
+    return per_call_us(_calibration_workload)
+
+
+def median_scale(baseline: Dict[str, float], results: Dict[str, float]) -> Optional[float]:
+    """
+    Median current / baseline ratio over the cases both sides share.
+
+    Returns:
+        The scale, or None with fewer than MIN_CASES_FOR_MEDIAN shared cases
+    """
+    ratios = [results[case] / baseline[case] for case in results if baseline.get(case)]
+    if len(ratios) < MIN_CASES_FOR_MEDIAN:
+        return None
+    return statistics.median(ratios)
+
+
+def _scale(
+    stored: Dict[str, Any],
+    results: Dict[str, float],
+    calibration: float
+) -> Tuple[float, str]:
+    """Current / baseline machine speed and how it was measured"""
+    median = median_scale(stored["results_us"], results)
+    if median is not None:
+        return median, "median case"
+    if stored.get("calibration_us"):
+        return calibration / stored["calibration_us"], "calibration loop"
+    return 1.0, "unscaled"
+
+
+def _environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def baseline_path(name: str) -> Path:
+    return BASELINE_DIR / f"{name}.json"
+
+
+def save_baseline(name: str, results: Dict[str, float], calibration: float, path: Optional[Path] = None) -> Path:
+    """Write results, the calibration time and the environment they were measured in"""
+    path = path or baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "benchmark": name,
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": _environment(),
+        "calibration_us": round(calibration, 4),
+        "results_us": {case: round(us, 4) for case, us in sorted(results.items())},
+    }
+    # Indented so baseline updates read well in review
+    path.write_text(json.dumps(document, indent=2) + "\n")
+    return path
+
+
+def load_baseline(name: str, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    path = path or baseline_path(name)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def rerun_in_subprocess(module: str, repeat: int) -> Callable[[List[str]], Dict[str, float]]:
+    """
+    A report() rerun that measures the given cases in a fresh interpreter.
+
+    Args:
+        module: Benchmark module with run(repeat=..., names=...), e.g. "benchmarks.bench_generation_path"
+        repeat: Passed through to run()
+    """
+    code = f"import json, sys; from {module} import run; print(json.dumps(run(repeat={repeat}, names=json.loads(sys.argv[1]))))"
+
+    def rerun(names: List[str]) -> Dict[str, float]:
+        completed = subprocess.run(
+            [sys.executable, "-c", code, json.dumps(names)],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    return rerun
+
+
+def find_regressions(
+    baseline: Dict[str, float],
+    results: Dict[str, float],
+    threshold: float,
+    scale: float = 1.0
+) -> List[Regression]:
+    """
+    Cases slower than baseline * scale * (1 + threshold), and by at least NOISE_FLOOR_US.
+
+    Args:
+        baseline: Baseline microseconds per case
+        results: Current microseconds per case
+        threshold: Allowed relative slowdown, e.g. 0.5
+        scale: Current / baseline machine speed (1.0 = compare raw times)
+
+    Cases missing from either side are ignored, so adding a benchmark does not
+    fail the check until a new baseline is saved.
+    """
+    return [
+        Regression(case, baseline[case] * scale, current)
+        for case, current in results.items()
+        if case in baseline
+        and current > baseline[case] * scale * (1 + threshold)
+        and current - baseline[case] * scale >= NOISE_FLOOR_US
+    ]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("baselines")
+    group.add_argument("--save", action="store_true", help="record this run as the baseline")
+    group.add_argument("--check", action="store_true", help="fail if slower than the baseline")
+    group.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                       help=f"allowed slowdown before --check fails (default {DEFAULT_THRESHOLD * 100:.0f}%%)")
+    group.add_argument("--baseline", type=Path, help="baseline file (default benchmarks/baselines/<name>.json)")
+    group.add_argument("--no-normalize", dest="normalize", action="store_false",
+                       help="compare raw times instead of scaling by the machine's current speed")
+
+
+def report(
+    name: str,
+    results: Dict[str, float],
+    args: argparse.Namespace,
+    rerun: Optional[Callable[[List[str]], Dict[str, float]]] = None
+) -> int:
+    """
+    Print results next to the baseline, then save and/or check.
+
+    Args:
+        name: Benchmark (baseline file) name
+        results: Microseconds per call keyed by case
+        args: Parsed arguments from add_arguments()
+        rerun: Measures the given cases again; regressions are only reported
+            if they persist in each of CONFIRM_RUNS re-measurements of every case
+
+    Returns:
+        Process exit code (1 when --check finds a regression or no baseline)
+    """
+    stored = load_baseline(name, args.baseline)
+    baseline = stored["results_us"] if stored else {}
+    calibration = calibration_us()
+    scale = 1.0
+    if stored and args.normalize:
+        scale, method = _scale(stored, results, calibration)
+        print(f"  machine speed vs baseline: {method} {scale - 1:+.1%}, baseline scaled to match")
+
+    width = max(len(case) for case in results)
+    for case, current in results.items():
+        line = f"  {case:<{width}} {current:12.2f} us"
+        if case in baseline:
+            expected = baseline[case] * scale
+            line += f" | baseline {expected:12.2f} us | {current / expected - 1:+7.1%}"
+        print(line)
+
+    exit_code = 0
+    if args.check:
+        if stored is None:
+            print(f"No baseline for {name}; record one with --save", file=sys.stderr)
+            exit_code = 1
+        else:
+            if stored.get("environment") != _environment():
+                print(f"Warning: baseline recorded on {stored.get('environment')}", file=sys.stderr)
+            regressions = find_regressions(baseline, results, args.threshold, scale)
+            for _ in range(CONFIRM_RUNS if rerun else 0):
+                if not regressions:
+                    break
+                again = rerun(list(results))
+                again_scale = _scale(stored, again, calibration_us())[0] if args.normalize else 1.0
+                confirmed = {r.case: r for r in find_regressions(baseline, again, args.threshold, again_scale)}
+                regressions = [confirmed[r.case] for r in regressions if r.case in confirmed]
+            for r in regressions:
+                print(
+                    f"REGRESSION {r.case}: {r.baseline_us:.2f} -> {r.current_us:.2f} us "
+                    f"({r.ratio - 1:+.1%}, threshold {args.threshold:.0%})",
+                    file=sys.stderr
+                )
+            exit_code = 1 if regressions else 0
+
+    if args.save:
+        print(f"Saved baseline to {save_baseline(name, results, calibration, args.baseline)}")
+
+    return exit_code
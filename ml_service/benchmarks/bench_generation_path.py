@@ -0,0 +1,187 @@
+"""
+Micro-benchmark: the CPU work around a plan generation.
+
+Covers request validation, the nutrition calculations and their helpers,
+measurement parsing, prompt rendering, and cleaning/parsing a large fenced
+AI response. Results are microseconds per call and can be stored as a JSON
+baseline and checked against it (see benchmarks/baseline.py).
+
+Usage (from ml_service/):
+    python -m benchmarks.bench_generation_path                  # print
+    python -m benchmarks.bench_generation_path --save           # record baseline
+    python -m benchmarks.bench_generation_path --check [--threshold 0.5]
+    python -m benchmarks.bench_generation_path --only prompt    # substring filter
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import baseline
+from benchmarks.fixtures import build_generate_plans_request, build_meal_plan, build_workout_plan
+from models.quiz import GeneratePlansRequest, LengthMeasurement, WeightMeasurement
+from prompts.json_formats.meal_plan_format import MEAL_PLAN_JSON_FORMAT
+from prompts.json_formats.workout_plan_format import WORKOUT_PLAN_JSON_FORMAT
+from prompts.meal_plan import MEAL_PLAN_PROMPT
+from prompts.workout_plan import WORKOUT_PLAN_PROMPT
+from services.ai_service import ai_service
+from utils.calculations import (
+    calculate_bmr,
+    calculate_goal_calories,
+    calculate_macros,
+    calculate_navy_bfp,
+    calculate_nutrition_profile,
+    calculate_tdee,
+)
+from utils.converters import parse_measurement, parse_weight
+from utils.serialization import loads
+
+NAME = "generation_path"
+MODULE = "benchmarks.bench_generation_path"
+
+
+def _meal_prompt(request: GeneratePlansRequest, nutrition: Dict[str, Any]) -> str:
+    """Same arguments as _generate_meal_plan_background"""
+    answers, macros, display = request.answers, nutrition["macros"], nutrition["display"]
+    return MEAL_PLAN_PROMPT.format(
+        age=answers.age,
+        gender=answers.gender,
+        current_weight=display["weight"],
+        target_weight=display["targetWeight"],
+        height=display["height"],
+        main_goal=answers.mainGoal,
+        secondary_goals=answers.secondaryGoals,
+        time_frame=answers.timeFrame,
+        body_type=answers.bodyType,
+        body_fat=f"{nutrition['bodyFatPercentage']}%",
+        health_conditions=answers.healthConditions,
+        health_conditions_other=answers.healthConditions_other,
+        medications=answers.medications,
+        lifestyle=answers.lifestyle,
+        stress_level=answers.stressLevel,
+        sleep_quality=answers.sleepQuality,
+        motivation_level=answers.motivationLevel,
+        occupation_activity=answers.occupation_activity,
+        country=answers.country,
+        cooking_skill=answers.cookingSkill,
+        cooking_time=answers.cookingTime,
+        grocery_budget=answers.groceryBudget,
+        dietary_style=answers.dietaryStyle,
+        disliked_foods=answers.dislikedFoods,
+        foodAllergies=answers.foodAllergies,
+        meals_per_day=answers.mealsPerDay,
+        challenges=answers.challenges,
+        exercise_frequency=answers.exerciseFrequency,
+        preferred_exercise=answers.preferredExercise,
+        daily_calories=nutrition["goalCalories"],
+        protein=macros["protein_g"],
+        carbs=macros["carbs_g"],
+        fats=macros["fat_g"],
+        protein_pct_of_calories=macros["protein_pct_of_calories"],
+        carbs_pct_of_calories=macros["carbs_pct_of_calories"],
+        fat_pct_of_calories=macros["fat_pct_of_calories"],
+        MEAL_PLAN_JSON_FORMAT=MEAL_PLAN_JSON_FORMAT
+    )
+
+
+def _workout_prompt(request: GeneratePlansRequest, nutrition: Dict[str, Any]) -> str:
+    """Same arguments as _generate_workout_plan_background"""
+    answers, display = request.answers, nutrition["display"]
+    return WORKOUT_PLAN_PROMPT.format(
+        age=answers.age,
+        gender=answers.gender,
+        current_weight=display["weight"],
+        target_weight=display["targetWeight"],
+        height=display["height"],
+        main_goal=answers.mainGoal,
+        secondary_goals=answers.secondaryGoals,
+        time_frame=answers.timeFrame,
+        body_type=answers.bodyType,
+        body_fat=f"{nutrition['bodyFatPercentage']}%",
+        health_conditions=answers.healthConditions,
+        health_conditions_other=answers.healthConditions_other,
+        injuries=answers.injuries,
+        medications=answers.medications,
+        lifestyle=answers.lifestyle,
+        stress_level=answers.stressLevel,
+        sleep_quality=answers.sleepQuality,
+        motivation_level=answers.motivationLevel,
+        occupation_activity=answers.occupation_activity,
+        country=answers.country,
+        challenges=answers.challenges,
+        exercise_frequency=answers.exerciseFrequency,
+        preferred_exercise=answers.preferredExercise,
+        training_environment=answers.trainingEnvironment,
+        equipment=answers.equipment,
+        WORKOUT_PLAN_JSON_FORMAT=WORKOUT_PLAN_JSON_FORMAT
+    )
+
+
+def _fenced(plan: Dict[str, Any]) -> str:
+    """An AI response as models usually return it: pretty-printed JSON in a ```json fence"""
+    return "```json\n" + json.dumps(plan, indent=2) + "\n```"
+
+
+def cases() -> Dict[str, Callable[[], Any]]:
+    """Benchmark name -> zero-argument callable"""
+    body = build_generate_plans_request()
+    body_json = json.dumps(body)
+    request = GeneratePlansRequest.model_validate(body)
+    imperial = GeneratePlansRequest.model_validate(build_generate_plans_request(imperial=True))
+    nutrition = calculate_nutrition_profile(request.answers)
+    bmr = calculate_bmr(86, 178, 34, "Male", 21.5)
+    tdee = calculate_tdee(bmr, "3-4 times/week", "Desk job, mostly sedentary")
+    goal_calories = calculate_goal_calories(tdee, "Weight loss", bmr, "Male")
+    height_model, weight_model = LengthMeasurement(cm=178), WeightMeasurement(lbs=190)
+
+    meal_response = _fenced(build_meal_plan(meals=6, foods_per_meal=8))
+    workout_response = _fenced(build_workout_plan(days=7, exercises_per_day=8))
+
+    return {
+        "validate.generate_plans_request": lambda: GeneratePlansRequest.model_validate(body),
+        "validate.generate_plans_request_json": lambda: GeneratePlansRequest.model_validate_json(body_json),
+        "calc.nutrition_profile_metric": lambda: calculate_nutrition_profile(request.answers),
+        "calc.nutrition_profile_imperial": lambda: calculate_nutrition_profile(imperial.answers),
+        "calc.navy_bfp": lambda: calculate_navy_bfp("Male", 1.78, 39, 86),
+        "calc.bmr": lambda: calculate_bmr(86, 178, 34, "Male"),
+        "calc.tdee": lambda: calculate_tdee(bmr, "3-4 times/week", "Desk job, mostly sedentary"),
+        "calc.goal_calories": lambda: calculate_goal_calories(tdee, "Weight loss", bmr, "Male"),
+        "calc.macros": lambda: calculate_macros(goal_calories, 86, "Weight loss", "Mediterranean"),
+        "convert.parse_measurement_cm": lambda: parse_measurement({"cm": 178}),
+        "convert.parse_measurement_ft_in": lambda: parse_measurement({"ft": 5, "inch": 10}),
+        "convert.parse_measurement_model": lambda: parse_measurement(height_model),
+        "convert.parse_weight_kg": lambda: parse_weight({"kg": 86}),
+        "convert.parse_weight_lbs_str": lambda: parse_weight("190 lbs"),
+        "convert.parse_weight_model": lambda: parse_weight(weight_model),
+        "prompt.meal_render": lambda: _meal_prompt(request, nutrition),
+        "prompt.workout_render": lambda: _workout_prompt(request, nutrition),
+        "parse.meal_response": lambda: loads(ai_service.clean_json_response(meal_response)),
+        "parse.workout_response": lambda: loads(ai_service.clean_json_response(workout_response)),
+        "parse.clean_only": lambda: ai_service.clean_json_response(workout_response),
+    }
+
+
+def run(only: Optional[str] = None, repeat: int = 5, names: Optional[List[str]] = None) -> Dict[str, float]:
+    """Run the benchmark and return microseconds per call keyed by case"""
+    return {
+        name: baseline.per_call_us(fn, repeat=repeat)
+        for name, fn in cases().items()
+        if (not only or only in name) and (names is None or name in names)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="run cases whose name contains this substring")
+    parser.add_argument("--repeat", type=int, default=5)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"{NAME} (us per call)")
+    results = run(args.only, args.repeat)
+    sys.exit(baseline.report(NAME, results, args, rerun=baseline.rerun_in_subprocess(MODULE, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
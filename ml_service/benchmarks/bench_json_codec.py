@@ -0,0 +1,63 @@
+"""
+Micro-benchmark: stdlib json vs orjson for plan payloads.
+
+Compares the previous path (json.dumps to text, json.loads back) with the
+orjson-backed jsonb codec registered on the asyncpg pool.
+
+Usage (from ml_service/):
+    python -m benchmarks.bench_json_codec [--iterations 2000]
+"""
+
+import argparse
+import json
+import timeit
+from typing import Any, Callable, Dict
+
+from benchmarks.fixtures import build_meal_plan, build_workout_plan
+from utils.serialization import decode_jsonb, encode_jsonb
+
+
+def _per_call_us(fn: Callable[[], Any], iterations: int) -> float:
+    """Best-of-5 time per call in microseconds"""
+    best = min(timeit.repeat(fn, number=iterations, repeat=5))
+    return best / iterations * 1e6
+
+
+def run(iterations: int = 2000) -> Dict[str, Dict[str, float]]:
+    """Run the benchmark and return per-call timings keyed by payload name"""
+    results: Dict[str, Dict[str, float]] = {}
+    payloads = {
+        "workout_plan_7d": build_workout_plan(days=7),
+        "meal_plan": build_meal_plan(),
+    }
+
+    for name, plan in payloads.items():
+        text = json.dumps(plan)
+        wire = encode_jsonb(plan)
+
+        results[name] = {
+            "size_bytes": len(text.encode("utf-8")),
+            "stdlib_encode_us": _per_call_us(lambda: json.dumps(plan), iterations),
+            "orjson_encode_us": _per_call_us(lambda: encode_jsonb(plan), iterations),
+            "stdlib_decode_us": _per_call_us(lambda: json.loads(text), iterations),
+            "orjson_decode_us": _per_call_us(lambda: decode_jsonb(wire), iterations),
+        }
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, r in run(args.iterations).items():
+        print(f"{name} ({r['size_bytes']} bytes)")
+        for op in ("encode", "decode"):
+            before = r[f"stdlib_{op}_us"]
+            after = r[f"orjson_{op}_us"]
+            print(f"  {op}: stdlib {before:8.1f} us | orjson {after:8.1f} us | {before / after:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+HTTP server throughput: the same app under different uvicorn configurations.
+
+Each variant starts `uvicorn app:app` in a subprocess (one worker, no DB, no
+warm-up), then a closed-loop aiohttp client keeps --connections requests in
+flight against each endpoint for --duration seconds. The client runs on the
+same machine, so absolute numbers understate a dedicated server; compare
+variants within one run.
+
+Variants:
+    asyncio-h11          plain `pip install uvicorn`: stdlib event loop, pure-Python HTTP parser
+    uvloop-httptools     uvicorn[standard] defaults, access log on
+    server.py            uvloop + httptools, access log off (SERVER_ACCESS_LOG=false)
+
+Usage (from ml_service/):
+    python -m benchmarks.bench_server [--duration 10] [--connections 64] [--only uvloop]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiohttp
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+ENDPOINTS = ("/health", "/metrics")
+VARIANTS: Dict[str, List[str]] = {
+    "asyncio-h11": ["--loop", "asyncio", "--http", "h11"],
+    "uvloop-httptools": ["--loop", "uvloop", "--http", "httptools"],
+    "server.py": ["--loop", "uvloop", "--http", "httptools", "--no-access-log"],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, timeout_s: float = 30) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not become ready")
+
+
+async def load(url: str, connections: int, duration_s: float) -> Dict[str, float]:
+    """Closed loop: `connections` workers each send the next request as soon as one finishes"""
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration_s
+    connector = aiohttp.TCPConnector(limit=connections)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker() -> None:
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                except aiohttp.ClientError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(connections)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": errors,
+    }
+
+
+def run_variant(name: str, connections: int, duration_s: float) -> Dict[str, Dict[str, float]]:
+    """Start the app under one variant and load each endpoint"""
+    port = _free_port()
+    env = {**os.environ, "SERVER_WARMUP": "false", "LOG_LEVEL": "WARNING"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning", *VARIANTS[name]],
+        cwd=SERVICE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_wait_ready(base_url))
+        # Short warm-up so first-request costs are not measured
+        asyncio.run(load(f"{base_url}/health", connections, 1.0))
+        return {endpoint: asyncio.run(load(base_url + endpoint, connections, duration_s)) for endpoint in ENDPOINTS}
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--only", help="run variants whose name contains this substring")
+    args = parser.parse_args(argv)
+
+    print(f"{'variant':<18} {'endpoint':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    baseline_rps: Dict[str, float] = {}
+    for name in VARIANTS:
+        if args.only and args.only not in name:
+            continue
+        for endpoint, result in run_variant(name, args.connections, args.duration).items():
+            baseline_rps.setdefault(endpoint, result["rps"])
+            change = result["rps"] / baseline_rps[endpoint] - 1
+            print(
+                f"{name:<18} {endpoint:<10} {result['rps']:9.0f} {result['p50_ms']:8.2f} "
+                f"{result['p99_ms']:8.2f} {result['errors']:7d}  {change:+.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold-start benchmark: module import time of the service.
+
+Each case imports a module in a fresh interpreter with `python -X importtime`
+and takes the cumulative time reported for it; `process.import_app` is the
+wall time of the whole `python -c "import app"` process, interpreter startup
+included. The best of --repeat runs is kept. Provider API keys are set for
+the child processes, so a provider SDK imported at module load shows up here
+even though clients are only built on first use.
+
+Usage (from ml_service/):
+    python -m benchmarks.bench_startup [--repeat 5] [--top 15] [--check | --save]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from benchmarks import baseline
+
+NAME = "startup"
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+MODULES = ("config.settings", "services.ai_service", "app")
+CONFIGURED_ENV = {
+    "OPENAI_API_KEY": "sk-startup-benchmark",
+    "ANTHROPIC_API_KEY": "sk-ant-startup-benchmark",
+    "GEMINI_API_KEY": "startup-benchmark",
+    "LLAMA_API_KEY": "startup-benchmark",
+}
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTime]:
+    """Rows of `-X importtime` output, in the order Python printed them"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            rows.append(ImportTime(match.group(4), int(match.group(1)), int(match.group(2)), len(match.group(3)) // 2))
+    return rows
+
+
+def import_module(module: str) -> subprocess.CompletedProcess:
+    """Import a module in a fresh interpreter with -X importtime"""
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVICE_DIR,
+        env={**os.environ, **CONFIGURED_ENV},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def cumulative_us(rows: List[ImportTime], module: str) -> int:
+    return next(row.cumulative_us for row in reversed(rows) if row.module == module)
+
+
+def slowest_imports(rows: List[ImportTime], module: str, top: int) -> List[ImportTime]:
+    """Largest direct imports made while importing a module"""
+    # importtime prints a module's imports right before the module itself
+    end = max(i for i, row in enumerate(rows) if row.module == module)
+    children = []
+    for row in reversed(rows[:end]):
+        if row.depth <= rows[end].depth:
+            break
+        if row.depth == rows[end].depth + 1:
+            children.append(row)
+    return sorted(children, key=lambda r: -r.cumulative_us)[:top]
+
+
+def run(repeat: int = 5, names: Optional[List[str]] = None) -> Dict[str, float]:
+    """Best-of-repeat import times in microseconds keyed by case"""
+    results: Dict[str, float] = {}
+    for module in MODULES:
+        if names is None or f"import.{module}" in names:
+            results[f"import.{module}"] = min(
+                cumulative_us(parse_importtime(import_module(module).stderr), module) for _ in range(repeat)
+            )
+    if names is None or "process.import_app" in names:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            import_module("app")
+            timings.append((time.perf_counter() - start) * 1e6)
+        results["process.import_app"] = min(timings)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="list the N slowest imports made by app")
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.top:
+        rows = parse_importtime(import_module("app").stderr)
+        print("slowest imports under app (cumulative ms)")
+        for row in slowest_imports(rows, "app", args.top):
+            print(f"  {row.module:<40} {row.cumulative_us / 1000:8.1f}")
+
+    print(f"{NAME} (us)")
+    results = run(args.repeat)
+    sys.exit(baseline.report(NAME, results, args, rerun=lambda names: run(repeat=args.repeat, names=names)))
+
+
+if __name__ == "__main__":
+    main()
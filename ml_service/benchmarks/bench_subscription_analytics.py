@@ -0,0 +1,149 @@
+"""
+Benchmark: per-element Python passes vs pandas for SaaS metrics.
+
+The legacy function reproduces the original get_saas_metrics loops (one pass
+per metric, datetime.fromtimestamp per element), with "last month" taken as of
+30 days ago like the mirror. The vectorized path builds
+the dataframes once and computes the same aggregates, then the cohort,
+revenue-by-plan and churn-curve analytics.
+
+Usage (from ml_service/):
+    python -m benchmarks.bench_subscription_analytics [--sizes 10000 100000]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.fixtures import build_subscriptions
+from utils.subscription_analytics import (
+    compute_saas_aggregates,
+    invoices_frame,
+    subscription_analytics,
+    subscriptions_frame,
+)
+
+
+def legacy_aggregates(subs: List[Dict[str, Any]], invoices: List[Tuple[int, int]], now: datetime) -> Dict[str, Any]:
+    """The original list-comprehension implementation, over analytics records"""
+    active_subs = [s for s in subs if s["status"] in ("active", "trialing", "past_due")]
+    canceled_subs = [s for s in subs if s["status"] == "canceled"]
+    mrr = sum(s["monthly_amount"] for s in active_subs) / 100
+
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    last_30 = now - timedelta(days=30)
+    all_earnings = sum(amount for _, amount in invoices) / 100
+    earnings_this_month = sum(
+        amount for created, amount in invoices if datetime.fromtimestamp(created, tz=timezone.utc) >= start_of_month
+    ) / 100
+    earnings_last_30 = sum(
+        amount for created, amount in invoices if datetime.fromtimestamp(created, tz=timezone.utc) >= last_30
+    ) / 100
+
+    by_month: Dict[str, int] = {}
+    for s in subs:
+        label = datetime.fromtimestamp(s["created"], tz=timezone.utc).strftime("%Y-%m")
+        by_month[label] = by_month.get(label, 0) + 1
+
+    new_this_month = sum(
+        1 for s in subs
+        if datetime.fromtimestamp(s["created"], tz=timezone.utc) >= start_of_month and s["status"] in ("active", "trialing")
+    )
+    new_last_30 = sum(
+        1 for s in subs
+        if datetime.fromtimestamp(s["created"], tz=timezone.utc) >= last_30 and s["status"] in ("active", "trialing")
+    )
+    churned_this_month = sum(
+        1 for s in subs
+        if s["canceled_at"] and datetime.fromtimestamp(s["canceled_at"], tz=timezone.utc) >= start_of_month
+    )
+    created_last_30 = sum(1 for s in subs if datetime.fromtimestamp(s["created"], tz=timezone.utc) >= last_30)
+
+    recent_canceled = [
+        {"customer_email": s["customer_email"], "canceled_at": s["canceled_at"], "price_id": s["price_id"]}
+        for s in canceled_subs[:20]
+    ]
+
+    one_month_ago = now - timedelta(days=30)
+    subs_last_month = [s for s in subs if datetime.fromtimestamp(s["created"], tz=timezone.utc) < one_month_ago]
+    active_last_month = [
+        s for s in subs_last_month
+        if s["status"] in ("active", "trialing", "past_due")
+        or (
+            s["status"] == "canceled" and s["canceled_at"]
+            and datetime.fromtimestamp(s["canceled_at"], tz=timezone.utc) >= one_month_ago
+        )
+    ]
+    churned_last_month = [
+        s for s in subs
+        if s["canceled_at"]
+        and one_month_ago - timedelta(days=30) <= datetime.fromtimestamp(s["canceled_at"], tz=timezone.utc) < one_month_ago
+    ]
+
+    return {
+        "mrr": mrr,
+        "all_earnings": all_earnings,
+        "earnings_this_month": earnings_this_month,
+        "earnings_last_30": earnings_last_30,
+        "active_count": len(active_subs),
+        "total_count": len(subs),
+        "new_this_month": new_this_month,
+        "new_last_30": new_last_30,
+        "churned_this_month": churned_this_month,
+        "created_last_30": created_last_30,
+        "by_month": by_month,
+        "recent_canceled": recent_canceled,
+        "mrr_last_month": sum(s["monthly_amount"] for s in active_last_month) / 100,
+        "active_last_month": len(active_last_month),
+        "churned_last_month": len(churned_last_month),
+    }
+
+
+def _best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(sizes: List[int], repeat: int = 3) -> Dict[int, Dict[str, float]]:
+    """Run the benchmark and return timings in ms keyed by subscription count"""
+    now = datetime.now(timezone.utc)
+    results: Dict[int, Dict[str, float]] = {}
+
+    for n in sizes:
+        subs, invoices = build_subscriptions(n, int(now.timestamp()))
+
+        def vectorized():
+            return compute_saas_aggregates(subscriptions_frame(subs), invoices_frame(invoices), now)
+
+        frame = subscriptions_frame(subs)
+        results[n] = {
+            "invoices": len(invoices),
+            "legacy_metrics_ms": _best_ms(lambda: legacy_aggregates(subs, invoices, now), repeat),
+            "vectorized_metrics_ms": _best_ms(vectorized, repeat),
+            "analytics_ms": _best_ms(lambda: subscription_analytics(frame, now), repeat),
+        }
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for n, r in run(args.sizes, args.repeat).items():
+        legacy = r["legacy_metrics_ms"]
+        vectorized = r["vectorized_metrics_ms"]
+        print(f"{n} subscriptions, {r['invoices']} invoices")
+        print(f"  metrics: legacy {legacy:8.1f} ms | pandas {vectorized:8.1f} ms | {legacy / vectorized:5.1f}x")
+        print(f"  cohorts + revenue by plan + churn curve: {r['analytics_ms']:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
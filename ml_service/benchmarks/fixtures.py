@@ -0,0 +1,288 @@
+"""Realistic plan payloads, quiz requests and subscription records for benchmarks"""
+
+import random
+from typing import Any, Dict, List, Tuple
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+_EXERCISES = [
+    ("Barbell Bench Press", "compound", ["chest", "triceps", "shoulders"], ["barbell", "bench"]),
+    ("Barbell Back Squat", "compound", ["quads", "glutes", "core"], ["barbell", "rack"]),
+    ("Romanian Deadlift", "compound", ["hamstrings", "glutes", "lower back"], ["barbell"]),
+    ("Pull-ups", "compound", ["lats", "biceps", "rear delts"], ["pull-up bar"]),
+    ("Dumbbell Shoulder Press", "compound", ["shoulders", "triceps"], ["dumbbells", "bench"]),
+    ("Walking Lunges", "compound", ["quads", "glutes"], ["dumbbells"]),
+    ("Cable Face Pull", "isolation", ["rear delts", "rotator cuff"], ["cable machine", "rope"]),
+    ("Plank", "isolation", ["core"], []),
+]
+
+
+def _exercise(index: int) -> Dict[str, Any]:
+    name, category, muscles, equipment = _EXERCISES[index % len(_EXERCISES)]
+    return {
+        "name": name,
+        "category": category,
+        "sets": 4,
+        "reps": "8-10",
+        "rest_seconds": 90,
+        "tempo": "2-0-2-0",
+        "instructions": (
+            "Set up with a neutral spine and braced core. Lower under control for two "
+            "seconds, pause briefly, then drive through the full range of motion. Keep "
+            "form strict and stop the set two reps shy of failure."
+        ),
+        "muscle_groups": muscles,
+        "difficulty": "intermediate",
+        "equipment_needed": equipment,
+        "alternatives": {
+            "home": "Push-ups with elevation",
+            "outdoor": "Decline push-ups on bench",
+            "easier": "Dumbbell variation with lighter load",
+            "harder": "Paused or tempo variation",
+        },
+        "progression": "Add 2.5kg when you hit 4x10 with good form",
+        "safety_notes": "Keep shoulder blades retracted, avoid flaring elbows",
+    }
+
+
+def build_workout_plan(days: int = 7, exercises_per_day: int = 6) -> Dict[str, Any]:
+    """Build a workout plan dict matching WORKOUT_PLAN_JSON_FORMAT"""
+    weekly_plan: List[Dict[str, Any]] = []
+    for d in range(days):
+        weekly_plan.append({
+            "day": DAYS[d % 7],
+            "workout_type": "Upper Body Strength" if d % 2 == 0 else "Lower Body Strength",
+            "training_location": "Gym",
+            "focus": "Chest, Back, Shoulders",
+            "duration_minutes": 60,
+            "intensity": "Moderate-High",
+            "exercises": [_exercise(d + i) for i in range(exercises_per_day)],
+            "warmup": {
+                "duration_minutes": 10,
+                "activities": [
+                    "5 min light cardio (treadmill/bike)",
+                    "Arm circles: 10 each direction",
+                    "Band pull-aparts: 2x15",
+                    "Push-up plus: 2x10",
+                    "Specific warm-up sets for first exercise",
+                ],
+            },
+            "cooldown": {
+                "duration_minutes": 10,
+                "activities": [
+                    "Child's pose: 60 seconds",
+                    "Chest doorway stretch: 60s each side",
+                    "Shoulder dislocations with band: 2x10",
+                    "Deep breathing exercises: 3 minutes",
+                ],
+            },
+            "estimated_calories_burned": 350,
+            "rpe_target": "7-8 out of 10",
+            "success_criteria": "Complete all sets with good form, feel muscle engagement",
+            "if_low_energy": "Reduce sets by 25%, maintain intensity on key lifts",
+            "optional": d >= 5,
+            "if_feeling_good": None,
+        })
+
+    return {
+        "weekly_plan": weekly_plan,
+        "weekly_summary": {
+            "total_workout_days": days,
+            "strength_days": 3,
+            "cardio_days": 2,
+            "rest_days": max(0, 7 - days),
+            "total_time_minutes": 60 * days,
+            "total_exercises": exercises_per_day * days,
+            "difficulty_level": "hard",
+            "estimated_weekly_calories_burned": 350 * days,
+            "training_split": "Upper/Lower/Full Body + Conditioning",
+            "progression_strategy": "Linear progression with deload every 4th week",
+        },
+        "periodization_plan": {
+            "week_1_2": "Adaptation: Focus on form, establish baseline",
+            "week_3_4": "Build: Increase load 5-10%, maintain volume",
+            "week_5_6": "Peak: Max volume, push intensity",
+            "week_7": "Deload: Reduce volume by 40%, maintain intensity",
+            "week_8_plus": "Repeat cycle with higher baseline",
+        },
+        "personalized_tips": [
+            "Prioritise 7-9 hours of sleep to support recovery",
+            "Given stress level 6/10, add one extra mobility session",
+            "Train early in the day to work around a desk job",
+        ],
+        "nutrition_timing": {
+            "pre_workout": "Eat 1-2 hours before, focus on carbs + moderate protein",
+            "post_workout": "Within 2 hours, protein + carbs for recovery",
+            "rest_days": "Maintain protein, slightly lower carbs",
+            "hydration": "Drink 500ml 2 hours before, sip during workout",
+        },
+    }
+
+
+def build_meal_plan(meals: int = 4, foods_per_meal: int = 5) -> Dict[str, Any]:
+    """Build a meal plan dict matching MEAL_PLAN_JSON_FORMAT"""
+    meal_types = ["breakfast", "lunch", "dinner", "snack"]
+    return {
+        "meals": [
+            {
+                "meal_type": meal_types[m % len(meal_types)],
+                "meal_name": "Mediterranean Power Bowl",
+                "prep_time_minutes": 20,
+                "difficulty": "easy",
+                "meal_timing": "12:00 PM - 1:00 PM",
+                "total_calories": 620,
+                "total_protein": 42,
+                "total_carbs": 58,
+                "total_fats": 22,
+                "total_fiber": 9,
+                "tags": ["high-protein", "quick", "gut-friendly"],
+                "foods": [
+                    {
+                        "name": f"Ingredient {f}",
+                        "portion": "150g",
+                        "grams": 150,
+                        "calories": 124,
+                        "protein": 8.4,
+                        "carbs": 11.6,
+                        "fats": 4.4,
+                        "fiber": 1.8,
+                    }
+                    for f in range(foods_per_meal)
+                ],
+                "recipe": (
+                    "Rinse the quinoa and simmer for 15 minutes. Meanwhile season the chicken "
+                    "with oregano, lemon and garlic and grill for 6 minutes per side. Slice, "
+                    "then assemble the bowl with cucumber, tomato, feta and a spoon of hummus."
+                ),
+                "tips": [
+                    "Cook a double batch of quinoa for tomorrow's lunch",
+                    "Swap chicken for chickpeas to make it vegetarian",
+                ],
+            }
+            for m in range(meals)
+        ],
+        "daily_totals": {
+            "calories": 2200,
+            "protein": 165,
+            "carbs": 230,
+            "fats": 70,
+            "fiber": 25,
+            "variance": "± 5%",
+        },
+        "hydration_plan": {
+            "daily_water_intake": "3–4 liters (12–16 cups)",
+            "timing": ["Morning: 2 glasses upon waking", "With meals: 1 glass each"],
+            "electrolyte_needs": "Add electrolytes if exercising >60 min or in hot climate",
+        },
+        "shopping_list": {
+            "proteins": ["Chicken breast 1.2kg", "Greek yogurt 1kg", "Eggs x18"],
+            "vegetables": ["Spinach", "Cucumber", "Cherry tomatoes", "Bell peppers"],
+            "carbs": ["Quinoa", "Oats", "Sweet potatoes"],
+            "fats": ["Olive oil", "Almonds", "Avocado"],
+            "pantry_staples": ["Oregano", "Garlic", "Lemon", "Hummus"],
+            "estimated_cost": "$80-100 per week",
+        },
+    }
+
+
+def build_quiz_answers(imperial: bool = False) -> Dict[str, Any]:
+    """Build a complete quiz answers payload as the frontend sends it"""
+    if imperial:
+        height = {"ft": 5, "inch": 10}
+        current_weight, target_weight = {"lbs": 190}, {"lbs": 170}
+        neck, waist, hip = {"ft": 0, "inch": 15.5}, {"ft": 2, "inch": 10}, {"ft": 3, "inch": 3}
+    else:
+        height = {"cm": 178}
+        current_weight, target_weight = {"kg": 86}, {"kg": 77}
+        neck, waist, hip = {"cm": 39}, {"cm": 86}, {"cm": 99}
+
+    return {
+        "age": "34",
+        "gender": "Male",
+        "country": "United Kingdom",
+        "height": height,
+        "currentWeight": current_weight,
+        "targetWeight": target_weight,
+        "neck": neck,
+        "waist": waist,
+        "hip": hip,
+        "mainGoal": "Weight loss",
+        "secondaryGoals": ["Improve strength", "Better sleep", "More energy"],
+        "timeFrame": "6 months",
+        "bodyType": "Endomorph",
+        "lifestyle": "Busy professional with two young children",
+        "occupation_activity": "Desk job, mostly sedentary",
+        "groceryBudget": "Moderate",
+        "dietaryStyle": "Mediterranean",
+        "mealsPerDay": "4",
+        "motivationLevel": 8,
+        "stressLevel": 6,
+        "sleepQuality": "Fair",
+        "healthConditions": ["Mild hypertension", "Lower back pain"],
+        "healthConditions_other": "Occasional migraines",
+        "medications": "Lisinopril 10mg",
+        "injuries": "Old left knee ligament sprain",
+        "foodAllergies": "Shellfish",
+        "exerciseFrequency": "3-4 times/week",
+        "preferredExercise": ["Weight training", "Cycling", "Swimming"],
+        "trainingEnvironment": ["Gym", "Outdoor"],
+        "equipment": ["Barbell", "Dumbbells", "Cable machine", "Pull-up bar"],
+        "dislikedFoods": "Mushrooms, olives, blue cheese",
+        "cookingSkill": "Intermediate",
+        "cookingTime": "30-45 minutes",
+        "challenges": ["Late-night snacking", "Eating out for work", "Inconsistent schedule"],
+    }
+
+
+def build_generate_plans_request(imperial: bool = False) -> Dict[str, Any]:
+    """Build a /generate-plans request body"""
+    return {
+        "user_id": "5f0c6a0e-8a43-4c1e-9d6f-2f1f3b7f9a10",
+        "quiz_result_id": "a3b7f1d2-64c9-4f0e-8b1a-0d9e2c4f6a85",
+        "answers": build_quiz_answers(imperial),
+        "ai_provider": "openai",
+        "model_name": "gpt-4o-mini",
+    }
+
+
+_PLANS = [("price_basic", "Basic", 999), ("price_pro", "Pro", 1999), ("price_team", "Team", 4999)]
+_SUB_STATUSES = ["active"] * 6 + ["trialing", "past_due", "canceled", "canceled", "canceled", "incomplete_expired"]
+
+
+def build_subscriptions(n: int, now: int, seed: int = 7, years: int = 3) -> Tuple[List[Dict[str, Any]], List[Tuple[int, int]]]:
+    """
+    Build synthetic subscription records and (created, amount_paid) invoices.
+
+    Records have the analytics SUBSCRIPTION_COLUMNS fields; creation times are
+    spread over the last `years` years, newest first like Stripe list order.
+    """
+    rng = random.Random(seed)
+    span = years * 365 * 86400
+    subscriptions: List[Dict[str, Any]] = []
+    invoices: List[Tuple[int, int]] = []
+
+    for i in range(n):
+        created = now - rng.randrange(span)
+        status = rng.choice(_SUB_STATUSES)
+        price_id, plan, amount = rng.choice(_PLANS)
+        canceled_at = None
+        if status == "canceled" or (status == "active" and rng.random() < 0.05):
+            canceled_at = rng.randrange(created, now)
+        subscriptions.append({
+            "subscription_id": f"sub_{i:07d}",
+            "status": status,
+            "created": created,
+            "canceled_at": canceled_at,
+            "monthly_amount": amount,
+            "price_id": price_id,
+            "plan": plan,
+            "customer_email": f"user{i}@example.com",
+        })
+        end = canceled_at or now
+        for paid_at in range(created, end, 30 * 86400):
+            invoices.append((paid_at, amount))
+            if len(invoices) >= n * 4:
+                break
+
+    subscriptions.sort(key=lambda s: s["created"], reverse=True)
+    return subscriptions, invoices
@@ -0,0 +1,449 @@
+"""
+End-to-end load test: quiz completions against a running service.
+
+Each simulated quiz completion POSTs a realistic GeneratePlansRequest to
+/generate-plans, then polls /plan-status/{user_id} until both plans are
+completed or failed, like the frontend does. Quizzes arrive open-loop at
+--rate per second (Poisson), so a slow server builds a backlog instead of
+silently lowering the offered load. Meanwhile the harness:
+
+- probes /health every 100 ms; its latency is a proxy for event-loop lag;
+- scrapes /metrics every second: DB pool acquire wait, timeouts and in-use
+  connections, generation tasks in flight, background queue depth. Behind
+  several workers (server.py) each scrape reaches one of them, so counters
+  are diffed per worker label and summed; gauge peaks are per worker;
+- reads the mock provider's /mock/stats when --mock-url is given.
+
+Setup (from ml_service/):
+    python -m benchmarks.mock_llm --port 9100 &
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://localhost:9100/v1 uvicorn app:app --port 8000 &
+    python -m benchmarks.load_generate_plans --seed 500        # profiles + quiz rows in the app DB
+    python -m benchmarks.load_generate_plans --rate 5 --duration 60 \\
+        --mock-url http://localhost:9100 --output load-5rps.json
+    python -m benchmarks.load_generate_plans --rate 5 --duration 60 --compare load-5rps.json
+    python -m benchmarks.load_generate_plans --cleanup
+
+Seeded users are on a 'loadtest' plan with an effectively unlimited quota and
+are identified by @loadtest.invalid emails. Every quiz needs its own seeded
+user (plan status is per user), so seed at least rate x duration.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.fixtures import build_quiz_answers
+
+EMAIL_DOMAIN = "loadtest.invalid"
+LOADTEST_PLAN = "loadtest"
+HEALTH_PROBE_INTERVAL_S = 0.1
+METRICS_SCRAPE_INTERVAL_S = 1.0
+# Scrapes right before and after the run, so every worker is likely seen at both ends
+BOUNDARY_SCRAPES = 8
+
+
+# --- database seeding ---------------------------------------------------------
+
+async def _connect():
+    import asyncpg
+
+    from config.settings import settings
+
+    return await asyncpg.connect(
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        database=settings.DB_NAME
+    )
+
+
+async def seed(count: int) -> int:
+    """Create `count` load-test users, each with one quiz_results row"""
+    conn = await _connect()
+    try:
+        await conn.execute(
+            """
+            INSERT INTO plans (id, name, price_cents, monthly_ai_generations, description, is_active)
+            VALUES ($1, 'Load test', 0, 1000000, 'Synthetic load-test users', false)
+            ON CONFLICT (id) DO NOTHING
+            """,
+            LOADTEST_PLAN
+        )
+        rows = await conn.fetch(
+            """
+            WITH users AS (
+                INSERT INTO profiles (id, email, plan_id, onboarding_completed)
+                SELECT gen_random_uuid(), 'user' || g || '-' || md5(random()::text) || '@' || $2, $3, true
+                FROM generate_series(1, $1) g
+                RETURNING id
+            )
+            INSERT INTO quiz_results (user_id, answers)
+            SELECT id, $4::jsonb FROM users
+            RETURNING id
+            """,
+            count, EMAIL_DOMAIN, LOADTEST_PLAN, json.dumps(build_quiz_answers())
+        )
+        return len(rows)
+    finally:
+        await conn.close()
+
+
+async def unused_quizzes(limit: int) -> List[Tuple[str, str]]:
+    """(user_id, quiz_result_id) pairs of seeded users with no plan generation yet"""
+    conn = await _connect()
+    try:
+        rows = await conn.fetch(
+            """
+            SELECT q.user_id::text, q.id::text
+            FROM quiz_results q
+            JOIN profiles p ON p.id = q.user_id
+            WHERE p.email LIKE '%@' || $1
+              AND NOT EXISTS (SELECT 1 FROM ai_meal_plans m WHERE m.user_id = q.user_id)
+            LIMIT $2
+            """,
+            EMAIL_DOMAIN, limit
+        )
+        return [(r[0], r[1]) for r in rows]
+    finally:
+        await conn.close()
+
+
+async def cleanup() -> int:
+    """Delete every load-test user and the rows that reference them"""
+    conn = await _connect()
+    try:
+        async with conn.transaction():
+            users = "SELECT id FROM profiles WHERE email LIKE '%@' || $1"
+            for table in ("plan_versions", "ai_meal_plans", "ai_workout_plans", "quiz_results"):
+                await conn.execute(f"DELETE FROM {table} WHERE user_id IN ({users})", EMAIL_DOMAIN)
+            result = await conn.execute("DELETE FROM profiles WHERE email LIKE '%@' || $1", EMAIL_DOMAIN)
+        return int(result.split()[-1])
+    finally:
+        await conn.close()
+
+
+# --- measurement ----------------------------------------------------------------
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """count, p50/p90/p99/max of a list (nearest-rank)"""
+    if not values:
+        return {"count": 0, "p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+    return {"count": len(ordered), "p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "max": round(ordered[-1], 4)}
+
+
+def parse_metrics(text: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    """Prometheus text format -> {(name, sorted labels): value}"""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        head, _, value = line.rpartition(" ")
+        name, _, label_text = head.partition("{")
+        labels = []
+        for pair in label_text.rstrip("}").split('",') if label_text else []:
+            key, _, val = pair.partition("=")
+            labels.append((key, val.strip('"')))
+        samples[(name, tuple(sorted(labels)))] = float(value)
+    return samples
+
+
+def _metric_sum(samples: Dict, name: str, **labels: str) -> float:
+    return sum(
+        value for (sample, sample_labels), value in samples.items()
+        if sample == name and all((k, v) in sample_labels for k, v in labels.items())
+    )
+
+
+def _worker(samples: Dict) -> str:
+    """worker label of a scrape ('' for a single-process server)"""
+    for _, sample_labels in samples:
+        return dict(sample_labels).get("worker", "")
+    return ""
+
+
+class LoadRun:
+    """One open-loop run; every quiz completion is its own task"""
+
+    def __init__(self, args: argparse.Namespace, quizzes: List[Tuple[str, str]]):
+        self.args = args
+        self.quizzes = quizzes
+        self.client = httpx.AsyncClient(
+            base_url=args.base_url,
+            timeout=args.request_timeout,
+            limits=httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+        )
+        self.submit_latency: List[float] = []
+        self.poll_latency: List[float] = []
+        self.time_to_plans: List[float] = []
+        self.health_latency: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {"completed": 0, "failed": 0, "timed_out": 0, "rejected": 0}
+        self.peaks: Dict[str, float] = {}
+        # worker -> its first and latest scrape
+        self.metrics_start: Dict[str, Dict] = {}
+        self.metrics_end: Dict[str, Dict] = {}
+        self._running = True
+
+    def _count_status(self, endpoint: str, status: Any) -> None:
+        key = f"{endpoint} {status}"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    async def quiz(self, user_id: str, quiz_result_id: str) -> None:
+        body = {
+            "user_id": user_id,
+            "quiz_result_id": quiz_result_id,
+            "answers": build_quiz_answers(imperial=random.random() < 0.3),
+            "ai_provider": self.args.provider,
+            "model_name": self.args.model,
+        }
+        start = time.perf_counter()
+        try:
+            response = await self.client.post("/generate-plans", json=body)
+            status: Any = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.submit_latency.append(time.perf_counter() - start)
+        self._count_status("POST /generate-plans", status)
+        if status != 200:
+            self.outcomes["rejected"] += 1
+            return
+
+        deadline = start + self.args.plan_timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.args.poll_interval)
+            poll_start = time.perf_counter()
+            try:
+                response = await self.client.get(f"/plan-status/{user_id}")
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            self.poll_latency.append(time.perf_counter() - poll_start)
+            self._count_status("GET /plan-status", status)
+            if status != 200:
+                continue
+            data = response.json()
+            states = {data["meal_plan_status"], data["workout_plan_status"]}
+            if states <= {"completed", "failed"}:
+                self.outcomes["failed" if "failed" in states else "completed"] += 1
+                self.time_to_plans.append(time.perf_counter() - start)
+                return
+        self.outcomes["timed_out"] += 1
+
+    async def health_probe(self) -> None:
+        while self._running:
+            start = time.perf_counter()
+            try:
+                await self.client.get("/health")
+                self.health_latency.append(time.perf_counter() - start)
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(HEALTH_PROBE_INTERVAL_S)
+
+    async def scrape(self) -> Dict:
+        try:
+            # A fresh connection, so scrapes are spread over the workers
+            response = await self.client.get("/metrics", headers={"Connection": "close"})
+        except httpx.HTTPError:
+            return {}
+        samples = parse_metrics(response.text) if response.status_code == 200 else {}
+        if samples:
+            worker = _worker(samples)
+            self.metrics_start.setdefault(worker, samples)
+            self.metrics_end[worker] = samples
+        return samples
+
+    def _peak(self, key: str, value: float) -> None:
+        self.peaks[key] = max(self.peaks.get(key, 0), value)
+
+    async def metrics_sampler(self) -> None:
+        while self._running:
+            samples = await self.scrape()
+            if samples:
+                self._peak("db_pool_in_use", _metric_sum(samples, "db_pool_connections", pool="primary", state="in_use"))
+                self._peak("generation_tasks_in_flight", _metric_sum(samples, "generation_tasks_in_flight"))
+                self._peak("http_requests_in_flight", _metric_sum(samples, "http_requests_in_flight"))
+                self._peak("background_queue_depth", _metric_sum(samples, "background_queue_depth"))
+            await asyncio.sleep(METRICS_SCRAPE_INTERVAL_S)
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        for _ in range(BOUNDARY_SCRAPES):
+            await self.scrape()
+        mock_start = await self._mock_stats()
+        background = [asyncio.create_task(self.health_probe()), asyncio.create_task(self.metrics_sampler())]
+
+        tasks = []
+        started = time.perf_counter()
+        for user_id, quiz_result_id in self.quizzes:
+            if time.perf_counter() - started >= args.duration:
+                break
+            tasks.append(asyncio.create_task(self.quiz(user_id, quiz_result_id)))
+            await asyncio.sleep(random.expovariate(args.rate))
+        offered_s = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+        elapsed_s = time.perf_counter() - started
+
+        self._running = False
+        await asyncio.gather(*background, return_exceptions=True)
+        for _ in range(BOUNDARY_SCRAPES):
+            await self.scrape()
+        mock_end = await self._mock_stats()
+        await self.client.aclose()
+        return self.summary(len(tasks), offered_s, elapsed_s, mock_start, mock_end)
+
+    async def _mock_stats(self) -> Optional[Dict[str, Any]]:
+        if not self.args.mock_url:
+            return None
+        try:
+            async with httpx.AsyncClient(base_url=self.args.mock_url, timeout=5) as client:
+                return (await client.get("/mock/stats")).json()
+        except httpx.HTTPError:
+            return None
+
+    def _delta(self, name: str, **labels: str) -> float:
+        """Counter increase over the run, per worker then summed (a worker first seen late undercounts)"""
+        return sum(
+            _metric_sum(end, name, **labels) - _metric_sum(self.metrics_start[worker], name, **labels)
+            for worker, end in self.metrics_end.items()
+        )
+
+    def summary(self, quizzes: int, offered_s: float, elapsed_s: float, mock_start: Optional[Dict], mock_end: Optional[Dict]) -> Dict[str, Any]:
+        acquires = self._delta("db_pool_acquire_wait_seconds_count", pool="primary")
+        errors = sum(count for key, count in self.statuses.items() if not key.endswith(" 200"))
+        requests = sum(self.statuses.values())
+        result: Dict[str, Any] = {
+            "quizzes": quizzes,
+            "offered_rate": round(quizzes / offered_s, 3) if offered_s else 0,
+            "completed_rate": round(self.outcomes["completed"] / elapsed_s, 3) if elapsed_s else 0,
+            "elapsed_s": round(elapsed_s, 2),
+            "outcomes": self.outcomes,
+            "error_rate": round(errors / requests, 4) if requests else 0,
+            "http_status": dict(sorted(self.statuses.items())),
+            "latency_s": {
+                "generate_plans": percentiles(self.submit_latency),
+                "plan_status": percentiles(self.poll_latency),
+                "time_to_plans": percentiles(self.time_to_plans),
+                "health_probe": percentiles(self.health_latency),
+            },
+            "server": {
+                "db_pool_acquires": int(acquires),
+                "db_pool_acquire_wait_mean_ms": round(
+                    self._delta("db_pool_acquire_wait_seconds_sum", pool="primary") / acquires * 1000, 3
+                ) if acquires else None,
+                "db_pool_acquire_timeouts": int(self._delta("db_pool_acquire_timeouts_total")),
+                "ai_errors": int(self._delta("ai_errors_total")),
+                "peaks": self.peaks,
+                "workers_scraped": len(self.metrics_end),
+            } if self.metrics_end else None,
+        }
+        if mock_start and mock_end:
+            result["provider"] = {
+                key: mock_end[key] - mock_start.get(key, 0)
+                for key in ("requests", "completed", "rate_limited", "errors", "output_tokens")
+            }
+            result["provider"]["max_in_flight"] = mock_end["max_in_flight"]
+        return result
+
+
+# --- reporting ------------------------------------------------------------------
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """Print every numeric result next to a previous run's"""
+    print(f"\nvs {previous['meta'].get('commit')} ({previous['meta'].get('recorded_at')}):")
+    before, after = _flatten(previous["results"]), _flatten(current["results"])
+    for key, value in after.items():
+        if key in before and before[key] != value:
+            change = f"{(value - before[key]) / before[key]:+.1%}" if before[key] else "new"
+            print(f"  {key:<48} {before[key]:>12} -> {value:<12} {change}")
+
+
+async def _run(args: argparse.Namespace) -> int:
+    if args.cleanup:
+        print(f"Deleted {await cleanup()} load-test users")
+        return 0
+    if args.seed:
+        print(f"Seeded {await seed(args.seed)} load-test users with quiz results")
+        return 0
+
+    needed = int(args.rate * args.duration * 1.5) + 10
+    quizzes = await unused_quizzes(needed)
+    if len(quizzes) < args.rate * args.duration:
+        print(f"Only {len(quizzes)} unused seeded quizzes for ~{int(args.rate * args.duration)} arrivals; "
+              f"run with --seed {needed}", file=sys.stderr)
+        return 1
+
+    results = await LoadRun(args, quizzes).run()
+    document = {
+        "meta": {
+            "commit": _commit(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "seed", "cleanup")},
+        },
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), document)
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+        print(f"\nSaved to {args.output}")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=2.0, help="quiz completions per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="plan-status poll interval per quiz")
+    parser.add_argument("--plan-timeout", type=float, default=300.0, help="give up on a quiz after this long")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--mock-url", help="mock provider base URL, for provider-side counters")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--seed", type=int, help="create this many load-test users and exit")
+    parser.add_argument("--cleanup", action="store_true", help="delete all load-test users and exit")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
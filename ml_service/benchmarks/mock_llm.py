@@ -0,0 +1,327 @@
+"""
+Local stand-in for the OpenAI and Anthropic APIs.
+
+Serves POST /v1/chat/completions and POST /v1/messages in the providers' wire
+formats, streamed (SSE) or not, with a canned meal or workout plan as the
+completion. Latency is shaped by a time-to-first-token and a token rate, and
+a share of requests can be failed with 429 (Retry-After) or 5xx errors, or
+rejected above a concurrency limit, the way providers throttle. Nothing is
+generated: CPU cost per request is a few JSON dumps, so one mock can drive
+many service instances.
+
+Point the service at it (API keys only need to be non-empty):
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://localhost:9100/v1
+    ANTHROPIC_API_KEY=mock ANTHROPIC_BASE_URL=http://localhost:9100
+
+Usage (from ml_service/):
+    python -m benchmarks.mock_llm [--port 9100] [--ttft-ms 400] [--tokens-per-s 150]
+        [--rate-limit-rate 0.02] [--error-rate 0.005] [--max-concurrency 64]
+
+GET /mock/stats returns request counters; POST /mock/stats/reset clears them.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+from benchmarks.fixtures import build_meal_plan, build_workout_plan
+from utils.serialization import dumps
+
+CHARS_PER_TOKEN = 4
+STREAM_TICK_S = 0.02
+
+
+@dataclass
+class MockConfig:
+    """Response shaping, shared by both wire formats"""
+
+    ttft_ms: float = 400.0
+    tokens_per_s: float = 150.0
+    rate_limit_rate: float = 0.0
+    error_rate: float = 0.0
+    max_concurrency: int = 0  # 0 = unlimited; above it requests get 429
+    retry_after_s: float = 1.0
+    fence: bool = True  # wrap the JSON in ```json like most models do
+    meal_plan_file: Optional[str] = None
+    workout_plan_file: Optional[str] = None
+    seed: Optional[int] = None
+
+
+class _Stats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.streamed = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.output_tokens = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+def _load_plan(path: Optional[str], default: Dict[str, Any]) -> str:
+    plan = json.loads(Path(path).read_text()) if path else default
+    return json.dumps(plan, indent=2)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    """Build the mock provider app"""
+    config = config or MockConfig()
+    rng = random.Random(config.seed)
+    stats = _Stats()
+    meal_json = _load_plan(config.meal_plan_file, build_meal_plan(meals=5, foods_per_meal=6))
+    workout_json = _load_plan(config.workout_plan_file, build_workout_plan(days=5, exercises_per_day=6))
+
+    app = FastAPI(title="Mock LLM provider", default_response_class=ORJSONResponse)
+
+    def completion_for(prompt: str) -> str:
+        # The workout JSON format asks for weekly_plan; anything else gets the meal plan
+        body = workout_json if "weekly_plan" in prompt else meal_json
+        return f"```json\n{body}\n```" if config.fence else body
+
+    def injected_failure(provider: str) -> Optional[ORJSONResponse]:
+        """429/5xx as the provider would send it, or None to serve the request"""
+        if config.max_concurrency and stats.in_flight > config.max_concurrency:
+            status = 429
+        elif rng.random() < config.rate_limit_rate:
+            status = 429
+        elif rng.random() < config.error_rate:
+            status = 529 if provider == "anthropic" else 500
+        else:
+            return None
+
+        if status == 429:
+            stats.rate_limited += 1
+            error_type = "rate_limit_error" if provider == "anthropic" else "rate_limit_exceeded"
+            message = "Rate limit reached (mock)"
+        else:
+            stats.errors += 1
+            error_type = "overloaded_error" if provider == "anthropic" else "server_error"
+            message = "Upstream error (mock)"
+
+        if provider == "anthropic":
+            content = {"type": "error", "error": {"type": error_type, "message": message}}
+        else:
+            content = {"error": {"message": message, "type": error_type, "param": None, "code": error_type}}
+        headers = {"retry-after": str(config.retry_after_s)} if status == 429 else {}
+        return ORJSONResponse(content, status_code=status, headers=headers)
+
+    async def paced(text: str) -> AsyncIterator[str]:
+        """Yield text in chunks: first after ttft, then at tokens_per_s"""
+        await asyncio.sleep(config.ttft_ms / 1000)
+        chars_per_s = config.tokens_per_s * CHARS_PER_TOKEN
+        position = 0
+        last = time.perf_counter()
+        while position < len(text):
+            # At least one token per chunk so the first chunk is sent right at ttft
+            now = time.perf_counter()
+            size = max(CHARS_PER_TOKEN, int((now - last) * chars_per_s))
+            last = now
+            yield text[position:position + size]
+            position += size
+            if position < len(text):
+                await asyncio.sleep(STREAM_TICK_S)
+
+    async def full_latency(text: str) -> None:
+        await asyncio.sleep(config.ttft_ms / 1000 + _tokens(text) / config.tokens_per_s)
+
+    def tracked(stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        async def wrapper() -> AsyncIterator[str]:
+            try:
+                async for item in stream:
+                    yield item
+                stats.completed += 1
+            finally:
+                stats.in_flight -= 1
+        return wrapper()
+
+    def begin() -> None:
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        begin()
+        failure = injected_failure("openai")
+        if failure:
+            stats.in_flight -= 1
+            return failure
+
+        model = body.get("model", "gpt-4o-mini")
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = completion_for(prompt)
+        usage = {"prompt_tokens": _tokens(prompt), "completion_tokens": _tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        stats.output_tokens += usage["completion_tokens"]
+        completion_id = f"chatcmpl-mock{uuid.uuid4().hex[:20]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            try:
+                await full_latency(text)
+                stats.completed += 1
+            finally:
+                stats.in_flight -= 1
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        stats.streamed += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None, chunk_usage: Any = None) -> str:
+            choices = [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else []
+            return "data: " + dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                "usage": chunk_usage,
+            }) + "\n\n"
+
+        async def events() -> AsyncIterator[str]:
+            first = True
+            async for piece in paced(text):
+                delta = {"role": "assistant", "content": piece} if first else {"content": piece}
+                first = False
+                yield chunk(delta)
+            yield chunk({}, "stop")
+            if include_usage:
+                yield chunk(None, chunk_usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(tracked(events()), media_type="text/event-stream")
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        begin()
+        failure = injected_failure("anthropic")
+        if failure:
+            stats.in_flight -= 1
+            return failure
+
+        model = body.get("model", "claude-3-5-sonnet-20241022")
+        prompt = "\n".join(
+            m["content"] if isinstance(m.get("content"), str)
+            else " ".join(part.get("text", "") for part in m.get("content", []))
+            for m in body.get("messages", [])
+        )
+        text = completion_for(prompt)
+        input_tokens, output_tokens = _tokens(prompt), _tokens(text)
+        stats.output_tokens += output_tokens
+        message_id = f"msg_mock{uuid.uuid4().hex[:20]}"
+        message = {
+            "id": message_id,
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [],
+            "stop_reason": None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": 0},
+        }
+
+        if not body.get("stream"):
+            try:
+                await full_latency(text)
+                stats.completed += 1
+            finally:
+                stats.in_flight -= 1
+            return {
+                **message,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+            }
+
+        stats.streamed += 1
+
+        def event(name: str, data: Dict[str, Any]) -> str:
+            return f"event: {name}\ndata: {dumps({'type': name, **data})}\n\n"
+
+        async def events() -> AsyncIterator[str]:
+            yield event("message_start", {"message": message})
+            yield event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            async for piece in paced(text):
+                yield event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": piece}})
+            yield event("content_block_stop", {"index": 0})
+            yield event("message_delta", {
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": output_tokens},
+            })
+            yield event("message_stop", {})
+
+        return StreamingResponse(tracked(events()), media_type="text/event-stream")
+
+    @app.get("/mock/stats")
+    async def get_stats() -> Dict[str, Any]:
+        return {"config": asdict(config), **stats.to_dict()}
+
+    @app.post("/mock/stats/reset")
+    async def reset_stats() -> Dict[str, Any]:
+        stats.reset()
+        return {"reset": True}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    defaults = MockConfig()
+    parser.add_argument("--ttft-ms", type=float, default=defaults.ttft_ms)
+    parser.add_argument("--tokens-per-s", type=float, default=defaults.tokens_per_s)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate,
+                        help="share of requests answered with 429")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate,
+                        help="share of requests answered with 500 (OpenAI) / 529 (Anthropic)")
+    parser.add_argument("--max-concurrency", type=int, default=defaults.max_concurrency,
+                        help="requests in flight above this get 429 (0 = unlimited)")
+    parser.add_argument("--retry-after-s", type=float, default=defaults.retry_after_s)
+    parser.add_argument("--no-fence", dest="fence", action="store_false", help="return bare JSON")
+    parser.add_argument("--meal-plan-file", help="JSON file served as the meal plan")
+    parser.add_argument("--workout-plan-file", help="JSON file served as the workout plan")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    config = MockConfig(**{k: v for k, v in vars(args).items() if k not in ("host", "port")})
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
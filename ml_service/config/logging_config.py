@@ -1,8 +1,147 @@
 """Centralized logging configuration"""
 
+import atexit
+import contextvars
+import copy
 import logging
+import queue
+import random
 import sys
-from typing import Optional
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, Optional
+
+import orjson
+
+# Fields attached to every record logged in the current request/task
+_log_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+
+def bind_log_context(**fields: Any) -> None:
+    """
+    Attach fields (request_id, user_id, provider, ...) to later records in this context.
+
+    Tasks created afterwards inherit them, so background generations keep the
+    request's ids. The surrounding log_context() block restores the previous
+    fields on exit.
+    """
+    fields = {k: v for k, v in fields.items() if v}
+    if fields:
+        _log_context.set({**_log_context.get(), **fields})
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Scope bind_log_context() calls (e.g. one HTTP request)"""
+    token = _log_context.set({**_log_context.get(), **{k: v for k, v in fields.items() if v}})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current log context onto the record (must run on the logging thread)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a fraction of records below WARNING from high-volume loggers.
+
+    Rates are matched on the longest logger name prefix, e.g.
+    {"ml_service.api": 0.1} keeps 10% of request/response lines.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._by_logger: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            matches = [p for p in self.rates if name == p or name.startswith(p + ".")]
+            rate = self.rates[max(matches, key=len)] if matches else 1.0
+            self._by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "ml_service.api=0.1,ml_service.db=0.05" into {logger: rate}"""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context fields, exception"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        if record.exc_info:
+            entry["exc_type"] = record.exc_info[0].__name__
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that defers all formatting to the listener thread.
+
+    The stock prepare() formats the message and traceback on the calling
+    thread; here only %-args are merged so the event loop pays for a record
+    copy and a queue put. A full queue drops the record instead of blocking.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_log_records() -> int:
+    """Records discarded because the log queue was full"""
+    return _NonBlockingQueueHandler.dropped
 
 
 class ColoredFormatter(logging.Formatter):
@@ -20,6 +159,8 @@ class ColoredFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         """Format log record with color"""
+        # Color a copy: the record may be shared with other handlers
+        record = copy.copy(record)
         log_color = self.COLORS.get(record.levelname, self.COLORS['RESET'])
         record.levelname = f"{log_color}{record.levelname}{self.COLORS['RESET']}"
         return super().format(record)
@@ -27,14 +168,22 @@ class ColoredFormatter(logging.Formatter):
 
 def setup_logging(
     log_level: str = "INFO",
-    log_format: Optional[str] = None
+    log_format: Optional[str] = None,
+    json_format: bool = False,
+    async_handler: bool = False,
+    queue_size: int = 10000,
+    sample_rates: Optional[Dict[str, float]] = None
 ) -> logging.Logger:
     """
-    Configure application logging with colored output.
+    Configure application logging.
 
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        log_format: Custom log format string
+        log_format: Custom log format string (colored text output only)
+        json_format: Emit one JSON object per line instead of colored text
+        async_handler: Hand records to a background thread through a bounded queue
+        queue_size: Records buffered before new ones are dropped (async_handler only)
+        sample_rates: Fraction of sub-WARNING records kept per logger name prefix
 
     Returns:
         Configured logger instance
@@ -43,6 +192,8 @@ def setup_logging(
     if log_format is None:
         log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
+    shutdown_logging()
+
     # Create logger
     logger = logging.getLogger("ml_service")
     logger.setLevel(getattr(logging, log_level.upper()))
@@ -50,19 +201,33 @@ def setup_logging(
     # Remove existing handlers to avoid duplicates
     logger.handlers.clear()
 
-    # Console handler with colored output
+    # Console handler: colored text for development, JSON lines for log shippers
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(getattr(logging, log_level.upper()))
 
-    # Use colored formatter
-    formatter = ColoredFormatter(
-        log_format,
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    if json_format:
+        formatter: logging.Formatter = JSONFormatter()
+    else:
+        formatter = ColoredFormatter(
+            log_format,
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
     console_handler.setFormatter(formatter)
 
-    # Add handler to logger
-    logger.addHandler(console_handler)
+    # Filters run on the logging thread, before records are queued
+    if async_handler:
+        global _listener
+        handler: logging.Handler = _NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = QueueListener(handler.queue, console_handler)
+        _listener.start()
+    else:
+        handler = console_handler
+    handler.addFilter(ContextFilter())
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+
+    # Add handler to logger (child loggers such as ml_service.api propagate to it)
+    logger.addHandler(handler)
 
     # Prevent propagation to root logger
     logger.propagate = False
@@ -70,8 +235,26 @@ def setup_logging(
     return logger
 
 
+def _configure_from_settings() -> logging.Logger:
+    from config.settings import settings
+
+    return setup_logging(
+        settings.LOG_LEVEL,
+        settings.LOG_FORMAT,
+        json_format=settings.LOG_JSON,
+        async_handler=settings.LOG_ASYNC,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        sample_rates=parse_sample_rates(settings.LOG_SAMPLE_RATES)
+    )
+
+
 # Global logger instance
-logger = setup_logging()
+logger = _configure_from_settings()
+atexit.register(shutdown_logging)
+
+# High-volume per-request lines, so they can be sampled separately
+api_logger = logger.getChild("api")
+db_logger = logger.getChild("db")
 
 
 def log_api_request(
@@ -89,12 +272,14 @@ def log_api_request(
         provider: AI provider (if applicable)
         model: AI model (if applicable)
     """
+    # Later records in this request (and its background tasks) carry these
+    bind_log_context(user_id=user_id, provider=provider, model=model)
     msg = f"API Request: {endpoint} | User: {user_id}"
     if provider:
         msg += f" | Provider: {provider}"
     if model:
         msg += f" | Model: {model}"
-    logger.info(msg)
+    api_logger.info(msg)
 
 
 def log_api_response(
@@ -118,9 +303,9 @@ def log_api_response(
         msg += f" | Duration: {duration_ms:.2f}ms"
 
     if success:
-        logger.info(msg)
+        api_logger.info(msg)
     else:
-        logger.error(msg)
+        api_logger.error(msg)
 
 
 def log_error(
@@ -166,6 +351,6 @@ def log_database_operation(
         msg = f"User: {user_id} | {msg}"
 
     if success:
-        logger.info(msg)
+        db_logger.info(msg)
     else:
-        logger.error(msg)
+        db_logger.error(msg)
@@ -1,7 +1,6 @@
 """Environment configuration and settings management"""
 
 import os
-import stripe
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -31,7 +30,24 @@ class Settings:
         self.STRIPE_WEBHOOK_SECRET: str = os.getenv("STRIPE_WEBHOOK_SECRET", "")
         self.STRIPE_PRICE_ID: str = os.getenv("STRIPE_PRICE_ID", "")
 
-        stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+        # Stripe Gateway (bounded thread pool for SDK calls; retries use idempotency keys)
+        self.STRIPE_MAX_CONCURRENCY: int = int(os.getenv("STRIPE_MAX_CONCURRENCY", "8"))
+        self.STRIPE_REQUEST_TIMEOUT_S: float = float(os.getenv("STRIPE_REQUEST_TIMEOUT_S", "20"))
+        self.STRIPE_LIST_TIMEOUT_S: float = float(os.getenv("STRIPE_LIST_TIMEOUT_S", "120"))
+        self.STRIPE_MAX_RETRIES: int = int(os.getenv("STRIPE_MAX_RETRIES", "2"))
+
+        # Price/product catalog cache (0 = only refreshed by webhooks)
+        self.STRIPE_CATALOG_PRELOAD: bool = os.getenv("STRIPE_CATALOG_PRELOAD", "true").lower() == "true"
+        self.STRIPE_CATALOG_TTL_S: float = float(os.getenv("STRIPE_CATALOG_TTL_S", "21600"))
+
+        # Per-customer invoice listings (invalidated by invoice.* webhooks; 0 = no caching)
+        self.INVOICE_CACHE_TTL_S: float = float(os.getenv("INVOICE_CACHE_TTL_S", "300"))
+        self.INVOICE_CACHE_MAX_CUSTOMERS: int = int(os.getenv("INVOICE_CACHE_MAX_CUSTOMERS", "10000"))
+
+        # Bulk admin billing operations (concurrency stays below STRIPE_MAX_CONCURRENCY to leave room for live traffic)
+        self.STRIPE_BULK_CONCURRENCY: int = int(os.getenv("STRIPE_BULK_CONCURRENCY", "4"))
+        self.STRIPE_BULK_MAX_OPERATIONS: int = int(os.getenv("STRIPE_BULK_MAX_OPERATIONS", "5000"))
+        self.STRIPE_BULK_PLAN_BATCH_SIZE: int = int(os.getenv("STRIPE_BULK_PLAN_BATCH_SIZE", "200"))
 
         # Application Configuration
         self.APP_TITLE: str = "AI Health & Fitness ML Service"
@@ -40,6 +56,19 @@ class Settings:
         self.HOST: str = os.getenv("APP_HOST", "0.0.0.0")
         self.PORT: int = int(os.getenv("APP_PORT", "8000"))
 
+        # Server launcher (server.py): 0 workers = autotune from CPUs and the connection budget
+        self.WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "0"))
+        # Postgres connections all workers of this instance may hold (primary; the replica gets the same budget)
+        self.DB_CONNECTION_BUDGET: int = int(os.getenv("DB_CONNECTION_BUDGET", "60"))
+        self.SERVER_BACKLOG: int = int(os.getenv("SERVER_BACKLOG", "2048"))
+        self.SERVER_KEEPALIVE_S: int = int(os.getenv("SERVER_KEEPALIVE_S", "5"))
+        self.SERVER_ACCESS_LOG: bool = os.getenv("SERVER_ACCESS_LOG", "false").lower() == "true"
+        # Label /metrics samples with worker=<pid>; server.py turns it on when it runs several workers
+        self.METRICS_WORKER_LABEL: bool = os.getenv("METRICS_WORKER_LABEL", "false").lower() == "true"
+        # Open DB connections and provider HTTP connections before accepting traffic
+        self.SERVER_WARMUP: bool = os.getenv("SERVER_WARMUP", "true").lower() == "true"
+        self.SERVER_WARMUP_TIMEOUT_S: float = float(os.getenv("SERVER_WARMUP_TIMEOUT_S", "10"))
+
         # CORS Configuration
         self.ALLOWED_ORIGINS: list = [
             "http://localhost:5173",
@@ -52,12 +81,68 @@ class Settings:
         # Database Pool Configuration
         self.DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
         self.DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.DB_POOL_ACQUIRE_TIMEOUT_S: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_S", "10"))
+        # Connections per pool opened and checked at startup when SERVER_WARMUP is on
+        self.DB_POOL_WARM_SIZE: int = int(os.getenv("DB_POOL_WARM_SIZE", "4"))
+
+        # Read Replica (optional; reuses primary credentials)
+        self.DB_REPLICA_HOST: Optional[str] = os.getenv("DB_REPLICA_HOST")
+        self.DB_REPLICA_PORT: Optional[str] = os.getenv("DB_REPLICA_PORT", self.DB_PORT)
+        self.DB_REPLICA_POOL_MIN_SIZE: int = int(os.getenv("DB_REPLICA_POOL_MIN_SIZE", "1"))
+        self.DB_REPLICA_POOL_MAX_SIZE: int = int(os.getenv("DB_REPLICA_POOL_MAX_SIZE", "10"))
+
+        # Query Timeouts (client-side per operation; server-side backstop in ms, 0 = disabled)
+        self.DB_READ_TIMEOUT_S: float = float(os.getenv("DB_READ_TIMEOUT_S", "5"))
+        self.DB_WRITE_TIMEOUT_S: float = float(os.getenv("DB_WRITE_TIMEOUT_S", "10"))
+        self.DB_PLAN_WRITE_TIMEOUT_S: float = float(os.getenv("DB_PLAN_WRITE_TIMEOUT_S", "20"))
+        self.DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+        # Status Batch Writer (0 = write each status update directly)
+        self.DB_BATCH_FLUSH_INTERVAL_MS: int = int(os.getenv("DB_BATCH_FLUSH_INTERVAL_MS", "10"))
+        self.DB_BATCH_MAX_SIZE: int = int(os.getenv("DB_BATCH_MAX_SIZE", "500"))
+
+        # Content-addressed Plan Storage
+        # Writes each body twice (plan_data + plan_bodies); the dashboard still reads plan_data directly
+        self.PLAN_STORE_INLINE_COPY: bool = os.getenv("PLAN_STORE_INLINE_COPY", "true").lower() == "true"
+        self.PLAN_STORE_KNOWN_HASHES: int = int(os.getenv("PLAN_STORE_KNOWN_HASHES", "10000"))
+
+        # Local Stripe Mirror (admin endpoints read from it once backfilled; 0 = no periodic reconcile)
+        self.STRIPE_MIRROR_ENABLED: bool = os.getenv("STRIPE_MIRROR_ENABLED", "true").lower() == "true"
+        self.STRIPE_MIRROR_RECONCILE_INTERVAL_S: float = float(os.getenv("STRIPE_MIRROR_RECONCILE_INTERVAL_S", "3600"))
+        self.SAAS_METRICS_MAX_SERIES_DAYS: int = int(os.getenv("SAAS_METRICS_MAX_SERIES_DAYS", "1830"))
+        self.SUBSCRIBERS_PAGE_SIZE: int = int(os.getenv("SUBSCRIBERS_PAGE_SIZE", "100"))
+
+        # Stripe Webhook Event Log (events are acknowledged on insert, processed in the background)
+        self.STRIPE_EVENT_WORKERS: int = int(os.getenv("STRIPE_EVENT_WORKERS", "4"))
+        self.STRIPE_EVENT_POLL_INTERVAL_S: float = float(os.getenv("STRIPE_EVENT_POLL_INTERVAL_S", "5"))
+        self.STRIPE_EVENT_MAX_ATTEMPTS: int = int(os.getenv("STRIPE_EVENT_MAX_ATTEMPTS", "8"))
+        self.STRIPE_EVENT_LOCK_TIMEOUT_S: float = float(os.getenv("STRIPE_EVENT_LOCK_TIMEOUT_S", "300"))
+        self.STRIPE_EVENT_RETENTION_DAYS: int = int(os.getenv("STRIPE_EVENT_RETENTION_DAYS", "30"))
+
+        # Plan gating for generation endpoints (cache invalidated by plan changes and NOTIFY)
+        self.ENTITLEMENTS_ENFORCED: bool = os.getenv("ENTITLEMENTS_ENFORCED", "true").lower() == "true"
+        self.ENTITLEMENT_CACHE_TTL_S: float = float(os.getenv("ENTITLEMENT_CACHE_TTL_S", "60"))
+        self.ENTITLEMENT_CACHE_MAX_USERS: int = int(os.getenv("ENTITLEMENT_CACHE_MAX_USERS", "50000"))
+
+        # Admin diagnostics (/api/admin/debug/*; disabled while the token is unset)
+        self.ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+        self.PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
 
         # AI Model Configuration
         self.DEFAULT_AI_PROVIDER: str = os.getenv("DEFAULT_AI_PROVIDER", "openai")
         self.DEFAULT_MODEL_NAME: str = os.getenv("DEFAULT_MODEL_NAME", "gpt-4o-mini")
         self.AI_MAX_TOKENS: int = int(os.getenv("AI_MAX_TOKENS", "4000"))
         self.AI_TEMPERATURE: float = float(os.getenv("AI_TEMPERATURE", "0.7"))
+        # Alternative API endpoints, e.g. the local mock (benchmarks/mock_llm.py); empty = provider default
+        self.OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "")
+        self.ANTHROPIC_BASE_URL: str = os.getenv("ANTHROPIC_BASE_URL", "")
+        # Record/replay of provider calls (off, record, replay); replay latency is recorded time x scale
+        self.AI_RECORD_MODE: str = os.getenv("AI_RECORD_MODE", "off").lower()
+        # New recordings go to recordings/ai; set AI_RECORD_DIR=benchmarks/recordings to replay the committed corpus
+        self.AI_RECORD_DIR: str = os.getenv("AI_RECORD_DIR", "recordings/ai")
+        self.AI_REPLAY_LATENCY_SCALE: float = float(os.getenv("AI_REPLAY_LATENCY_SCALE", "1.0"))
+        # exact = only the recorded prompt; plan_type = any recording of the same plan type
+        self.AI_REPLAY_MATCH: str = os.getenv("AI_REPLAY_MATCH", "exact").lower()
 
         # Logging Configuration
         self.LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -65,6 +150,21 @@ class Settings:
             "LOG_FORMAT",
             "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
         )
+        # JSON lines for production; async hands records to a thread via a bounded queue (full = dropped)
+        self.LOG_JSON: bool = os.getenv("LOG_JSON", "false").lower() == "true"
+        self.LOG_ASYNC: bool = os.getenv("LOG_ASYNC", "true").lower() == "true"
+        self.LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+        # Fraction of sub-WARNING records kept per logger, e.g. "ml_service.api=0.1,ml_service.db=0.05"
+        self.LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
+
+        # Tracing (span histograms always; export only when a file or collector is set)
+        self.TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+        self.SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+        self.TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.TRACE_EXPORT_FILE: str = os.getenv("TRACE_EXPORT_FILE", "")
+        self.TRACE_COLLECTOR_URL: str = os.getenv("TRACE_COLLECTOR_URL", "")
+        self.TRACE_EXPORT_QUEUE_SIZE: int = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000"))
+        self.TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "ml_service")
 
     @property
     def has_openai(self) -> bool:
@@ -93,6 +193,11 @@ class Settings:
             return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         return None
 
+    @property
+    def has_read_replica(self) -> bool:
+        """Check if a read replica host is configured"""
+        return bool(self.DB_REPLICA_HOST)
+
     def validate_ai_provider(self, provider: str) -> bool:
         """
         Validate if the requested AI provider is available.
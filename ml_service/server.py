@@ -0,0 +1,125 @@
+"""
+Production entry point: uvicorn with uvloop and httptools, and a worker
+count tuned to the CPUs available and the Postgres connection budget.
+
+Each worker holds its own pools, so workers x (DB_POOL_MAX_SIZE + the
+LISTEN connection + the Stripe reconcile lock connection) must fit in
+DB_CONNECTION_BUDGET (and likewise for the replica pool). Workers warm their
+DB and provider connections during startup (SERVER_WARMUP), before they
+accept requests.
+
+Each worker also keeps its own metrics registry, and a scrape is answered by
+whichever worker accepts the connection. With several workers, /metrics
+samples carry a worker=<pid> label: aggregate with `sum without (worker)` and
+diff counters per worker.
+
+Usage (from ml_service/):
+    python server.py                 # WEB_CONCURRENCY or autotuned workers
+    python server.py --workers 4
+    python server.py --dry-run       # print the worker plan and exit
+"""
+
+import argparse
+import math
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import settings
+from config.logging_config import logger
+
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: affinity mask, capped by a cgroup v2 quota (containers)"""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def connections_per_worker() -> Dict[str, int]:
+    """Most Postgres connections one worker opens, per server"""
+    # Pool plus the dedicated LISTEN connection for cache invalidations
+    connections = {"primary": settings.DB_POOL_MAX_SIZE + 1}
+    if settings.STRIPE_MIRROR_ENABLED and settings.STRIPE_MIRROR_RECONCILE_INTERVAL_S > 0:
+        # Session that tries (or holds) the reconcile leader lock
+        connections["primary"] += 1
+    if settings.has_read_replica:
+        connections["replica"] = settings.DB_REPLICA_POOL_MAX_SIZE
+    return connections
+
+
+def plan_workers(cpus: int, per_worker: Dict[str, int], budget: int, requested: int = 0) -> Tuple[int, str]:
+    """
+    Worker count: one per CPU (or the requested count), capped so every
+    server's connections stay within the budget.
+
+    Returns:
+        (workers, reason)
+
+    Raises:
+        ValueError: If a single worker already exceeds the budget
+    """
+    limit = min(budget // connections for connections in per_worker.values())
+    if limit < 1:
+        raise ValueError(
+            f"One worker needs {per_worker} connections but DB_CONNECTION_BUDGET is {budget}; "
+            f"lower DB_POOL_MAX_SIZE / DB_REPLICA_POOL_MAX_SIZE or raise the budget"
+        )
+
+    wanted = requested or cpus
+    source = f"WEB_CONCURRENCY={requested}" if requested else f"{cpus} CPUs"
+    if wanted <= limit:
+        return wanted, f"{source}; connection budget allows {limit}"
+    return limit, f"{source}, capped by the connection budget: {budget} / {max(per_worker.values())} per worker"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="0 = autotune")
+    parser.add_argument("--dry-run", action="store_true", help="print the worker plan and exit")
+    args = parser.parse_args(argv)
+
+    per_worker = connections_per_worker()
+    try:
+        workers, reason = plan_workers(available_cpus(), per_worker, settings.DB_CONNECTION_BUDGET, args.workers)
+    except ValueError as e:
+        parser.exit(1, f"{e}\n")
+
+    connections = ", ".join(f"{server} {count * workers}" for server, count in per_worker.items())
+    logger.info(
+        f"Serving on {args.host}:{args.port} with {workers} worker(s) ({reason}); "
+        f"at most {connections} of {settings.DB_CONNECTION_BUDGET} Postgres connections"
+    )
+    if args.dry_run:
+        return
+    if workers > 1:
+        # Every worker keeps its own metrics and a scrape reaches one of them
+        os.environ["METRICS_WORKER_LABEL"] = "true"
+
+    import uvicorn
+
+    uvicorn.run(
+        "app:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_S,
+        access_log=settings.SERVER_ACCESS_LOG,
+        log_level=settings.LOG_LEVEL.lower()
+    )
+
+
+if __name__ == "__main__":
+    main()
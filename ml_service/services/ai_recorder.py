@@ -0,0 +1,161 @@
+"""Record/replay store for AI provider calls"""
+
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.settings import settings
+from config.logging_config import logger, log_error
+
+MODES = ("off", "record", "replay")
+MATCHES = ("exact", "plan_type")
+
+
+def prompt_key(provider: str, model: str, prompt: str) -> str:
+    """SHA-256 identifying a call: same provider, model and prompt = same key"""
+    return hashlib.sha256(f"{provider}\0{model}\0{prompt}".encode()).hexdigest()
+
+
+def iter_recordings(directory: str) -> Iterator[Dict[str, Any]]:
+    """Every recording in a directory, in key order (for fixtures and tooling)"""
+    for path in sorted(Path(directory).glob("*.json")):
+        yield json.loads(path.read_text())
+
+
+class AIRecorder:
+    """
+    On-disk store of provider responses, keyed by prompt_key.
+
+    record: every successful call is written to directory/<key>.json with the
+    prompt hash, provider, model, plan type, raw response text and timing.
+    Prompts themselves are not stored (they contain quiz answers).
+
+    replay: calls are answered from the store after the recorded duration
+    times latency_scale (0 = immediately), without touching the network.
+    With match="plan_type", a prompt that was never recorded gets a recording
+    of the same plan type, picked deterministically from its key, so load
+    tests with synthetic users can replay real responses. A miss is an error.
+    """
+
+    def __init__(self, mode: str, directory: str, latency_scale: float = 1.0, match: str = "exact"):
+        if mode not in MODES:
+            raise ValueError(f"AI record mode must be one of {MODES}, got {mode!r}")
+        if match not in MATCHES:
+            raise ValueError(f"AI replay match must be one of {MATCHES}, got {match!r}")
+        self.mode = mode
+        self.directory = Path(directory)
+        self.latency_scale = latency_scale
+        self.match = match
+        self._recordings: Optional[Dict[str, Dict[str, Any]]] = None
+        self._by_plan_type: Dict[str, List[Dict[str, Any]]] = {}
+        self._stats: Dict[str, int] = {"recorded": 0, "record_errors": 0, "replayed": 0, "substituted": 0, "misses": 0}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._recordings is None:
+            self._recordings = {}
+            if self.directory.is_dir():
+                for entry in iter_recordings(str(self.directory)):
+                    self._recordings[entry["key"]] = entry
+            for entry in self._recordings.values():
+                self._by_plan_type.setdefault(entry.get("plan_type") or "", []).append(entry)
+            logger.info(f"Loaded {len(self._recordings)} AI recordings from {self.directory}")
+        return self._recordings
+
+    def lookup(self, provider: str, model: str, prompt: str, plan_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Recording to replay for a call, or None"""
+        key = prompt_key(provider, model, prompt)
+        entry = self._load().get(key)
+        if entry:
+            return entry
+        if self.match == "plan_type":
+            candidates = self._by_plan_type.get(plan_type or "")
+            if candidates:
+                self._stats["substituted"] += 1
+                return candidates[int(key[:8], 16) % len(candidates)]
+        return None
+
+    async def replay(self, provider: str, model: str, prompt: str, plan_type: Optional[str] = None) -> Optional[str]:
+        """
+        Recorded response text after the (scaled) recorded latency.
+
+        Returns:
+            Response text, or None if nothing matches
+        """
+        entry = self.lookup(provider, model, prompt, plan_type)
+        if not entry:
+            self._stats["misses"] += 1
+            return None
+        self._stats["replayed"] += 1
+        if self.latency_scale > 0:
+            await asyncio.sleep(entry["duration_s"] * self.latency_scale)
+        return entry["response"]
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{entry['key']}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(entry, indent=2) + "\n")
+        os.replace(tmp, path)
+
+    async def record(
+        self,
+        provider: str,
+        model: str,
+        prompt: str,
+        response: str,
+        duration_s: float,
+        ttft_s: Optional[float] = None,
+        plan_type: Optional[str] = None
+    ) -> bool:
+        """
+        Store a successful call. Failures are logged, never raised.
+
+        Returns:
+            True if the recording was written
+        """
+        entry = {
+            "key": prompt_key(provider, model, prompt),
+            "provider": provider,
+            "model": model,
+            "plan_type": plan_type,
+            "prompt_chars": len(prompt),
+            "response": response,
+            "duration_s": round(duration_s, 4),
+            "ttft_s": round(ttft_s, 4) if ttft_s is not None else None,
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        try:
+            await asyncio.to_thread(self._write, entry)
+            self._stats["recorded"] += 1
+            return True
+        except Exception as e:
+            self._stats["record_errors"] += 1
+            log_error(e, "AI call recording")
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Mode and counters"""
+        stats: Dict[str, Any] = {"mode": self.mode, "directory": str(self.directory), **self._stats}
+        if self._recordings is not None:
+            stats["loaded"] = len(self._recordings)
+        return stats
+
+
+ai_recorder = AIRecorder(
+    mode=settings.AI_RECORD_MODE,
+    directory=settings.AI_RECORD_DIR,
+    latency_scale=settings.AI_REPLAY_LATENCY_SCALE,
+    match=settings.AI_REPLAY_MATCH,
+)
@@ -2,62 +2,178 @@
 
 """AI service for interacting with multiple AI providers"""
 
+import asyncio
 import json
-from typing import Dict, Any, Optional
-import anthropic
-import google.generativeai as genai
-from llamaapi import LlamaAPI
-from openai import AsyncOpenAI
+import time
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
 from fastapi import HTTPException
 
 from config.settings import settings
 from config.logging_config import logger, log_error
+from services.ai_recorder import ai_recorder
+from utils.serialization import loads
+from utils.metrics import registry
+from utils.tracing import annotate, span
+
+# Provider SDKs take 0.4-1.3 s each to import; they are imported on first use
+if TYPE_CHECKING:
+    import anthropic
+    from llamaapi import LlamaAPI
+    from openai import AsyncOpenAI
+
+AI_REQUEST_DURATION = registry.histogram(
+    "ai_request_duration_seconds",
+    "AI provider call latency by provider, model and outcome",
+    ("provider", "model", "outcome"),
+)
+AI_TOKENS = registry.counter(
+    "ai_tokens_total",
+    "Tokens sent to (input) and received from (output) AI providers",
+    ("provider", "model", "direction"),
+)
+AI_TTFT = registry.histogram(
+    "ai_time_to_first_token_seconds",
+    "Time from sending an AI request to the first streamed output token",
+    ("provider", "model"),
+)
+AI_ERRORS = registry.counter(
+    "ai_errors_total",
+    "Failed AI provider calls",
+    ("provider", "model"),
+)
+
+
+# Model names come from requests; cap distinct label values
+MAX_MODEL_LABELS = 50
+_model_labels: set = set()
+
+# Time to first token of the last streamed call in this task, for recordings
+_first_token_s: ContextVar[Optional[float]] = ContextVar("first_token_s", default=None)
+
+
+def _model_label(model: str) -> str:
+    if model in _model_labels:
+        return model
+    if len(_model_labels) < MAX_MODEL_LABELS:
+        _model_labels.add(model)
+        return model
+    return "other"
+
+
+def _record_call(provider: str, model: str, start: float, input_tokens: int = 0, output_tokens: int = 0, error: bool = False) -> None:
+    model = _model_label(str(model))
+    AI_REQUEST_DURATION.observe(time.perf_counter() - start, provider, model, "error" if error else "ok")
+    if error:
+        AI_ERRORS.inc(provider, model)
+        return
+    AI_TOKENS.inc(provider, model, "input", amount=input_tokens)
+    AI_TOKENS.inc(provider, model, "output", amount=output_tokens)
+
+
+def _record_first_token(provider: str, model: str, start: float) -> None:
+    elapsed = time.perf_counter() - start
+    AI_TTFT.observe(elapsed, provider, _model_label(str(model)))
+    _first_token_s.set(elapsed)
+    annotate(ttft_ms=round(elapsed * 1000, 1))
 
 
 class AIService:
     """Service for AI model interactions with comprehensive error handling"""
 
     def __init__(self):
-        """Initialize AI clients based on available API keys"""
-        self.openai_client: Optional[AsyncOpenAI] = None
-        self.anthropic_client: Optional[anthropic.Anthropic] = None
-        self.llama_client: Optional[LlamaAPI] = None
-        self.gemini_configured: bool = False
-
-        # Initialize OpenAI
-        if settings.has_openai:
+        """
+        Clients are imported and built on first use, and only for providers
+        with an API key, so a worker pays for the SDKs it actually calls.
+        """
+        self._clients: Dict[str, Any] = {}
+
+    def _client(self, name: str, configured: bool, build: Callable[[], Any], description: str) -> Any:
+        """Cached client for a provider, built on first access (None if unconfigured or failed)"""
+        if name not in self._clients:
+            if not configured:
+                return None
+            self._clients[name] = None
             try:
-                self.openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-                logger.info("OpenAI client initialized")
+                self._clients[name] = build()
+                logger.info(f"{description} initialized")
             except Exception as e:
-                log_error(e, "Failed to initialize OpenAI client")
+                log_error(e, f"Failed to initialize {description}")
+        return self._clients[name]
 
-        # Initialize Anthropic
-        if settings.has_anthropic:
-            try:
-                self.anthropic_client = anthropic.Anthropic(
-                    api_key=settings.ANTHROPIC_API_KEY
-                )
-                logger.info("Anthropic client initialized")
-            except Exception as e:
-                log_error(e, "Failed to initialize Anthropic client")
+    @property
+    def openai_client(self) -> Optional["AsyncOpenAI"]:
+        def build():
+            from openai import AsyncOpenAI
+            return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None)
 
-        # Initialize Gemini
-        if settings.has_gemini:
-            try:
-                genai.configure(api_key=settings.GEMINI_API_KEY)
-                self.gemini_configured = True
-                logger.info("Gemini client configured")
-            except Exception as e:
-                log_error(e, "Failed to configure Gemini")
+        description = f"OpenAI client{f' ({settings.OPENAI_BASE_URL})' if settings.OPENAI_BASE_URL else ''}"
+        return self._client("openai", settings.has_openai, build, description)
+
+    @openai_client.setter
+    def openai_client(self, client: Optional["AsyncOpenAI"]) -> None:
+        self._clients["openai"] = client
+
+    @property
+    def anthropic_client(self) -> Optional["anthropic.AsyncAnthropic"]:
+        def build():
+            import anthropic
+            return anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, base_url=settings.ANTHROPIC_BASE_URL or None)
+
+        description = f"Anthropic client{f' ({settings.ANTHROPIC_BASE_URL})' if settings.ANTHROPIC_BASE_URL else ''}"
+        return self._client("anthropic", settings.has_anthropic, build, description)
+
+    @anthropic_client.setter
+    def anthropic_client(self, client: Optional["anthropic.AsyncAnthropic"]) -> None:
+        self._clients["anthropic"] = client
+
+    @property
+    def gemini_configured(self) -> bool:
+        def build():
+            import google.generativeai as genai
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            return True
+
+        return bool(self._client("gemini", settings.has_gemini, build, "Gemini client"))
+
+    @property
+    def llama_client(self) -> Optional["LlamaAPI"]:
+        def build():
+            from llamaapi import LlamaAPI
+            return LlamaAPI(settings.LLAMA_API_KEY)
+
+        return self._client("llama", settings.has_llama, build, "Llama client")
 
-        # Initialize Llama
-        if settings.has_llama:
+    async def warm_up(self, timeout_s: float) -> Dict[str, bool]:
+        """
+        Build the configured streaming clients and open a connection to each
+        provider (a models listing), so the first generation skips SDK import
+        and the TCP/TLS handshake. Skipped in replay mode.
+
+        Args:
+            timeout_s: Per-provider time limit
+
+        Returns:
+            Provider -> whether the provider answered (any HTTP status counts)
+        """
+        if ai_recorder.replaying:
+            return {}
+
+        async def ping(client: Any) -> bool:
             try:
-                self.llama_client = LlamaAPI(settings.LLAMA_API_KEY)
-                logger.info("Llama client initialized")
+                await asyncio.wait_for(client.models.list(), timeout_s)
+                return True
             except Exception as e:
-                log_error(e, "Failed to initialize Llama client")
+                # An error response still leaves a warm keep-alive connection
+                if getattr(e, "status_code", None) is not None:
+                    return True
+                logger.warning(f"Provider warm-up failed: {type(e).__name__}: {e}")
+                return False
+
+        clients = {"openai": self.openai_client, "anthropic": self.anthropic_client}
+        clients = {name: client for name, client in clients.items() if client}
+        results = await asyncio.gather(*(ping(client) for client in clients.values()))
+        return dict(zip(clients, results))
 
     def clean_json_response(self, response: str) -> str:
         """
@@ -92,6 +208,9 @@ class AIService:
         """
         Call OpenAI API asynchronously.
 
+        The completion is streamed so time-to-first-token can be measured;
+        the text is returned once complete.
+
         Args:
             prompt: User prompt
             model: Model name
@@ -110,8 +229,9 @@ class AIService:
                 detail="OpenAI client not initialized. Check API key."
             )
 
+        start = time.perf_counter()
         try:
-            response = await self.openai_client.chat.completions.create(
+            stream = await self.openai_client.chat.completions.create(
                 model=model,
                 messages=[
                     {
@@ -121,11 +241,28 @@ class AIService:
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=max_tokens or settings.AI_MAX_TOKENS,
-                temperature=temperature or settings.AI_TEMPERATURE
+                temperature=temperature or settings.AI_TEMPERATURE,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            parts = []
+            usage = None
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        _record_first_token("openai", model, start)
+                    parts.append(chunk.choices[0].delta.content)
+            _record_call(
+                "openai", model, start,
+                usage.prompt_tokens if usage else 0,
+                usage.completion_tokens if usage else 0
             )
-            return response.choices[0].message.content.strip()
+            return "".join(parts).strip()
 
         except Exception as e:
+            _record_call("openai", model, start, error=True)
             error_msg = f"OpenAI API call failed: {str(e)}"
             log_error(e, "OpenAI API call")
             raise HTTPException(status_code=500, detail=error_msg)
@@ -137,7 +274,7 @@ class AIService:
         max_tokens: Optional[int] = None
     ) -> str:
         """
-        Call Anthropic Claude API asynchronously.
+        Call Anthropic Claude API asynchronously (streamed, like call_openai).
 
         Args:
             prompt: User prompt
@@ -156,38 +293,64 @@ class AIService:
                 detail="Anthropic client not initialized. Check API key."
             )
 
+        start = time.perf_counter()
         try:
             if not model.startswith("claude"):
                 model = "claude-3-5-sonnet-20241022"
 
-            message = await self.anthropic_client.messages.create(
+            parts = []
+            async with self.anthropic_client.messages.stream(
                 model=model,
                 max_tokens=max_tokens or settings.AI_MAX_TOKENS,
                 messages=[{"role": "user", "content": prompt}]
-            )
-            return message.content[0].text.strip()
+            ) as stream:
+                async for text in stream.text_stream:
+                    if not parts:
+                        _record_first_token("anthropic", model, start)
+                    parts.append(text)
+                message = await stream.get_final_message()
+            _record_call("anthropic", model, start, message.usage.input_tokens, message.usage.output_tokens)
+            return "".join(parts).strip()
 
         except Exception as e:
+            _record_call("anthropic", model, start, error=True)
             error_msg = f"Anthropic API call failed: {str(e)}"
             log_error(e, "Anthropic API call")
             raise HTTPException(status_code=500, detail=error_msg)
 
+    async def _call_provider(self, prompt: str, provider: str, model: str) -> str:
+        """Dispatch to the provider's call method"""
+        if provider == "openai":
+            return await self.call_openai(prompt, model)
+        if provider == "anthropic":
+            return await self.call_anthropic(prompt, model)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported AI provider: {provider}"
+        )
+
     async def generate_plan(
         self,
         prompt: str,
         provider: str,
         model: str,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        plan_type: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate a plan using the specified AI provider.
         NOW ASYNC - must be awaited!
 
+        With AI_RECORD_MODE=record the raw response is stored by ai_recorder;
+        with AI_RECORD_MODE=replay it is served from the store instead of the
+        provider (no API key or network needed).
+
         Args:
             prompt: Formatted prompt string
             provider: AI provider name ('openai', 'anthropic', etc.)
             model: Model name
             user_id: Optional user ID for logging
+            plan_type: 'meal' or 'workout', stored with recordings
 
         Returns:
             Parsed JSON response as dictionary
@@ -197,7 +360,7 @@ class AIService:
         """
         provider_lower = provider.lower()
 
-        if not settings.validate_ai_provider(provider_lower):
+        if not ai_recorder.replaying and not settings.validate_ai_provider(provider_lower):
             raise HTTPException(
                 status_code=400,
                 detail=f"AI provider '{provider}' is not configured or invalid"
@@ -209,20 +372,30 @@ class AIService:
                 f"{f'for user {user_id}' if user_id else ''}"
             )
 
-            if provider_lower == "openai":
-                response = await self.call_openai(prompt, model)
-            elif provider_lower == "anthropic":
-                response = await self.call_anthropic(prompt, model)
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Unsupported AI provider: {provider}"
-                )
+            with span("ai.request", provider=provider_lower, model=model):
+                if ai_recorder.replaying:
+                    response = await ai_recorder.replay(provider_lower, model, prompt, plan_type)
+                    if response is None:
+                        raise HTTPException(
+                            status_code=500,
+                            detail=f"No AI recording for this {provider} ({model}) call"
+                        )
+                    annotate(replayed=True)
+                else:
+                    start = time.perf_counter()
+                    _first_token_s.set(None)
+                    response = await self._call_provider(prompt, provider_lower, model)
+                    if ai_recorder.recording:
+                        await ai_recorder.record(
+                            provider_lower, model, prompt, response,
+                            time.perf_counter() - start, _first_token_s.get(), plan_type
+                        )
 
             clean_response = self.clean_json_response(response)
 
             try:
-                parsed_data = json.loads(clean_response)
+                with span("parse", response_chars=len(clean_response)):
+                    parsed_data = loads(clean_response)
                 logger.info(f"Successfully generated plan with {provider}")
                 return parsed_data
 
@@ -2,14 +2,238 @@
 
 """Database service for managing connections and operations"""
 
-import json
-from typing import Optional, Any, Dict
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Any, AsyncIterator, Callable, Dict, List, Tuple
 import asyncpg
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 from datetime import datetime
 
 from config.settings import settings
 from config.logging_config import logger, log_database_operation, log_error
+from utils.serialization import dumps, dumps_bytes, loads, encode_jsonb, decode_jsonb, content_hash
+from utils.projection import FieldTree, build_projection_sql
+from utils.metrics import registry
+
+DB_POOL_ACQUIRE_WAIT = registry.histogram(
+    "db_pool_acquire_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ("pool",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+# Backoff between attempts to re-open a dropped LISTEN connection
+LISTEN_RECONNECT_MIN_S = 1.0
+LISTEN_RECONNECT_MAX_S = 30.0
+
+DB_POOL_ACQUIRE_TIMEOUTS = registry.counter(
+    "db_pool_acquire_timeouts_total",
+    "Connection acquisitions that hit DB_POOL_ACQUIRE_TIMEOUT_S",
+    ("pool",),
+)
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """
+    Register orjson-backed codecs for json/jsonb on every new pool connection.
+
+    jsonb uses the binary wire format so values skip the intermediate str
+    round trip; callers pass and receive plain dicts/lists.
+    """
+    await conn.set_type_codec(
+        "jsonb",
+        encoder=encode_jsonb,
+        decoder=decode_jsonb,
+        schema="pg_catalog",
+        format="binary"
+    )
+    await conn.set_type_codec(
+        "json",
+        encoder=dumps,
+        decoder=loads,
+        schema="pg_catalog",
+        format="text"
+    )
+
+
+class PoolStats:
+    """Acquisition counters for a connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_use: int = 0
+        self.acquisitions: int = 0
+        self.acquire_timeouts: int = 0
+        self.total_wait_s: float = 0.0
+        self.max_wait_s: float = 0.0
+
+    def record_wait(self, wait_s: float) -> None:
+        """Record a successful acquisition and the time spent waiting for it"""
+        self.acquisitions += 1
+        self.total_wait_s += wait_s
+        DB_POOL_ACQUIRE_WAIT.observe(wait_s, self.name)
+        if wait_s > self.max_wait_s:
+            self.max_wait_s = wait_s
+
+    def snapshot(self, pool: Optional[asyncpg.Pool]) -> Dict[str, Any]:
+        """Return current saturation figures for the pool"""
+        size = pool.get_size() if pool else 0
+        max_size = pool.get_max_size() if pool else 0
+        return {
+            "size": size,
+            "max_size": max_size,
+            "idle": pool.get_idle_size() if pool else 0,
+            "in_use": self.in_use,
+            "utilization": round(self.in_use / max_size, 3) if max_size else 0.0,
+            "acquisitions": self.acquisitions,
+            "acquire_timeouts": self.acquire_timeouts,
+            "avg_wait_ms": round(self.total_wait_s / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+            "max_wait_ms": round(self.max_wait_s * 1000, 3),
+        }
+
+
+class StatusBatchWriter:
+    """
+    Coalescing writer for plan status updates.
+
+    Updates are buffered for a short window, deduplicated per (table, user)
+    keeping only the latest value, and flushed with one UPDATE ... FROM unnest()
+    statement per table. Callers still await the flush that persists (or
+    supersedes) their update, so the API stays request/response shaped while
+    write QPS stays flat as generation concurrency grows.
+    """
+
+    TABLES = ("ai_meal_plans", "ai_workout_plans")
+
+    def __init__(self, db: "DatabaseService", interval_s: float, max_batch: int):
+        self.db = db
+        self.interval_s = interval_s
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[str, str], Tuple[str, Optional[str], List[asyncio.Future]]] = {}
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.flushes = 0
+        self.rows_written = 0
+        self.updates_coalesced = 0
+
+    def start(self) -> None:
+        """Start the background flush loop"""
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush anything pending and stop the flush loop"""
+        if not self._task:
+            return
+        self._closing = True
+        self._has_pending.set()
+        self._full.set()
+        await self._task
+        self._task = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._closing
+
+    async def submit(self, table: str, user_id: str, status: str, error_message: Optional[str]) -> bool:
+        """
+        Queue a status update and wait until it has been flushed.
+
+        Returns:
+            True if the flush carrying this update (or a newer one for the same row) succeeded
+        """
+        if table not in self.TABLES:
+            raise ValueError(f"Unsupported status table: {table}")
+        # Validate up front so one malformed id cannot fail the whole batch
+        user_id = str(uuid.UUID(str(user_id)))
+
+        future = asyncio.get_running_loop().create_future()
+        key = (table, user_id)
+        previous = self._pending.get(key)
+        waiters = previous[2] if previous else []
+        if previous:
+            self.updates_coalesced += 1
+        waiters.append(future)
+        self._pending[key] = (status, error_message, waiters)
+
+        self._has_pending.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+        return await future
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_pending.wait()
+            if not self._closing:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.interval_s)
+                except asyncio.TimeoutError:
+                    pass
+            await self.flush()
+            if self._closing and not self._pending:
+                return
+
+    async def flush(self) -> None:
+        """Write all pending updates, one statement per table"""
+        batch, self._pending = self._pending, {}
+        self._has_pending.clear()
+        self._full.clear()
+        if not batch:
+            return
+
+        by_table: Dict[str, List[Tuple[str, str, Optional[str], List[asyncio.Future]]]] = {}
+        for (table, user_id), (status, error_message, waiters) in batch.items():
+            by_table.setdefault(table, []).append((user_id, status, error_message, waiters))
+
+        for table, rows in by_table.items():
+            ok = True
+            try:
+                async with self.db.get_connection() as conn:
+                    await conn.execute(
+                        f"""
+                        UPDATE {table} AS p
+                        SET status = v.status, error_message = v.error_message, updated_at = NOW()
+                        FROM (
+                            SELECT DISTINCT ON (t.user_id) t.id, u.status, u.error_message
+                            FROM unnest($1::uuid[], $2::text[], $3::text[]) AS u(user_id, status, error_message)
+                            JOIN {table} t ON t.user_id = u.user_id
+                            ORDER BY t.user_id, t.created_at DESC
+                        ) AS v
+                        WHERE p.id = v.id
+                        """,
+                        [r[0] for r in rows],
+                        [r[1] for r in rows],
+                        [r[2] for r in rows],
+                        timeout=settings.DB_WRITE_TIMEOUT_S
+                    )
+                self.flushes += 1
+                self.rows_written += len(rows)
+                log_database_operation("BATCH UPDATE", f"{table}_status ({len(rows)} rows)", success=True)
+            except Exception as e:
+                ok = False
+                log_error(e, f"Failed to flush {len(rows)} status updates to {table}")
+
+            for _, _, _, waiters in rows:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(ok)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Flush counters for monitoring"""
+        return {
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "updates_coalesced": self.updates_coalesced,
+        }
 
 
 class DatabaseService:
@@ -18,22 +242,50 @@ class DatabaseService:
     def __init__(self):
         """Initialize database service"""
         self.pool: Optional[asyncpg.Pool] = None
+        self.replica_pool: Optional[asyncpg.Pool] = None
+        self.pool_stats = PoolStats("primary")
+        self.replica_pool_stats = PoolStats("replica")
+        self.status_writer: Optional[StatusBatchWriter] = None
+        self._known_plan_hashes: "OrderedDict[str, None]" = OrderedDict()
+        self._plan_listeners: List[Callable[[str], None]] = []
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        # channel -> [(payload callback, connection state callback)]
+        self._channels: Dict[str, List[Tuple[Callable[[str], None], Optional[Callable[[bool], None]]]]] = {}
+        self._listen_reconnect: Optional[asyncio.Task] = None
+        self._closing = False
+
+    async def _create_pool(self, host: str, port: str, min_size: int, max_size: int) -> asyncpg.Pool:
+        """Create a pool with the shared codecs and timeout configuration"""
+        server_settings = {}
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+        return await asyncpg.create_pool(
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            host=host,
+            port=port,
+            database=settings.DB_NAME,
+            min_size=min_size,
+            max_size=max_size,
+            command_timeout=settings.DB_WRITE_TIMEOUT_S,
+            server_settings=server_settings or None,
+            init=_init_connection
+        )
 
     async def initialize(self) -> None:
-        """Initialize database connection pool"""
+        """Initialize database connection pools (primary, plus replica if configured)"""
+        self._closing = False
         try:
             if not all([settings.DB_USER, settings.DB_PASSWORD, settings.DB_HOST, settings.DB_PORT, settings.DB_NAME]):
                 logger.warning("Database credentials not fully configured. Skipping DB initialization.")
                 return
 
-            self.pool = await asyncpg.create_pool(
-                user=settings.DB_USER,
-                password=settings.DB_PASSWORD,
-                host=settings.DB_HOST,
-                port=settings.DB_PORT,
-                database=settings.DB_NAME,
-                min_size=settings.DB_POOL_MIN_SIZE,
-                max_size=settings.DB_POOL_MAX_SIZE
+            self.pool = await self._create_pool(
+                settings.DB_HOST,
+                settings.DB_PORT,
+                settings.DB_POOL_MIN_SIZE,
+                settings.DB_POOL_MAX_SIZE
             )
             logger.info("Database connection pool initialized successfully")
 
@@ -41,20 +293,279 @@ class DatabaseService:
             log_error(e, "Database pool initialization")
             raise
 
+        if settings.DB_BATCH_FLUSH_INTERVAL_MS > 0:
+            self.status_writer = StatusBatchWriter(
+                self,
+                settings.DB_BATCH_FLUSH_INTERVAL_MS / 1000,
+                settings.DB_BATCH_MAX_SIZE
+            )
+            self.status_writer.start()
+
+        if settings.has_read_replica:
+            try:
+                self.replica_pool = await self._create_pool(
+                    settings.DB_REPLICA_HOST,
+                    settings.DB_REPLICA_PORT,
+                    settings.DB_REPLICA_POOL_MIN_SIZE,
+                    settings.DB_REPLICA_POOL_MAX_SIZE
+                )
+                logger.info("Read replica connection pool initialized successfully")
+            except Exception as e:
+                log_error(e, "Read replica pool initialization. Reads will use the primary")
+
+    async def listen(
+        self,
+        channel: str,
+        callback: Callable[[str], None],
+        on_state_change: Optional[Callable[[bool], None]] = None
+    ) -> bool:
+        """
+        Subscribe to a Postgres NOTIFY channel on a dedicated connection.
+
+        Pooled connections cannot hold a LISTEN, and a transaction-mode
+        pooler drops it, so this connects to DB_HOST directly. If the
+        connection drops (or cannot be opened), it is re-opened in the
+        background with backoff and every channel is subscribed again.
+        Notifications sent in between are lost, so subscribers are told.
+
+        Args:
+            channel: Channel name
+            callback: Called with each notification payload
+            on_state_change: Called with False when the connection drops and
+                True once it is back
+
+        Returns:
+            False if the listener is not connected yet (a reconnect is pending)
+        """
+        new_channel = channel not in self._channels
+        self._channels.setdefault(channel, []).append((callback, on_state_change))
+        if self._listen_reconnect and not self._listen_reconnect.done():
+            # Subscribed together with the other channels once it reconnects
+            return False
+        try:
+            if not self.is_listening:
+                await self._connect_listener()
+            elif new_channel:
+                await self._listen_conn.add_listener(channel, self._dispatch_notification)
+            logger.info(f"Listening on {channel}")
+            return True
+        except Exception as e:
+            log_error(e, f"LISTEN {channel}")
+            self._schedule_listen_reconnect()
+            return False
+
+    @property
+    def is_listening(self) -> bool:
+        return self._listen_conn is not None and not self._listen_conn.is_closed()
+
+    async def _connect_direct(self) -> asyncpg.Connection:
+        """A session on DB_HOST outside the pools, for state a pooler would not keep"""
+        return await asyncpg.connect(
+            user=settings.DB_USER,
+            password=settings.DB_PASSWORD,
+            host=settings.DB_HOST,
+            port=settings.DB_PORT,
+            database=settings.DB_NAME
+        )
+
+    async def _connect_listener(self) -> None:
+        """Open the LISTEN connection and subscribe every registered channel"""
+        conn = await self._connect_direct()
+        try:
+            for channel in self._channels:
+                await conn.add_listener(channel, self._dispatch_notification)
+        except Exception:
+            await conn.close()
+            raise
+        conn.add_termination_listener(self._listen_conn_lost)
+        self._listen_conn = conn
+
+    def _dispatch_notification(self, _conn: Any, _pid: int, channel: str, payload: str) -> None:
+        for callback, _ in self._channels.get(channel, ()):
+            callback(payload)
+
+    def _listen_state_changed(self, connected: bool) -> None:
+        for subscribers in self._channels.values():
+            for _, on_state_change in subscribers:
+                if on_state_change:
+                    on_state_change(connected)
+
+    def _listen_conn_lost(self, conn: asyncpg.Connection) -> None:
+        if self._closing or conn is not self._listen_conn:
+            return
+        self._listen_conn = None
+        logger.warning("LISTEN connection lost; reconnecting")
+        self._listen_state_changed(False)
+        self._schedule_listen_reconnect()
+
+    def _schedule_listen_reconnect(self) -> None:
+        if not self._closing and (self._listen_reconnect is None or self._listen_reconnect.done()):
+            self._listen_reconnect = asyncio.create_task(self._reconnect_listener())
+
+    async def _reconnect_listener(self) -> None:
+        delay = LISTEN_RECONNECT_MIN_S
+        while not self._closing:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect_listener()
+            except Exception as e:
+                delay = min(delay * 2, LISTEN_RECONNECT_MAX_S)
+                logger.warning(f"LISTEN reconnect failed ({type(e).__name__}: {e}); next attempt in {delay:.0f}s")
+                continue
+            logger.info(f"LISTEN connection restored ({', '.join(self._channels)})")
+            self._listen_state_changed(True)
+            return
+
+    async def notify(self, channel: str, payload: str) -> None:
+        """Send a NOTIFY to every process listening on channel (this one included)"""
+        async with self.get_connection() as conn:
+            await conn.execute("SELECT pg_notify($1, $2)", channel, payload, timeout=settings.DB_WRITE_TIMEOUT_S)
+
+    @asynccontextmanager
+    async def advisory_lock(self, name: str) -> AsyncIterator[Optional[asyncpg.Connection]]:
+        """
+        Try to take a session advisory lock for the duration of the block.
+
+        The lock is held by its own direct connection (a transaction-mode
+        pooler would hand the session to someone else), and closing that
+        connection releases it, so a crashed holder never keeps it.
+
+        Args:
+            name: Lock name, hashed to the lock key
+
+        Yields:
+            The connection holding the lock (the lock is gone once it is
+            closed), or None if another session holds it
+        """
+        conn = await self._connect_direct()
+        try:
+            acquired = await conn.fetchval(
+                "SELECT pg_try_advisory_lock(hashtext($1))",
+                name,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+            yield conn if acquired else None
+        finally:
+            await conn.close()
+
+    def add_plan_listener(self, callback: Callable[[str], None]) -> None:
+        """Call callback(user_id) whenever this process changes a user's plan"""
+        self._plan_listeners.append(callback)
+
+    def _plans_changed(self, user_ids: List[str]) -> None:
+        for callback in self._plan_listeners:
+            for user_id in user_ids:
+                callback(user_id)
+
     async def close(self) -> None:
-        """Close database connection pool"""
+        """Close database connection pools"""
+        self._closing = True
+        if self._listen_reconnect and not self._listen_reconnect.done():
+            self._listen_reconnect.cancel()
+        self._listen_reconnect = None
+        if self._listen_conn:
+            await self._listen_conn.close()
+            self._listen_conn = None
+        if self.status_writer:
+            await self.status_writer.stop()
+            self.status_writer = None
+        if self.replica_pool:
+            await self.replica_pool.close()
+            logger.info("Read replica connection pool closed")
         if self.pool:
             await self.pool.close()
             logger.info("Database connection pool closed")
 
     @asynccontextmanager
-    async def get_connection(self):
-        """Context manager for database connections"""
-        if not self.pool:
+    async def get_connection(self, readonly: bool = False):
+        """
+        Context manager for database connections.
+
+        Args:
+            readonly: Route to the read replica when one is available. Replica
+                reads may lag the primary slightly, so only use this for queries
+                that tolerate it (status polls, lookups).
+        """
+        if readonly and self.replica_pool:
+            pool, stats = self.replica_pool, self.replica_pool_stats
+        else:
+            pool, stats = self.pool, self.pool_stats
+
+        if not pool:
             raise Exception("Database pool not initialized")
 
-        async with self.pool.acquire() as connection:
+        start = time.perf_counter()
+        try:
+            connection = await pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            stats.acquire_timeouts += 1
+            DB_POOL_ACQUIRE_TIMEOUTS.inc(stats.name)
+            raise
+        stats.record_wait(time.perf_counter() - start)
+        stats.in_use += 1
+
+        try:
             yield connection
+        finally:
+            stats.in_use -= 1
+            await pool.release(connection)
+
+    async def warm_up(self, connections: int) -> Dict[str, int]:
+        """
+        Open and check up to `connections` connections in each pool, so the
+        first requests after a start do not pay for connect, auth and codec
+        setup.
+
+        Args:
+            connections: Connections per pool (capped at the pool's max size)
+
+        Returns:
+            Pool name -> connections that answered SELECT 1
+        """
+        warmed = {}
+        for pool, stats in ((self.pool, self.pool_stats), (self.replica_pool, self.replica_pool_stats)):
+            if not pool:
+                continue
+            count = min(connections, pool.get_max_size())
+            warmed[stats.name] = 0
+            # All held at once so each is a separate connection; the stack
+            # releases every acquired one, also when warm-up is cancelled
+            async with AsyncExitStack() as held:
+                acquired = await asyncio.gather(
+                    *(held.enter_async_context(pool.acquire(timeout=settings.DB_POOL_ACQUIRE_TIMEOUT_S))
+                      for _ in range(count)),
+                    return_exceptions=True
+                )
+                for conn in acquired:
+                    if isinstance(conn, BaseException):
+                        log_error(conn, f"Warming {stats.name} pool")
+                        continue
+                    try:
+                        await conn.fetchval("SELECT 1", timeout=settings.DB_READ_TIMEOUT_S)
+                        warmed[stats.name] += 1
+                    except Exception as e:
+                        log_error(e, f"Warming {stats.name} pool")
+        return warmed
+
+    def pool_metrics(self) -> Dict[Tuple[str, ...], float]:
+        """Pool gauges for /metrics: (pool, state) -> connections"""
+        values = {}
+        for pool, stats in ((self.pool, self.pool_stats), (self.replica_pool, self.replica_pool_stats)):
+            if pool:
+                values[(stats.name, "size")] = pool.get_size()
+                values[(stats.name, "max")] = pool.get_max_size()
+                values[(stats.name, "idle")] = pool.get_idle_size()
+                values[(stats.name, "in_use")] = stats.in_use
+        return values
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get saturation stats for the primary and replica pools"""
+        stats = {"primary": self.pool_stats.snapshot(self.pool)}
+        if self.replica_pool:
+            stats["replica"] = self.replica_pool_stats.snapshot(self.replica_pool)
+        if self.status_writer:
+            stats["status_writer"] = self.status_writer.get_stats()
+        return stats
 
     async def initialize_plan_status(self, user_id: str, quiz_result_id: str) -> bool:
         """Initialize plan generation status records with placeholder values"""
@@ -74,7 +585,8 @@ class DatabaseService:
                     DO UPDATE SET status = 'generating', updated_at = NOW()
                     """,
                     user_id,
-                    quiz_result_id
+                    quiz_result_id,
+                    timeout=settings.DB_WRITE_TIMEOUT_S
                 )
                 
                 # Initialize workout plan with generating status and placeholder values
@@ -87,7 +599,8 @@ class DatabaseService:
                     DO UPDATE SET status = 'generating', updated_at = NOW()
                     """,
                     user_id,
-                    quiz_result_id
+                    quiz_result_id,
+                    timeout=settings.DB_WRITE_TIMEOUT_S
                 )
 
             log_database_operation("INSERT", "plan_status_init", user_id, success=True)
@@ -97,6 +610,71 @@ class DatabaseService:
             log_error(e, "Failed to initialize plan status", user_id)
             return False
 
+    def _remember_plan_hash(self, plan_hash: str) -> None:
+        """Remember a body known to exist so later saves skip the existence check"""
+        self._known_plan_hashes[plan_hash] = None
+        self._known_plan_hashes.move_to_end(plan_hash)
+        if len(self._known_plan_hashes) > settings.PLAN_STORE_KNOWN_HASHES:
+            self._known_plan_hashes.popitem(last=False)
+
+    async def _store_plan_body(self, conn: asyncpg.Connection, plan_type: str, plan_hash: str, plan_data: Dict[str, Any]) -> bool:
+        """
+        Store a plan body once under its content hash.
+
+        The body is only sent when the hash is not already known, so repeat
+        plans cost a pointer write rather than a multi-KB JSONB copy.
+
+        Returns:
+            True if the body exists after this call (caller remembers it on commit)
+        """
+        if plan_hash in self._known_plan_hashes:
+            self._known_plan_hashes.move_to_end(plan_hash)
+            return False
+
+        exists = await conn.fetchval(
+            "SELECT 1 FROM plan_bodies WHERE content_hash = $1",
+            plan_hash,
+            timeout=settings.DB_READ_TIMEOUT_S
+        )
+        if not exists:
+            await conn.execute(
+                """
+                INSERT INTO plan_bodies (content_hash, plan_type, body, size_bytes)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (content_hash) DO NOTHING
+                """,
+                plan_hash,
+                plan_type,
+                plan_data,
+                len(dumps_bytes(plan_data)),
+                timeout=settings.DB_PLAN_WRITE_TIMEOUT_S
+            )
+        return True
+
+    async def _record_plan_version(
+        self,
+        conn: asyncpg.Connection,
+        plan_type: str,
+        plan_id: Any,
+        user_id: str,
+        version: int,
+        plan_hash: str
+    ) -> None:
+        """Append a version history entry (no-op if this version is already recorded)"""
+        await conn.execute(
+            """
+            INSERT INTO plan_versions (plan_type, plan_id, user_id, version, content_hash)
+            VALUES ($1, $2, $3, $4, $5)
+            ON CONFLICT (plan_type, plan_id, version) DO NOTHING
+            """,
+            plan_type,
+            plan_id,
+            user_id,
+            version,
+            plan_hash,
+            timeout=settings.DB_WRITE_TIMEOUT_S
+        )
+
     async def save_meal_plan(
         self,
         user_id: str,
@@ -112,30 +690,46 @@ class DatabaseService:
                 logger.warning("Database not initialized. Skipping meal plan save.")
                 return False
 
+            plan_hash = content_hash(plan_data)
+
             async with self.get_connection() as conn:
-                await conn.execute(
-                    """
-                    INSERT INTO ai_meal_plans
-                    (user_id, quiz_result_id, plan_data, daily_calories, preferences, restrictions, status, is_active, generated_at)
-                    VALUES ($1, $2, $3, $4, $5, $6, 'completed', true, NOW())
-                    ON CONFLICT (user_id, quiz_result_id)
-                    DO UPDATE SET 
-                        plan_data = $3,
-                        daily_calories = $4,
-                        preferences = $5,
-                        restrictions = $6,
-                        status = 'completed',
-                        is_active = true,
-                        generated_at = NOW(),
-                        updated_at = NOW()
-                    """,
-                    user_id,
-                    quiz_result_id,
-                    json.dumps(plan_data),
-                    daily_calories,
-                    json.dumps(preferences),
-                    restrictions
-                )
+                async with conn.transaction():
+                    remember_hash = await self._store_plan_body(conn, "meal", plan_hash, plan_data)
+                    row = await conn.fetchrow(
+                        """
+                        INSERT INTO ai_meal_plans
+                        (user_id, quiz_result_id, plan_data, daily_calories, preferences, restrictions, status, is_active, generated_at, content_hash, version)
+                        VALUES ($1, $2, $3, $4, $5, $6, 'completed', true, NOW(), $7, 1)
+                        ON CONFLICT (user_id, quiz_result_id)
+                        DO UPDATE SET 
+                            plan_data = $3,
+                            daily_calories = $4,
+                            preferences = $5,
+                            restrictions = $6,
+                            status = 'completed',
+                            is_active = true,
+                            generated_at = NOW(),
+                            updated_at = NOW(),
+                            content_hash = $7,
+                            version = CASE
+                                WHEN ai_meal_plans.content_hash IS DISTINCT FROM $7 THEN COALESCE(ai_meal_plans.version, 0) + 1
+                                ELSE ai_meal_plans.version
+                            END
+                        RETURNING id, version
+                        """,
+                        user_id,
+                        quiz_result_id,
+                        plan_data if settings.PLAN_STORE_INLINE_COPY else None,
+                        daily_calories,
+                        dumps(preferences),
+                        restrictions,
+                        plan_hash,
+                        timeout=settings.DB_PLAN_WRITE_TIMEOUT_S
+                    )
+                    await self._record_plan_version(conn, "meal", row["id"], user_id, row["version"], plan_hash)
+
+            if remember_hash:
+                self._remember_plan_hash(plan_hash)
 
             log_database_operation("UPSERT", "ai_meal_plans", user_id, success=True)
             return True
@@ -160,30 +754,46 @@ class DatabaseService:
                 logger.warning("Database not initialized. Skipping workout plan save.")
                 return False
 
+            plan_hash = content_hash(plan_data)
+
             async with self.get_connection() as conn:
-                await conn.execute(
-                    """
-                    INSERT INTO ai_workout_plans
-                    (user_id, quiz_result_id, plan_data, workout_type, duration_per_session, frequency_per_week, status, is_active, generated_at)
-                    VALUES ($1, $2, $3, $4, $5, $6, 'completed', true, NOW())
-                    ON CONFLICT (user_id, quiz_result_id)
-                    DO UPDATE SET 
-                        plan_data = $3,
-                        workout_type = $4,
-                        duration_per_session = $5,
-                        frequency_per_week = $6,
-                        status = 'completed',
-                        is_active = true,
-                        generated_at = NOW(),
-                        updated_at = NOW()
-                    """,
-                    user_id,
-                    quiz_result_id,
-                    json.dumps(plan_data),
-                    json.dumps(workout_type),
-                    duration_per_session,
-                    frequency_per_week
-                )
+                async with conn.transaction():
+                    remember_hash = await self._store_plan_body(conn, "workout", plan_hash, plan_data)
+                    row = await conn.fetchrow(
+                        """
+                        INSERT INTO ai_workout_plans
+                        (user_id, quiz_result_id, plan_data, workout_type, duration_per_session, frequency_per_week, status, is_active, generated_at, content_hash, version)
+                        VALUES ($1, $2, $3, $4, $5, $6, 'completed', true, NOW(), $7, 1)
+                        ON CONFLICT (user_id, quiz_result_id)
+                        DO UPDATE SET 
+                            plan_data = $3,
+                            workout_type = $4,
+                            duration_per_session = $5,
+                            frequency_per_week = $6,
+                            status = 'completed',
+                            is_active = true,
+                            generated_at = NOW(),
+                            updated_at = NOW(),
+                            content_hash = $7,
+                            version = CASE
+                                WHEN ai_workout_plans.content_hash IS DISTINCT FROM $7 THEN COALESCE(ai_workout_plans.version, 0) + 1
+                                ELSE ai_workout_plans.version
+                            END
+                        RETURNING id, version
+                        """,
+                        user_id,
+                        quiz_result_id,
+                        plan_data if settings.PLAN_STORE_INLINE_COPY else None,
+                        dumps(workout_type),
+                        duration_per_session,
+                        frequency_per_week,
+                        plan_hash,
+                        timeout=settings.DB_PLAN_WRITE_TIMEOUT_S
+                    )
+                    await self._record_plan_version(conn, "workout", row["id"], user_id, row["version"], plan_hash)
+
+            if remember_hash:
+                self._remember_plan_hash(plan_hash)
 
             log_database_operation("UPSERT", "ai_workout_plans", user_id, success=True)
             return True
@@ -200,13 +810,16 @@ class DatabaseService:
         status: str,
         error_message: Optional[str] = None
     ) -> bool:
-        """Update plan generation status"""
+        """Update plan generation status (coalesced through the batch writer when running)"""
         try:
             if not self.pool:
                 return False
 
             table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
 
+            if self.status_writer and self.status_writer.running:
+                return await self.status_writer.submit(table, user_id, status, error_message)
+
             async with self.get_connection() as conn:
                 await conn.execute(
                     f"""
@@ -217,7 +830,8 @@ class DatabaseService:
                     """,
                     status,
                     error_message,
-                    user_id
+                    user_id,
+                    timeout=settings.DB_WRITE_TIMEOUT_S
                 )
 
             log_database_operation("UPDATE", f"{table}_status", user_id, success=True)
@@ -233,7 +847,7 @@ class DatabaseService:
             if not self.pool:
                 return None
 
-            async with self.get_connection() as conn:
+            async with self.get_connection(readonly=True) as conn:
                 meal_status = await conn.fetchrow(
                     """
                     SELECT status, error_message, generated_at
@@ -242,7 +856,8 @@ class DatabaseService:
                     ORDER BY created_at DESC
                     LIMIT 1
                     """,
-                    user_id
+                    user_id,
+                    timeout=settings.DB_READ_TIMEOUT_S
                 )
                 
                 workout_status = await conn.fetchrow(
@@ -253,7 +868,8 @@ class DatabaseService:
                     ORDER BY created_at DESC
                     LIMIT 1
                     """,
-                    user_id
+                    user_id,
+                    timeout=settings.DB_READ_TIMEOUT_S
                 )
 
             return {
@@ -269,6 +885,189 @@ class DatabaseService:
             log_error(e, "Failed to get plan status", user_id)
             return None
 
+    async def get_active_plan(
+        self,
+        user_id: str,
+        plan_type: str,
+        fields: Optional[FieldTree] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the user's active plan, optionally projected to a subset of fields.
+
+        The projection is evaluated by Postgres JSONB operators so only the
+        requested sub-paths are transferred.
+
+        Args:
+            user_id: User ID
+            plan_type: 'meal' or 'workout'
+            fields: Projection tree from utils.projection.parse_fields
+
+        Returns:
+            Row dict with plan_data, or None if the user has no active plan
+        """
+        if not self.pool:
+            return None
+
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+        plan_expr, params = build_projection_sql("d.doc", fields or {}, param_offset=1)
+
+        try:
+            async with self.get_connection(readonly=True) as conn:
+                row = await conn.fetchrow(
+                    f"""
+                    SELECT p.id, p.quiz_result_id, p.status, p.generated_at, p.version, p.content_hash,
+                           {plan_expr} AS plan_data
+                    FROM (
+                        SELECT id, quiz_result_id, status, generated_at, version, content_hash, plan_data
+                        FROM {table}
+                        WHERE user_id = $1 AND is_active = true
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    ) p
+                    LEFT JOIN plan_bodies b ON b.content_hash = p.content_hash
+                    CROSS JOIN LATERAL (SELECT COALESCE(b.body, p.plan_data) AS doc) d
+                    """,
+                    user_id,
+                    *params,
+                    timeout=settings.DB_READ_TIMEOUT_S
+                )
+
+            log_database_operation("SELECT", f"{table}_projection", user_id, success=True)
+            return dict(row) if row else None
+
+        except Exception as e:
+            log_error(e, f"Failed to get {plan_type} plan", user_id)
+            raise
+
+    async def get_plan_versions(self, user_id: str, plan_type: str) -> List[Dict[str, Any]]:
+        """List the version history of the user's active plan, newest first"""
+        if not self.pool:
+            return []
+
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+
+        try:
+            async with self.get_connection(readonly=True) as conn:
+                rows = await conn.fetch(
+                    f"""
+                    SELECT v.version, v.content_hash, v.created_at, b.size_bytes,
+                           v.version = p.version AS is_current
+                    FROM (
+                        SELECT id, version FROM {table}
+                        WHERE user_id = $1 AND is_active = true
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    ) p
+                    JOIN plan_versions v ON v.plan_type = $2 AND v.plan_id = p.id
+                    JOIN plan_bodies b ON b.content_hash = v.content_hash
+                    ORDER BY v.version DESC
+                    """,
+                    user_id,
+                    plan_type,
+                    timeout=settings.DB_READ_TIMEOUT_S
+                )
+
+            return [dict(r) for r in rows]
+
+        except Exception as e:
+            log_error(e, f"Failed to list {plan_type} plan versions", user_id)
+            raise
+
+    async def attach_plan_body(self, user_id: str, plan_type: str, plan_hash: str) -> Optional[int]:
+        """
+        Point the user's active plan at an already stored body.
+
+        This is a pointer write: the body is never sent over the wire (an inline
+        copy, when enabled, is made server-side). Used for rollbacks and for
+        attaching cached plans.
+
+        Returns:
+            The new version number, or None if there is no active plan or unknown hash
+        """
+        if not self.pool:
+            return None
+
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+
+        try:
+            async with self.get_connection() as conn:
+                async with conn.transaction():
+                    row = await conn.fetchrow(
+                        f"""
+                        UPDATE {table} AS p
+                        SET content_hash = b.content_hash,
+                            plan_data = CASE WHEN $3 THEN b.body ELSE NULL END,
+                            version = COALESCE(p.version, 0) + 1,
+                            status = 'completed',
+                            updated_at = NOW()
+                        FROM plan_bodies b
+                        WHERE b.content_hash = $2
+                        AND p.id = (
+                            SELECT id FROM {table}
+                            WHERE user_id = $1 AND is_active = true
+                            ORDER BY created_at DESC
+                            LIMIT 1
+                        )
+                        RETURNING p.id, p.version
+                        """,
+                        user_id,
+                        plan_hash,
+                        settings.PLAN_STORE_INLINE_COPY,
+                        timeout=settings.DB_WRITE_TIMEOUT_S
+                    )
+                    if not row:
+                        return None
+                    await self._record_plan_version(conn, plan_type, row["id"], user_id, row["version"], plan_hash)
+
+            log_database_operation("UPDATE", f"{table}_pointer", user_id, success=True)
+            return row["version"]
+
+        except Exception as e:
+            log_error(e, f"Failed to attach {plan_type} plan body", user_id)
+            raise
+
+    async def rollback_plan(self, user_id: str, plan_type: str, version: int) -> Optional[int]:
+        """
+        Restore an earlier version of the user's active plan.
+
+        The rollback is recorded as a new version pointing at the old body, so
+        history is never rewritten.
+
+        Returns:
+            The new version number, or None if the version does not exist
+        """
+        if not self.pool:
+            return None
+
+        table = "ai_meal_plans" if plan_type == "meal" else "ai_workout_plans"
+
+        try:
+            async with self.get_connection() as conn:
+                plan_hash = await conn.fetchval(
+                    f"""
+                    SELECT v.content_hash
+                    FROM plan_versions v
+                    WHERE v.plan_type = $2 AND v.version = $3 AND v.plan_id = (
+                        SELECT id FROM {table}
+                        WHERE user_id = $1 AND is_active = true
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    )
+                    """,
+                    user_id,
+                    plan_type,
+                    version,
+                    timeout=settings.DB_READ_TIMEOUT_S
+                )
+
+        except Exception as e:
+            log_error(e, f"Failed to look up {plan_type} plan version {version}", user_id)
+            raise
+
+        if not plan_hash:
+            return None
+        return await self.attach_plan_body(user_id, plan_type, plan_hash)
+
     async def update_quiz_calculations(self, quiz_result_id: str, calculations: Dict[str, Any]) -> bool:
         """Update quiz result with calculations"""
         try:
@@ -283,8 +1082,9 @@ class DatabaseService:
                     SET calculations = $1
                     WHERE id = $2
                     """,
-                    json.dumps(calculations),
-                    quiz_result_id
+                    calculations,
+                    quiz_result_id,
+                    timeout=settings.DB_WRITE_TIMEOUT_S
                 )
 
             log_database_operation("UPDATE", "quiz_results", success=True)
@@ -311,13 +1111,56 @@ class DatabaseService:
             q += " WHERE id = $2"
             params.append(user_id)
 
-        async with self.pool.acquire() as conn:
-            await conn.execute(q, *params)
+        async with self.get_connection() as conn:
+            await conn.execute(q, *params, timeout=settings.DB_WRITE_TIMEOUT_S)
+        self._plans_changed([user_id])
+
+    async def set_user_plans(self, plans: Dict[str, str]) -> int:
+        """
+        Set plan_id for many users with one statement.
+
+        Args:
+            plans: user_id -> plan_id
+
+        Returns:
+            Number of profiles updated
+        """
+        if not plans:
+            return 0
+
+        async with self.get_connection() as conn:
+            result = await conn.execute(
+                """
+                UPDATE profiles AS p
+                SET plan_id = u.plan_id, plan_renewal_date = NOW() + INTERVAL '1 month'
+                FROM unnest($1::uuid[], $2::text[]) AS u(user_id, plan_id)
+                WHERE p.id = u.user_id
+                """,
+                list(plans.keys()),
+                list(plans.values()),
+                timeout=settings.DB_WRITE_TIMEOUT_S
+            )
+        log_database_operation("BATCH UPDATE", f"profiles_plan ({len(plans)} rows)", success=True)
+        self._plans_changed(list(plans))
+        return int(result.split()[-1])
 
     async def lookup_user_by_stripe(self, stripe_customer_id: str):
+        """
+        User id for a Stripe customer.
+
+        Reads the primary: webhook handlers use the result to decide a write,
+        and a lagging replica would miss a customer linked moments ago.
+        """
         q = "SELECT id FROM profiles WHERE stripe_customer_id = $1"
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(q, stripe_customer_id)
+        async with self.get_connection() as conn:
+            row = await conn.fetchrow(q, stripe_customer_id, timeout=settings.DB_READ_TIMEOUT_S)
             return row["id"] if row else None
 
-db_service = DatabaseService()
\ No newline at end of file
+db_service = DatabaseService()
+
+registry.gauge(
+    "db_pool_connections",
+    "Pool connections by state (size, max, idle, in_use)",
+    ("pool", "state"),
+    collect=db_service.pool_metrics,
+)
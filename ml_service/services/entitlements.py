@@ -0,0 +1,119 @@
+"""In-process cache of user plans and AI generation quotas"""
+
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+from config.logging_config import logger
+from services.database import DatabaseService, db_service
+from utils.single_flight import SingleFlightCache
+
+NOTIFY_CHANNEL = "entitlements"
+
+
+class Entitlement:
+    """A user's plan, its monthly AI generation allowance and current usage"""
+
+    __slots__ = ("plan_id", "monthly_limit", "used")
+
+    def __init__(self, plan_id: Optional[str], monthly_limit: Optional[int], used: Optional[int]):
+        self.plan_id = plan_id
+        self.monthly_limit = monthly_limit
+        self.used = used
+
+    @property
+    def allows_generation(self) -> bool:
+        # Same rule as the refuse_quiz_over_quota trigger: no plan, a plan
+        # without a limit, or no usage count means the insert is not refused
+        if self.monthly_limit is None or self.used is None:
+            return True
+        # used already counts the quiz being generated (quiz_results insert trigger)
+        return self.used <= self.monthly_limit
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"plan_id": self.plan_id, "monthly_limit": self.monthly_limit, "used": self.used}
+
+
+class EntitlementCache:
+    """
+    Plan gating without a profile lookup per generation request.
+
+    Entries live for ttl_s. They are dropped sooner when this process changes
+    a plan (db_service plan listeners, which the Stripe webhook handlers go
+    through) and when any instance or Supabase itself changes a profile's plan
+    or usage, via the 'entitlements' NOTIFY channel. The TTL bounds staleness
+    while the notification connection is down; once it is back, everything is
+    dropped because notifications sent in between were lost. Missing profiles
+    are not cached: nothing announces a new profile.
+    """
+
+    def __init__(self, db: DatabaseService, ttl_s: float, max_users: int):
+        self.db = db
+        self.ttl_s = ttl_s
+        self.max_users = max_users
+        self._cache: SingleFlightCache[str, Optional[Entitlement]] = SingleFlightCache(
+            ttl_s, max_users, cache_if=lambda entitlement: entitlement is not None
+        )
+        self._listening = False
+        db.add_plan_listener(self.invalidate)
+
+    async def _load(self, user_id: str) -> Optional[Entitlement]:
+        # Primary, not the replica: a lagging read right after an invalidation would re-cache the old plan
+        async with self.db.get_connection() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT p.plan_id, pl.monthly_ai_generations AS monthly_limit, p.ai_gen_quiz_count AS used
+                FROM profiles p
+                LEFT JOIN plans pl ON pl.id = p.plan_id
+                WHERE p.id = $1
+                """,
+                user_id,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+        if not row:
+            return None
+        return Entitlement(row["plan_id"], row["monthly_limit"], row["used"])
+
+    async def get(self, user_id: str) -> Optional[Entitlement]:
+        """
+        Entitlement for a user.
+
+        Args:
+            user_id: Profile id
+
+        Returns:
+            Entitlement, or None if the user has no profile
+        """
+        return await self._cache.get(user_id, self._load)
+
+    def invalidate(self, user_id: Optional[str]) -> None:
+        """Drop one user's entry, or every entry for '*'"""
+        if not user_id:
+            return
+        if user_id == "*":
+            self._cache.clear()
+        else:
+            self._cache.invalidate(user_id)
+
+    def _listener_state_changed(self, connected: bool) -> None:
+        self._listening = connected
+        if connected:
+            self._cache.clear()
+        else:
+            logger.warning(f"Entitlement notifications interrupted; cache relies on its {self.ttl_s}s TTL")
+
+    async def start(self) -> None:
+        """Subscribe to cross-instance invalidations"""
+        self._listening = await self.db.listen(NOTIFY_CHANNEL, self.invalidate, self._listener_state_changed)
+        if not self._listening:
+            logger.warning(f"Entitlement cache relies on its {self.ttl_s}s TTL until LISTEN connects")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size, hit counters and whether notifications are received"""
+        return {"users": len(self._cache), "listening": self._listening, **self._cache.stats}
+
+
+entitlement_cache = EntitlementCache(
+    db_service,
+    ttl_s=settings.ENTITLEMENT_CACHE_TTL_S,
+    max_users=settings.ENTITLEMENT_CACHE_MAX_USERS,
+)
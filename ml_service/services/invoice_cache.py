@@ -0,0 +1,121 @@
+"""Per-customer cache of invoice listings"""
+
+from typing import Any, Dict, List, Optional
+
+import stripe
+
+from config.settings import settings
+from config.logging_config import logger, log_error
+from services.database import DatabaseService, db_service
+from services.stripe_gateway import stripe_gateway
+from services.stripe_mirror import stripe_mirror
+from utils.single_flight import SingleFlightCache
+
+INVOICE_LIMIT = 100
+NOTIFY_CHANNEL = "invoice_cache"
+
+
+def invoice_entry(invoice: Any) -> Dict[str, Any]:
+    """Fields the billing pages use"""
+    return {
+        "id": invoice.id,
+        "amount_due": invoice.amount_due,
+        "amount_paid": invoice.amount_paid,
+        "created": invoice.created,
+        "currency": invoice.currency,
+        "hosted_invoice_url": invoice.hosted_invoice_url,
+        "invoice_pdf": invoice.invoice_pdf,
+        "status": invoice.status,
+        "period_start": invoice.period_start,
+        "period_end": invoice.period_end,
+    }
+
+
+class InvoiceCache:
+    """
+    A customer's latest invoices, kept for ttl_s.
+
+    Listings come from the local Stripe mirror once it is backfilled, and from
+    the Stripe API before that. invoice.* events invalidate the customer's
+    entry after the mirror has applied them; a load that was already running
+    when the invalidation arrived is returned to its caller but not cached.
+    Concurrent misses for one customer share a single load.
+
+    Invalidations reach the other workers and instances through the
+    'invoice_cache' NOTIFY channel. While that connection is down they rely on
+    the TTL, and everything is dropped once it is back.
+    """
+
+    def __init__(self, db: DatabaseService, ttl_s: float, max_customers: int):
+        self.db = db
+        self.ttl_s = ttl_s
+        self.max_customers = max_customers
+        self._cache: SingleFlightCache[str, List[Dict[str, Any]]] = SingleFlightCache(ttl_s, max_customers)
+        self._stats: Dict[str, int] = {"mirror_loads": 0, "stripe_loads": 0, "notify_errors": 0}
+        self._listening = False
+
+    async def _load(self, customer_id: str) -> List[Dict[str, Any]]:
+        if await stripe_mirror.is_ready():
+            self._stats["mirror_loads"] += 1
+            return await stripe_mirror.list_customer_invoices(customer_id, INVOICE_LIMIT)
+
+        self._stats["stripe_loads"] += 1
+        invoices = await stripe_gateway.call(stripe.Invoice.list, customer=customer_id, limit=INVOICE_LIMIT)
+        return [invoice_entry(invoice) for invoice in invoices.data]
+
+    async def get_invoices(self, customer_id: str) -> List[Dict[str, Any]]:
+        """
+        Latest invoices for a customer, newest first.
+
+        Args:
+            customer_id: Stripe customer id
+
+        Returns:
+            Up to 100 invoice dicts (see invoice_entry)
+        """
+        return await self._cache.get(customer_id, self._load)
+
+    def invalidate(self, customer_id: Optional[str]) -> None:
+        """Drop a customer's listing in this process (and any load in progress from being cached)"""
+        if not customer_id:
+            return
+        self._cache.invalidate(customer_id)
+        logger.debug(f"Invoice cache invalidated for {customer_id}")
+
+    async def invalidate_everywhere(self, customer_id: Optional[str]) -> None:
+        """Drop a customer's listing here, then in every other process via NOTIFY"""
+        if not customer_id:
+            return
+        self.invalidate(customer_id)
+        if not self.db.pool:
+            return
+        try:
+            await self.db.notify(NOTIFY_CHANNEL, customer_id)
+        except Exception as e:
+            # Other processes fall back to the TTL
+            self._stats["notify_errors"] += 1
+            log_error(e, f"Invoice cache NOTIFY for {customer_id}")
+
+    def _listener_state_changed(self, connected: bool) -> None:
+        self._listening = connected
+        if connected:
+            self._cache.clear()
+        else:
+            logger.warning(f"Invoice cache notifications interrupted; cache relies on its {self.ttl_s}s TTL")
+
+    async def start(self) -> None:
+        """Subscribe to invalidations from other processes"""
+        self._listening = await self.db.listen(NOTIFY_CHANNEL, self.invalidate, self._listener_state_changed)
+        if not self._listening:
+            logger.warning(f"Invoice cache relies on its {self.ttl_s}s TTL until LISTEN connects")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size, hit counters and whether notifications are received"""
+        return {"customers": len(self._cache), "listening": self._listening, **self._cache.stats, **self._stats}
+
+
+invoice_cache = InvoiceCache(
+    db_service,
+    ttl_s=settings.INVOICE_CACHE_TTL_S,
+    max_customers=settings.INVOICE_CACHE_MAX_CUSTOMERS,
+)
@@ -0,0 +1,219 @@
+"""Bulk admin billing operations against Stripe"""
+
+import asyncio
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import stripe
+
+from config.logging_config import logger, log_error
+from services.database import db_service
+from services.stripe_gateway import stripe_gateway
+
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_PAUSE_S = 2.0
+RATE_LIMIT_MAX_PAUSE_S = 30.0
+
+# (result, (user_id, plan_id) to apply in the profiles batch or None)
+OperationResult = Tuple[Dict[str, Any], Optional[Tuple[str, str]]]
+
+
+async def _cancel_subscription(params: Dict[str, Any], idempotency_key: str) -> OperationResult:
+    subscription = await stripe_gateway.mutate(
+        stripe.Subscription.modify,
+        params["subscription_id"],
+        idempotency_key=idempotency_key,
+        cancel_at_period_end=True
+    )
+    plan = (params["user_id"], "free") if params.get("user_id") else None
+    return {"id": subscription.id, "status": subscription.status}, plan
+
+
+async def _apply_coupon(params: Dict[str, Any], idempotency_key: str) -> OperationResult:
+    subscription = await stripe_gateway.mutate(
+        stripe.Subscription.modify,
+        params["subscription_id"],
+        idempotency_key=idempotency_key,
+        coupon=params["coupon_id"]
+    )
+    return {"id": subscription.id, "status": subscription.status}, None
+
+
+async def _extend_trial(params: Dict[str, Any], idempotency_key: str) -> OperationResult:
+    subscription = await stripe_gateway.mutate(
+        stripe.Subscription.modify,
+        params["subscription_id"],
+        idempotency_key=idempotency_key,
+        trial_end=params["trial_end"]
+    )
+    return {"id": subscription.id, "status": subscription.status, "trial_end": subscription.trial_end}, None
+
+
+async def _change_plan(params: Dict[str, Any], idempotency_key: str) -> OperationResult:
+    subscription = await stripe_gateway.call(stripe.Subscription.retrieve, params["subscription_id"])
+    updated = await stripe_gateway.mutate(
+        stripe.Subscription.modify,
+        params["subscription_id"],
+        idempotency_key=idempotency_key,
+        items=[{
+            "id": subscription["items"]["data"][0].id,
+            "price": params["new_price_id"],
+        }],
+        proration_behavior="create_prorations"
+    )
+    return {"id": updated.id, "status": updated.status}, None
+
+
+async def _refund(params: Dict[str, Any], idempotency_key: str) -> OperationResult:
+    refund_params = {"payment_intent": params["payment_intent_id"]}
+    if params.get("amount"):
+        refund_params["amount"] = params["amount"]
+    refund = await stripe_gateway.mutate(stripe.Refund.create, idempotency_key=idempotency_key, **refund_params)
+    return {"id": refund.id, "status": refund.status, "amount": refund.amount}, None
+
+
+# op name -> (handler, required params); mirrors the single-object admin endpoints
+OPERATIONS: Dict[str, Tuple[Callable[[Dict[str, Any], str], Awaitable[OperationResult]], Tuple[str, ...]]] = {
+    "cancel-subscription": (_cancel_subscription, ("subscription_id",)),
+    "apply-coupon": (_apply_coupon, ("subscription_id", "coupon_id")),
+    "extend-trial": (_extend_trial, ("subscription_id", "trial_end")),
+    "change-plan": (_change_plan, ("subscription_id", "new_price_id")),
+    "refund": (_refund, ("payment_intent_id",)),
+}
+
+
+def validate_operations(operations: List[Dict[str, Any]]) -> List[str]:
+    """
+    Check every operation before anything is sent to Stripe.
+
+    Returns:
+        One message per invalid operation (empty if all are valid)
+    """
+    errors = []
+    for index, item in enumerate(operations):
+        if not isinstance(item, dict):
+            errors.append(f"{index}: expected an object")
+            continue
+        spec = OPERATIONS.get(item.get("op"))
+        if not spec:
+            errors.append(f"{index}: unknown op {item.get('op')!r}")
+            continue
+        missing = [k for k in spec[1] if item.get(k) in (None, "")]
+        if missing:
+            errors.append(f"{index}: missing {', '.join(missing)}")
+            continue
+        # Plan updates go out as one uuid[] batch; a bad id would fail all of them
+        if item.get("user_id") not in (None, ""):
+            try:
+                uuid.UUID(str(item["user_id"]))
+            except ValueError:
+                errors.append(f"{index}: user_id is not a UUID")
+    return errors
+
+
+class BulkOperationRun:
+    """
+    One bulk request: runs operations on a few workers and yields a result per item.
+
+    Each item carries its own idempotency key (the client's, or
+    "<batch key>:<index>"), so resubmitting a batch with the same
+    Idempotency-Key header never applies an operation twice. The gateway
+    already retries rate limits per call; if one still surfaces, every worker
+    of the run pauses with a growing delay before the item is retried, rather
+    than pushing the whole batch into Stripe's limiter. Plan changes are
+    written to profiles in batches instead of one UPDATE per item.
+    """
+
+    def __init__(self, operations: List[Dict[str, Any]], batch_key: str, concurrency: int, plan_batch_size: int):
+        self.operations = operations
+        self.batch_key = batch_key
+        self.concurrency = max(1, min(concurrency, len(operations) or 1))
+        self.plan_batch_size = plan_batch_size
+        self._next = 0
+        self._paused_until = 0.0
+        self._pause_s = RATE_LIMIT_PAUSE_S
+        self._plans: Dict[str, str] = {}
+        self._summary: Dict[str, Any] = {
+            "total": len(operations),
+            "succeeded": 0,
+            "failed": 0,
+            "rate_limit_pauses": 0,
+            "plans_updated": 0,
+            "plan_update_failures": [],
+        }
+
+    def _item_key(self, index: int) -> str:
+        return self.operations[index].get("idempotency_key") or f"{self.batch_key}:{index}"
+
+    async def _wait_if_paused(self) -> None:
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _pause(self) -> None:
+        self._summary["rate_limit_pauses"] += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + self._pause_s)
+        logger.warning(f"Bulk run {self.batch_key} rate limited, pausing {self._pause_s:.0f}s")
+        self._pause_s = min(self._pause_s * 2, RATE_LIMIT_MAX_PAUSE_S)
+
+    async def _execute(self, index: int) -> Dict[str, Any]:
+        item = self.operations[index]
+        handler = OPERATIONS[item["op"]][0]
+        key = self._item_key(index)
+        result: Dict[str, Any] = {"index": index, "op": item["op"], "idempotency_key": key}
+
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self._wait_if_paused()
+            try:
+                data, plan = await handler(item, key)
+            except stripe.error.RateLimitError as e:
+                if attempt < RATE_LIMIT_RETRIES:
+                    self._pause()
+                    continue
+                return {**result, "success": False, "error": str(e)}
+            except Exception as e:
+                return {**result, "success": False, "error": str(e)}
+
+            self._pause_s = RATE_LIMIT_PAUSE_S
+            if plan:
+                self._plans[plan[0]] = plan[1]
+            return {**result, "success": True, "result": data}
+
+    async def _worker(self, results: asyncio.Queue) -> None:
+        while self._next < len(self.operations):
+            index = self._next
+            self._next += 1
+            await results.put(await self._execute(index))
+
+    async def _flush_plans(self) -> None:
+        items, self._plans = list(self._plans.items()), {}
+        for start in range(0, len(items), self.plan_batch_size):
+            batch = dict(items[start:start + self.plan_batch_size])
+            try:
+                self._summary["plans_updated"] += await db_service.set_user_plans(batch)
+            except Exception as e:
+                log_error(e, f"Bulk run {self.batch_key}: plan update for {len(batch)} users")
+                self._summary["plan_update_failures"].extend(batch.keys())
+
+    async def _drain(self, workers: List[asyncio.Task]) -> None:
+        await asyncio.gather(*workers, return_exceptions=True)
+        await self._flush_plans()
+
+    async def results(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield per-item results as they complete, then a {"summary": ...} entry"""
+        queue: asyncio.Queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            for _ in range(len(self.operations)):
+                result = await queue.get()
+                self._summary["succeeded" if result["success"] else "failed"] += 1
+                yield result
+                if len(self._plans) >= self.plan_batch_size:
+                    await self._flush_plans()
+        finally:
+            # Client gone: stop starting new items, but finish in-flight ones and record their plans
+            self._next = len(self.operations)
+            await asyncio.shield(self._drain(workers))
+
+        yield {"summary": {"batch_key": self.batch_key, **self._summary}}
@@ -0,0 +1,176 @@
+"""Process-wide cache of Stripe prices and products"""
+
+import asyncio
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import stripe
+
+from config.settings import settings
+from config.logging_config import logger, log_error
+from services.stripe_gateway import stripe_gateway
+
+UNKNOWN_PLAN = "Unknown Plan"
+LOAD_RETRY_S = 60
+
+
+def _load_catalog() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    List every product and price from Stripe (blocking).
+
+    Returns:
+        (product id -> name, price id -> product id)
+    """
+    products = {
+        p.id: p.name
+        for p in stripe.Product.list(limit=100).auto_paging_iter()
+    }
+    price_products: Dict[str, str] = {}
+    for price in stripe.Price.list(limit=100).auto_paging_iter():
+        product = price.product
+        price_products[price.id] = product if isinstance(product, str) else product.id
+    return products, price_products
+
+
+class StripeCatalog:
+    """
+    Price -> product name lookups without per-request Stripe round trips.
+
+    The whole catalog is preloaded with two list scans and kept current by
+    price.*/product.* webhooks. A price that is still unknown (e.g. created
+    before its webhook arrived) is fetched once; concurrent lookups for the
+    same price share that fetch.
+    """
+
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+        self._products: Dict[str, str] = {}
+        self._price_products: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._load_failed_at: Optional[float] = None
+        self._load_future: Optional[asyncio.Future] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._preload_task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "loads": 0}
+
+    def _is_fresh(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return self.ttl_s <= 0 or time.monotonic() - self._loaded_at < self.ttl_s
+
+    async def ensure_loaded(self) -> None:
+        """Preload the catalog if it is empty or expired; concurrent callers share one load"""
+        if self._is_fresh():
+            return
+        if self._load_failed_at and time.monotonic() - self._load_failed_at < LOAD_RETRY_S:
+            return
+        if self._load_future:
+            await asyncio.shield(self._load_future)
+            return
+
+        self._load_future = asyncio.get_running_loop().create_future()
+        try:
+            products, price_products = await stripe_gateway.call(
+                _load_catalog,
+                timeout=settings.STRIPE_LIST_TIMEOUT_S
+            )
+            self._products.update(products)
+            self._price_products.update(price_products)
+            self._loaded_at = time.monotonic()
+            self._load_failed_at = None
+            self._stats["loads"] += 1
+            logger.info(f"Stripe catalog loaded: {len(products)} products, {len(price_products)} prices")
+        except Exception as e:
+            # Serve what we have; misses fall back to single lookups
+            self._load_failed_at = time.monotonic()
+            log_error(e, "Stripe catalog preload")
+        finally:
+            self._load_future.set_result(None)
+            self._load_future = None
+
+    def start_preload(self) -> None:
+        """Load the catalog in the background so startup does not wait on Stripe"""
+        if self._preload_task is None or self._preload_task.done():
+            self._preload_task = asyncio.create_task(self.ensure_loaded())
+
+    async def stop(self) -> None:
+        """Cancel a preload that is still running"""
+        if self._preload_task and not self._preload_task.done():
+            self._preload_task.cancel()
+        self._preload_task = None
+
+    async def _fetch_price(self, price_id: str) -> str:
+        try:
+            price = await stripe_gateway.call(stripe.Price.retrieve, price_id, expand=["product"])
+            self._products[price.product.id] = price.product.name
+            self._price_products[price_id] = price.product.id
+            return price.product.name
+        except Exception as e:
+            logger.warning(f"Error retrieving product for price {price_id}: {e}")
+            return UNKNOWN_PLAN
+
+    async def product_name(self, price_id: Optional[str]) -> str:
+        """
+        Product name for a price id.
+
+        Args:
+            price_id: Stripe price id
+
+        Returns:
+            Product name, or "Unknown Plan" if it cannot be resolved
+        """
+        if not price_id:
+            return UNKNOWN_PLAN
+
+        await self.ensure_loaded()
+        product_id = self._price_products.get(price_id)
+        if product_id in self._products:
+            self._stats["hits"] += 1
+            return self._products[product_id]
+
+        self._stats["misses"] += 1
+        inflight = self._inflight.get(price_id)
+        if inflight:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[price_id] = future
+        try:
+            name = await self._fetch_price(price_id)
+            future.set_result(name)
+            return name
+        finally:
+            if not future.done():
+                future.set_result(UNKNOWN_PLAN)
+            del self._inflight[price_id]
+
+    async def product_names(self, price_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Resolve several price ids at once; unknown prices are fetched concurrently"""
+        unique = {p for p in price_ids if p}
+        names = await asyncio.gather(*(self.product_name(p) for p in unique))
+        return dict(zip(unique, names))
+
+    def apply_event(self, event: Dict[str, Any]) -> None:
+        """Update the cache from a price.* or product.* webhook"""
+        event_type: str = event["type"]
+        obj = event["data"]["object"]
+
+        if event_type.startswith("product."):
+            # Deleted products keep their name: old subscriptions still reference them
+            if obj.get("name"):
+                self._products[obj["id"]] = obj["name"]
+        elif event_type.startswith("price."):
+            product = obj.get("product")
+            self._price_products[obj["id"]] = product if isinstance(product, str) else product["id"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size and hit counters"""
+        return {
+            "products": len(self._products),
+            "prices": len(self._price_products),
+            "loaded": self._loaded_at is not None,
+            **self._stats,
+        }
+
+
+stripe_catalog = StripeCatalog(ttl_s=settings.STRIPE_CATALOG_TTL_S)
@@ -0,0 +1,275 @@
+"""Durable Stripe webhook event log and its background consumer"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set
+
+from config.settings import settings
+from config.logging_config import logger, log_error
+from services.database import DatabaseService, db_service
+from services.invoice_cache import invoice_cache
+from services.stripe_mirror import plain_data, stripe_mirror
+
+
+def event_customer_id(event: Dict[str, Any]) -> Optional[str]:
+    """Stripe customer an event belongs to (its ordering lane), if any"""
+    obj = event["data"]["object"]
+    if obj.get("object") == "customer":
+        return obj.get("id")
+    customer = obj.get("customer")
+    return customer.get("id") if isinstance(customer, dict) else customer
+
+
+async def handle_event(event: Dict[str, Any]) -> None:
+    """
+    Apply a Stripe event to the application.
+
+    Raises on failure so the caller can retry; every step is idempotent.
+    """
+    event_type = event["type"]
+    obj = event["data"]["object"]
+
+    # Subscription created or upgraded
+    if event_type == "checkout.session.completed":
+        # Update user profile plan and stripe_customer_id
+        await db_service.set_user_plan(obj["client_reference_id"], "pro", obj["customer"])
+    elif event_type == "customer.subscription.deleted":
+        # Downgrade user to free
+        user_id = obj.get("client_reference_id") or await db_service.lookup_user_by_stripe(obj["customer"])
+        if user_id:
+            await db_service.set_user_plan(user_id, "free")
+        else:
+            logger.warning(f"No user for Stripe customer {obj['customer']} ({event['id']})")
+    # Add more Stripe event types as needed
+
+    if settings.STRIPE_MIRROR_ENABLED and db_service.pool:
+        await stripe_mirror.apply_event(event)
+
+    # After the mirror write, so a reload sees the new invoice state
+    if event_type.startswith("invoice."):
+        await invoice_cache.invalidate_everywhere(event_customer_id(event))
+
+
+class StripeEventLog:
+    """
+    Webhook events are written once (keyed by Stripe event id) and processed
+    asynchronously.
+
+    Each customer is a lane: only the oldest unfinished event of a lane can be
+    claimed, so one customer's events apply in Stripe creation order while
+    different customers proceed in parallel (across processes too, since
+    claims happen in Postgres with SKIP LOCKED). Failures are retried with
+    exponential backoff and parked as 'dead' after max_attempts so they stop
+    blocking their lane.
+    """
+
+    def __init__(
+        self,
+        db: DatabaseService,
+        workers: int,
+        poll_interval_s: float,
+        max_attempts: int,
+        lock_timeout_s: float
+    ):
+        self.db = db
+        self.workers = workers
+        self.poll_interval_s = poll_interval_s
+        self.max_attempts = max_attempts
+        self.lock_timeout_s = lock_timeout_s
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._last_purge = 0.0
+        self._stats: Dict[str, int] = {"recorded": 0, "duplicates": 0, "processed": 0, "failed": 0}
+
+    async def record(self, event: Dict[str, Any]) -> bool:
+        """
+        Store a verified webhook event.
+
+        Returns:
+            False if the event id was already recorded (a Stripe redelivery)
+        """
+        async with self.db.get_connection() as conn:
+            inserted = await conn.fetchval(
+                """
+                INSERT INTO stripe_events (id, type, customer_id, stripe_created, payload)
+                VALUES ($1, $2, $3, $4, $5)
+                ON CONFLICT (id) DO NOTHING
+                RETURNING id
+                """,
+                event["id"],
+                event["type"],
+                event_customer_id(event),
+                int(event.get("created") or time.time()),
+                plain_data(event),
+                timeout=settings.DB_WRITE_TIMEOUT_S
+            )
+
+        if inserted:
+            self._stats["recorded"] += 1
+            self._wakeup.set()
+            return True
+        self._stats["duplicates"] += 1
+        return False
+
+    async def _claim(self, limit: int) -> list:
+        """Claim up to `limit` lane heads that are due"""
+        async with self.db.get_connection() as conn:
+            return await conn.fetch(
+                """
+                UPDATE stripe_events e
+                SET status = 'processing', attempts = e.attempts + 1, locked_at = NOW()
+                WHERE e.id IN (
+                    SELECT s.id FROM stripe_events s
+                    WHERE s.id IN (
+                        SELECT head.id FROM (
+                            SELECT DISTINCT ON (COALESCE(customer_id, id))
+                                   id, status, next_attempt_at, locked_at
+                            FROM stripe_events
+                            WHERE status IN ('pending', 'processing', 'failed')
+                            ORDER BY COALESCE(customer_id, id), stripe_created, received_at, id
+                        ) head
+                        WHERE head.next_attempt_at <= NOW()
+                        AND (head.status <> 'processing' OR head.locked_at < NOW() - make_interval(secs => $2))
+                        ORDER BY head.next_attempt_at
+                        LIMIT $1
+                    )
+                    FOR UPDATE SKIP LOCKED
+                )
+                AND (e.status <> 'processing' OR e.locked_at < NOW() - make_interval(secs => $2))
+                RETURNING e.id, e.type, e.attempts, e.payload
+                """,
+                limit,
+                self.lock_timeout_s,
+                timeout=settings.DB_WRITE_TIMEOUT_S
+            )
+
+    async def _process(self, row: Any) -> None:
+        event = row["payload"]
+        try:
+            await handle_event(event)
+        except Exception as e:
+            self._stats["failed"] += 1
+            dead = row["attempts"] >= self.max_attempts
+            backoff_s = min(5 * 2 ** (row["attempts"] - 1), 3600)
+            log_error(e, f"Stripe event {row['id']} ({row['type']}), attempt {row['attempts']}")
+            await self._finish(row["id"], "dead" if dead else "failed", str(e)[:1000], backoff_s)
+            return
+
+        self._stats["processed"] += 1
+        await self._finish(row["id"], "processed")
+
+    async def _finish(self, event_id: str, status: str, error: Optional[str] = None, backoff_s: float = 0) -> None:
+        try:
+            async with self.db.get_connection() as conn:
+                await conn.execute(
+                    """
+                    UPDATE stripe_events
+                    SET status = $2,
+                        last_error = $3,
+                        locked_at = NULL,
+                        next_attempt_at = NOW() + make_interval(secs => $4),
+                        processed_at = CASE WHEN $2 = 'processed' THEN NOW() ELSE processed_at END
+                    WHERE id = $1
+                    """,
+                    event_id,
+                    status,
+                    error,
+                    float(backoff_s),
+                    timeout=settings.DB_WRITE_TIMEOUT_S
+                )
+        except Exception as e:
+            # The claim expires after lock_timeout_s and the event is retried
+            log_error(e, f"Stripe event {event_id} status update")
+
+    async def _purge(self) -> None:
+        """Drop processed events past the retention window (at most hourly)"""
+        if time.monotonic() - self._last_purge < 3600:
+            return
+        self._last_purge = time.monotonic()
+        async with self.db.get_connection() as conn:
+            await conn.execute(
+                "DELETE FROM stripe_events WHERE status = 'processed' AND processed_at < NOW() - make_interval(days => $1)",
+                settings.STRIPE_EVENT_RETENTION_DAYS,
+                timeout=settings.DB_PLAN_WRITE_TIMEOUT_S
+            )
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._inflight.discard(task)
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            free = self.workers - len(self._inflight)
+            rows = []
+            if free > 0:
+                try:
+                    rows = await self._claim(free)
+                except Exception as e:
+                    log_error(e, "Stripe event claim")
+
+            for row in rows:
+                task = asyncio.create_task(self._process(row))
+                self._inflight.add(task)
+                task.add_done_callback(self._done)
+
+            if rows and len(rows) == free:
+                continue  # backlog: keep claiming as slots free up
+
+            if not self._inflight:
+                try:
+                    await self._purge()
+                except Exception as e:
+                    log_error(e, "Stripe event purge")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the background consumer"""
+        if self.workers > 0 and not self._task:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Stripe event consumer started ({self.workers} workers)")
+
+    async def stop(self) -> None:
+        """Stop claiming and wait briefly for in-flight events"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._inflight:
+            await asyncio.wait(self._inflight, timeout=10)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Queue depth by status and consumer counters"""
+        async with self.db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT status, COUNT(*) AS n, EXTRACT(EPOCH FROM NOW() - MIN(received_at)) AS oldest_s
+                FROM stripe_events
+                WHERE status <> 'processed'
+                GROUP BY status
+                """,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+        return {
+            "queue": {r["status"]: {"count": r["n"], "oldest_age_s": round(float(r["oldest_s"]), 1)} for r in rows},
+            "in_flight": self.in_flight,
+            "running": self._task is not None,
+            **self._stats,
+        }
+
+
+stripe_event_log = StripeEventLog(
+    db_service,
+    workers=settings.STRIPE_EVENT_WORKERS,
+    poll_interval_s=settings.STRIPE_EVENT_POLL_INTERVAL_S,
+    max_attempts=settings.STRIPE_EVENT_MAX_ATTEMPTS,
+    lock_timeout_s=settings.STRIPE_EVENT_LOCK_TIMEOUT_S,
+)
@@ -0,0 +1,163 @@
+"""Non-blocking gateway for Stripe API calls"""
+
+import asyncio
+import functools
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import stripe
+
+from config.settings import settings
+from config.logging_config import logger
+
+T = TypeVar("T")
+
+# Every Stripe caller imports this module; settings stays free of the SDK import
+stripe.api_key = settings.STRIPE_SECRET_KEY or None
+
+# Retries are owned by the gateway; the SDK's own retry loop would multiply
+# attempts and hold a pool thread through its backoff sleeps
+stripe.max_network_retries = 0
+stripe.default_http_client = stripe.RequestsClient(timeout=settings.STRIPE_REQUEST_TIMEOUT_S)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Network failures, rate limits and Stripe 5xx responses are safe to retry"""
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    if isinstance(error, stripe.error.APIError):
+        return (error.http_status or 500) >= 500
+    return False
+
+
+class StripeGateway:
+    """
+    Runs the blocking Stripe SDK on a dedicated, bounded thread pool.
+
+    Handlers await gateway calls instead of calling the SDK directly, so a slow
+    Stripe request (or an admin paging through every subscription) never blocks
+    the event loop. Retries happen here, with exponential backoff; mutating
+    calls carry one idempotency key across all attempts so a retried request is
+    never applied twice.
+    """
+
+    def __init__(self, max_concurrency: int, request_timeout_s: float, max_retries: int):
+        self.max_concurrency = max_concurrency
+        self.request_timeout_s = request_timeout_s
+        self.max_retries = max_retries
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="stripe")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._stats: Dict[str, int] = {
+            "in_flight": 0,
+            "waiting": 0,
+            "calls": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "errors": 0,
+        }
+
+    def _release(self, future: asyncio.Future) -> None:
+        """Free the slot once the pool thread is done (mark a late error as retrieved)"""
+        if not future.cancelled():
+            future.exception()
+        self._stats["in_flight"] -= 1
+        self._semaphore.release()
+
+    async def _run_once(self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any], timeout: float) -> T:
+        loop = asyncio.get_running_loop()
+        self._stats["waiting"] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._stats["waiting"] -= 1
+        self._stats["in_flight"] += 1
+        try:
+            future = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._stats["in_flight"] -= 1
+            self._semaphore.release()
+            raise
+
+        # A timed-out call keeps running in its thread, so the slot is only
+        # released when the thread finishes; shield keeps wait_for from
+        # marking the future done early
+        future.add_done_callback(self._release)
+        return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+
+    async def call(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        **kwargs: Any
+    ) -> T:
+        """
+        Run a blocking Stripe call (or a function making several) off the event loop.
+
+        Args:
+            fn: SDK method or plain function to run in the Stripe thread pool
+            *args: Positional arguments for fn
+            timeout: Overall deadline per attempt in seconds (defaults to STRIPE_REQUEST_TIMEOUT_S)
+            retries: Retry budget for transient errors (defaults to STRIPE_MAX_RETRIES)
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Whatever fn returns
+
+        Raises:
+            asyncio.TimeoutError: If an attempt exceeds the deadline
+            stripe.error.StripeError: If Stripe rejects the call or retries are exhausted
+        """
+        timeout = timeout or self.request_timeout_s
+        retries = self.max_retries if retries is None else retries
+        name = getattr(fn, "__qualname__", repr(fn))
+        attempt = 0
+
+        while True:
+            self._stats["calls"] += 1
+            try:
+                return await self._run_once(fn, args, kwargs, timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                logger.warning(f"Stripe call {name} timed out after {timeout}s")
+                raise
+            except Exception as e:
+                if attempt >= retries or not _is_retryable(e):
+                    self._stats["errors"] += 1
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                delay = min(0.5 * 2 ** (attempt - 1), 8.0) * (0.5 + random.random() / 2)
+                logger.warning(f"Stripe call {name} failed ({type(e).__name__}), retry {attempt}/{retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def mutate(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        idempotency_key: Optional[str] = None,
+        **kwargs: Any
+    ) -> T:
+        """
+        Run a state-changing Stripe call with an idempotency key.
+
+        The same key is sent on every retry, so Stripe applies the change at
+        most once. Pass a caller-supplied key (e.g. from an Idempotency-Key
+        header) to make client retries safe as well.
+        """
+        kwargs["idempotency_key"] = idempotency_key or str(uuid.uuid4())
+        return await self.call(fn, *args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {"max_concurrency": self.max_concurrency, **self._stats}
+
+
+stripe_gateway = StripeGateway(
+    max_concurrency=settings.STRIPE_MAX_CONCURRENCY,
+    request_timeout_s=settings.STRIPE_REQUEST_TIMEOUT_S,
+    max_retries=settings.STRIPE_MAX_RETRIES,
+)
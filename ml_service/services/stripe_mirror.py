@@ -0,0 +1,743 @@
+"""Local Postgres mirror of Stripe subscriptions, invoices, prices and products"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import stripe
+
+from config.settings import settings
+from config.logging_config import logger, log_database_operation, log_error
+from services.database import DatabaseService, db_service
+from services.stripe_gateway import stripe_gateway
+
+ACTIVE_STATUSES = ("active", "trialing", "past_due")
+RESOURCES = ("products", "prices", "subscriptions", "invoices")
+# Advisory lock held by the one process that runs reconcile passes
+RECONCILE_LOCK = "stripe_mirror_reconcile"
+# Stripe's subscription status enum (the list API also accepts "all")
+SUBSCRIPTION_STATUSES = (
+    "incomplete", "incomplete_expired", "trialing", "active", "past_due", "canceled", "unpaid", "paused",
+)
+
+
+def plain_data(obj: Any) -> Any:
+    """Convert StripeObjects (dict subclasses) into plain JSON-serializable data"""
+    if isinstance(obj, dict):
+        return {k: plain_data(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [plain_data(v) for v in obj]
+    return obj
+
+
+def _ts(value: Optional[int]) -> Optional[datetime]:
+    """Unix timestamp to aware datetime"""
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value else None
+
+
+def _id(value: Any) -> Optional[str]:
+    """Id of an expandable field (either an id string or an expanded object)"""
+    if isinstance(value, dict):
+        return value.get("id")
+    return value
+
+
+def product_row(obj: Dict[str, Any], source_ts: int) -> Tuple:
+    data = plain_data(obj)
+    return (data["id"], data.get("name"), data.get("active", True), data, source_ts)
+
+
+def price_row(obj: Dict[str, Any], source_ts: int) -> Tuple:
+    data = plain_data(obj)
+    recurring = data.get("recurring") or {}
+    return (
+        data["id"],
+        _id(data.get("product")),
+        data.get("nickname"),
+        data.get("unit_amount"),
+        data.get("currency"),
+        recurring.get("interval"),
+        recurring.get("interval_count"),
+        data.get("active", True),
+        data,
+        source_ts,
+    )
+
+
+def subscription_items(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten subscription items into the shape the admin UI expects"""
+    items = []
+    for item in (data.get("items") or {}).get("data") or []:
+        price = item.get("price") or {}
+        if isinstance(price, str):
+            price = {"id": price}
+        recurring = price.get("recurring") or {}
+        items.append({
+            "price_id": price.get("id"),
+            "product_id": _id(price.get("product")),
+            "nickname": price.get("nickname"),
+            "amount": price.get("unit_amount"),
+            "currency": price.get("currency"),
+            "interval": recurring.get("interval"),
+            "quantity": item.get("quantity"),
+        })
+    return items
+
+
+def subscription_row(obj: Dict[str, Any], source_ts: int) -> Tuple:
+    data = plain_data(obj)
+    items = subscription_items(data)
+    customer = data.get("customer")
+    # Same basis as the live MRR figure: unit amount of monthly prices
+    monthly_amount = sum(i["amount"] or 0 for i in items if i["interval"] == "month")
+    return (
+        data["id"],
+        _id(customer),
+        customer.get("email") if isinstance(customer, dict) else None,
+        data.get("status"),
+        [i["price_id"] for i in items if i["price_id"]],
+        items,
+        monthly_amount,
+        bool(data.get("cancel_at_period_end")),
+        _ts(data.get("created")),
+        _ts(data.get("canceled_at")),
+        _ts(data.get("current_period_end")),
+        data,
+        source_ts,
+    )
+
+
+def invoice_row(obj: Dict[str, Any], source_ts: int) -> Tuple:
+    data = plain_data(obj)
+    return (
+        data["id"],
+        _id(data.get("customer")),
+        _id(data.get("subscription")),
+        data.get("status"),
+        data.get("collection_method"),
+        data.get("amount_due"),
+        data.get("amount_paid") or 0,
+        data.get("currency"),
+        _ts(data.get("created")),
+        _ts(data.get("period_start")),
+        _ts(data.get("period_end")),
+        data.get("hosted_invoice_url"),
+        data.get("invoice_pdf"),
+        data,
+        source_ts,
+    )
+
+
+_UPSERT_SQL = {
+    "products": """
+        INSERT INTO stripe_products (id, name, active, data, source_ts, synced_at)
+        VALUES ($1, $2, $3, $4, $5, NOW())
+        ON CONFLICT (id) DO UPDATE SET
+            name = EXCLUDED.name,
+            active = EXCLUDED.active,
+            data = EXCLUDED.data,
+            source_ts = EXCLUDED.source_ts,
+            synced_at = NOW()
+        WHERE stripe_products.source_ts <= EXCLUDED.source_ts
+    """,
+    "prices": """
+        INSERT INTO stripe_prices
+        (id, product_id, nickname, unit_amount, currency, recurring_interval, recurring_interval_count, active, data, source_ts, synced_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, NOW())
+        ON CONFLICT (id) DO UPDATE SET
+            product_id = EXCLUDED.product_id,
+            nickname = EXCLUDED.nickname,
+            unit_amount = EXCLUDED.unit_amount,
+            currency = EXCLUDED.currency,
+            recurring_interval = EXCLUDED.recurring_interval,
+            recurring_interval_count = EXCLUDED.recurring_interval_count,
+            active = EXCLUDED.active,
+            data = EXCLUDED.data,
+            source_ts = EXCLUDED.source_ts,
+            synced_at = NOW()
+        WHERE stripe_prices.source_ts <= EXCLUDED.source_ts
+    """,
+    "subscriptions": """
+        INSERT INTO stripe_subscriptions
+        (id, customer_id, customer_email, status, price_ids, items, monthly_amount, cancel_at_period_end,
+         created, canceled_at, current_period_end, data, source_ts, synced_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, NOW())
+        ON CONFLICT (id) DO UPDATE SET
+            customer_id = EXCLUDED.customer_id,
+            customer_email = COALESCE(EXCLUDED.customer_email, stripe_subscriptions.customer_email),
+            status = EXCLUDED.status,
+            price_ids = EXCLUDED.price_ids,
+            items = EXCLUDED.items,
+            monthly_amount = EXCLUDED.monthly_amount,
+            cancel_at_period_end = EXCLUDED.cancel_at_period_end,
+            created = EXCLUDED.created,
+            canceled_at = EXCLUDED.canceled_at,
+            current_period_end = EXCLUDED.current_period_end,
+            data = EXCLUDED.data,
+            source_ts = EXCLUDED.source_ts,
+            synced_at = NOW()
+        WHERE stripe_subscriptions.source_ts <= EXCLUDED.source_ts
+    """,
+    "invoices": """
+        INSERT INTO stripe_invoices
+        (id, customer_id, subscription_id, status, collection_method, amount_due, amount_paid, currency,
+         created, period_start, period_end, hosted_invoice_url, invoice_pdf, data, source_ts, synced_at)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15, NOW())
+        ON CONFLICT (id) DO UPDATE SET
+            customer_id = EXCLUDED.customer_id,
+            subscription_id = EXCLUDED.subscription_id,
+            status = EXCLUDED.status,
+            collection_method = EXCLUDED.collection_method,
+            amount_due = EXCLUDED.amount_due,
+            amount_paid = EXCLUDED.amount_paid,
+            currency = EXCLUDED.currency,
+            created = EXCLUDED.created,
+            period_start = EXCLUDED.period_start,
+            period_end = EXCLUDED.period_end,
+            hosted_invoice_url = EXCLUDED.hosted_invoice_url,
+            invoice_pdf = EXCLUDED.invoice_pdf,
+            data = EXCLUDED.data,
+            source_ts = EXCLUDED.source_ts,
+            synced_at = NOW()
+        WHERE stripe_invoices.source_ts <= EXCLUDED.source_ts
+    """,
+}
+
+_ROW_BUILDERS = {
+    "products": product_row,
+    "prices": price_row,
+    "subscriptions": subscription_row,
+    "invoices": invoice_row,
+}
+
+
+def _list_page(resource: str, starting_after: Optional[str]) -> Any:
+    """Fetch one page of a resource from the Stripe API (blocking)"""
+    params: Dict[str, Any] = {"limit": 100}
+    if starting_after:
+        params["starting_after"] = starting_after
+
+    if resource == "products":
+        return stripe.Product.list(**params)
+    if resource == "prices":
+        return stripe.Price.list(**params)
+    if resource == "subscriptions":
+        return stripe.Subscription.list(status="all", expand=["data.customer"], **params)
+    if resource == "invoices":
+        return stripe.Invoice.list(**params)
+    raise ValueError(f"Unknown Stripe resource: {resource}")
+
+
+class StripeMirror:
+    """Keeps the stripe_* mirror tables current and serves admin queries from them"""
+
+    def __init__(self, db: DatabaseService):
+        self.db = db
+        self._ready = False
+        self._sync_task: Optional[asyncio.Task] = None
+        self._reconcile_task: Optional[asyncio.Task] = None
+
+    # --- Writes -------------------------------------------------------------
+
+    async def upsert(self, resource: str, objects: Iterable[Dict[str, Any]], source_ts: int) -> int:
+        """Upsert Stripe objects of one resource type; stale data is ignored"""
+        rows = [_ROW_BUILDERS[resource](obj, source_ts) for obj in objects]
+        if not rows:
+            return 0
+
+        async with self.db.get_connection() as conn:
+            await conn.executemany(_UPSERT_SQL[resource], rows, timeout=settings.DB_WRITE_TIMEOUT_S)
+
+        log_database_operation("UPSERT", f"stripe_{resource} ({len(rows)} rows)", success=True)
+        return len(rows)
+
+    async def apply_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply a webhook event to the mirror.
+
+        Returns:
+            True if the event type is mirrored
+        """
+        event_type: str = event["type"]
+        obj = event["data"]["object"]
+        source_ts = int(event.get("created") or time.time())
+
+        if event_type.startswith("customer.subscription."):
+            await self.upsert("subscriptions", [obj], source_ts)
+        elif event_type.startswith("invoice."):
+            await self.upsert("invoices", [obj], source_ts)
+        elif event_type.startswith("price."):
+            if event_type == "price.deleted":
+                obj = {**plain_data(obj), "active": False}
+            await self.upsert("prices", [obj], source_ts)
+        elif event_type.startswith("product."):
+            if event_type == "product.deleted":
+                obj = {**plain_data(obj), "active": False}
+            await self.upsert("products", [obj], source_ts)
+        elif event_type == "customer.updated":
+            async with self.db.get_connection() as conn:
+                await conn.execute(
+                    "UPDATE stripe_subscriptions SET customer_email = $2 WHERE customer_id = $1",
+                    obj["id"],
+                    obj.get("email"),
+                    timeout=settings.DB_WRITE_TIMEOUT_S
+                )
+        else:
+            return False
+        return True
+
+    # --- Backfill / reconcile -------------------------------------------------
+
+    async def sync_resource(self, resource: str, restart: bool = False) -> int:
+        """
+        Copy every object of a resource from Stripe into the mirror.
+
+        Progress is checkpointed after each page in stripe_sync_state, so an
+        interrupted run resumes where it stopped. A completed run clears the
+        cursor; running again is a full reconcile pass.
+
+        Args:
+            resource: One of RESOURCES
+            restart: Ignore any saved cursor and start from the newest object
+
+        Returns:
+            Number of objects written
+        """
+        if resource not in RESOURCES:
+            raise ValueError(f"Unknown Stripe resource: {resource}")
+
+        async with self.db.get_connection() as conn:
+            state = await conn.fetchrow(
+                "SELECT cursor FROM stripe_sync_state WHERE resource = $1",
+                resource,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+            await conn.execute(
+                """
+                INSERT INTO stripe_sync_state (resource, run_started_at, updated_at)
+                VALUES ($1, NOW(), NOW())
+                ON CONFLICT (resource) DO UPDATE SET
+                    run_started_at = CASE WHEN stripe_sync_state.cursor IS NULL OR $2 THEN NOW()
+                                          ELSE stripe_sync_state.run_started_at END,
+                    updated_at = NOW()
+                """,
+                resource,
+                restart,
+                timeout=settings.DB_WRITE_TIMEOUT_S
+            )
+
+        cursor = None if restart or not state else state["cursor"]
+        written = 0
+        logger.info(f"Stripe mirror sync started for {resource} (cursor: {cursor or 'start'})")
+
+        while True:
+            fetched_at = int(time.time())
+            page = await stripe_gateway.call(_list_page, resource, cursor)
+            objects = list(page.data)
+            written += await self.upsert(resource, objects, fetched_at)
+            cursor = objects[-1]["id"] if objects else cursor
+            done = not page.has_more or not objects
+
+            async with self.db.get_connection() as conn:
+                await conn.execute(
+                    """
+                    UPDATE stripe_sync_state
+                    SET cursor = $2,
+                        rows_synced = rows_synced + $3,
+                        last_completed_at = CASE WHEN $4 THEN NOW() ELSE last_completed_at END,
+                        updated_at = NOW()
+                    WHERE resource = $1
+                    """,
+                    resource,
+                    None if done else cursor,
+                    len(objects),
+                    done,
+                    timeout=settings.DB_WRITE_TIMEOUT_S
+                )
+
+            if done:
+                break
+
+        logger.info(f"Stripe mirror sync finished for {resource}: {written} objects")
+        return written
+
+    async def sync_all(self, resources: Iterable[str] = RESOURCES, restart: bool = False) -> Dict[str, int]:
+        """Sync resources in dependency order (catalog before subscriptions)"""
+        results = {}
+        for resource in resources:
+            try:
+                results[resource] = await self.sync_resource(resource, restart=restart)
+            except Exception as e:
+                log_error(e, f"Stripe mirror sync for {resource}")
+                results[resource] = -1
+        self._ready = False  # re-check readiness on next read
+        return results
+
+    def start_sync(self, resources: Iterable[str] = RESOURCES, restart: bool = False) -> bool:
+        """
+        Start a background sync unless one is already running.
+
+        Returns:
+            True if a new sync was started
+        """
+        if self._sync_task and not self._sync_task.done():
+            return False
+        self._sync_task = asyncio.create_task(self.sync_all(list(resources), restart=restart))
+        return True
+
+    async def _reconcile_loop(self, interval_s: float) -> None:
+        while True:
+            try:
+                async with self.db.advisory_lock(RECONCILE_LOCK) as holder:
+                    if holder:
+                        logger.info("Stripe mirror reconcile passes run in this process")
+                        while True:
+                            await asyncio.sleep(interval_s)
+                            if holder.is_closed():
+                                logger.warning("Stripe mirror reconcile lock lost; trying to take it again")
+                                break
+                            if not self._sync_task or self._sync_task.done():
+                                self._sync_task = asyncio.create_task(self.sync_all())
+                                await self._sync_task
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log_error(e, "Stripe mirror reconcile lock")
+            await asyncio.sleep(interval_s)
+
+    def start_reconcile_loop(self, interval_s: float) -> None:
+        """
+        Periodically re-run the sync to repair anything missed by webhooks.
+
+        Every worker and instance starts the loop, but passes only run in the
+        process holding the RECONCILE_LOCK advisory lock; the others try to
+        take it once per interval, so a new holder takes over if it exits.
+        """
+        if interval_s > 0 and not self._reconcile_task:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop(interval_s))
+
+    async def stop(self) -> None:
+        """Cancel background sync tasks and release the reconcile lock"""
+        for task in (self._reconcile_task, self._sync_task):
+            if task and not task.done():
+                task.cancel()
+        if self._reconcile_task:
+            # Closes the lock connection before the pools go away
+            await asyncio.gather(self._reconcile_task, return_exceptions=True)
+        self._reconcile_task = None
+        self._sync_task = None
+
+    async def get_sync_state(self) -> List[Dict[str, Any]]:
+        """Backfill progress per resource"""
+        async with self.db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM stripe_sync_state ORDER BY resource",
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+        state = [dict(r) for r in rows]
+        for row in state:
+            row["running"] = bool(self._sync_task and not self._sync_task.done())
+        return state
+
+    async def is_ready(self) -> bool:
+        """True once subscriptions and invoices have completed at least one full sync"""
+        if self._ready:
+            return True
+        if not settings.STRIPE_MIRROR_ENABLED or not self.db.pool:
+            return False
+
+        try:
+            async with self.db.get_connection(readonly=True) as conn:
+                completed = await conn.fetchval(
+                    """
+                    SELECT COUNT(*) FROM stripe_sync_state
+                    WHERE resource IN ('subscriptions', 'invoices') AND last_completed_at IS NOT NULL
+                    """,
+                    timeout=settings.DB_READ_TIMEOUT_S
+                )
+            self._ready = completed == 2
+        except Exception as e:
+            log_error(e, "Stripe mirror readiness check")
+            return False
+        return self._ready
+
+    # --- Reads ----------------------------------------------------------------
+
+    async def get_saas_aggregates(self, now: datetime) -> Dict[str, Any]:
+        """
+        Inputs for the SaaS metrics endpoint.
+
+        Read from the daily saas_metric_snapshots rows (maintained by triggers
+        on the mirror tables). Current values are the running totals on the
+        latest row and "last month" values are the totals as of 30 days ago;
+        only the last 60 days of rows are summed. Day boundaries are UTC dates.
+        """
+        today = now.date()
+        start_of_month = today.replace(day=1)
+        last_30 = today - timedelta(days=30)
+        previous_window = last_30 - timedelta(days=30)
+
+        async with self.db.get_connection(readonly=True) as conn:
+            totals = await conn.fetchrow(
+                """
+                WITH latest AS (
+                    SELECT active_total, mrr_total_cents, created_total, earnings_total_cents
+                    FROM saas_metric_snapshots
+                    ORDER BY snapshot_date DESC
+                    LIMIT 1
+                ),
+                month_ago AS (
+                    SELECT active_total, mrr_total_cents
+                    FROM saas_metric_snapshots
+                    WHERE snapshot_date < $2
+                    ORDER BY snapshot_date DESC
+                    LIMIT 1
+                ),
+                recent AS (
+                    SELECT
+                        COALESCE(SUM(new_subscribers) FILTER (WHERE snapshot_date >= $1), 0) AS new_this_month,
+                        COALESCE(SUM(new_subscribers) FILTER (WHERE snapshot_date >= $2), 0) AS new_last_30,
+                        COALESCE(SUM(churned_subscribers) FILTER (WHERE snapshot_date >= $1), 0) AS churned_this_month,
+                        COALESCE(SUM(subscriptions_created) FILTER (WHERE snapshot_date >= $2), 0) AS created_last_30,
+                        COALESCE(SUM(earnings_cents) FILTER (WHERE snapshot_date >= $1), 0)::bigint AS earnings_this_month_cents,
+                        COALESCE(SUM(earnings_cents) FILTER (WHERE snapshot_date >= $2), 0)::bigint AS earnings_last_30_cents,
+                        COALESCE(SUM(churned_subscribers) FILTER (WHERE snapshot_date < $2), 0) AS churned_last_month
+                    FROM saas_metric_snapshots
+                    WHERE snapshot_date >= $3
+                )
+                SELECT
+                    recent.*,
+                    COALESCE(latest.mrr_total_cents, 0) AS mrr_cents,
+                    COALESCE(latest.active_total, 0) AS active,
+                    COALESCE(latest.created_total, 0) AS total,
+                    COALESCE(latest.earnings_total_cents, 0) AS all_earnings_cents,
+                    COALESCE(month_ago.mrr_total_cents, 0) AS mrr_last_month_cents,
+                    COALESCE(month_ago.active_total, 0) AS active_last_month
+                FROM recent
+                LEFT JOIN latest ON true
+                LEFT JOIN month_ago ON true
+                """,
+                start_of_month,
+                last_30,
+                previous_window,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+            by_month = await conn.fetch(
+                """
+                SELECT to_char(snapshot_date, 'YYYY-MM') AS label, SUM(subscriptions_created) AS n
+                FROM saas_metric_snapshots
+                GROUP BY 1
+                HAVING SUM(subscriptions_created) > 0
+                ORDER BY 1
+                """,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+            recent_canceled = await conn.fetch(
+                """
+                SELECT s.customer_email, EXTRACT(EPOCH FROM s.canceled_at)::bigint AS canceled_at,
+                       COALESCE(pr.name, 'Unknown Plan') AS plan
+                FROM stripe_subscriptions s
+                LEFT JOIN stripe_prices p ON p.id = s.price_ids[1]
+                LEFT JOIN stripe_products pr ON pr.id = p.product_id
+                WHERE s.status = 'canceled'
+                ORDER BY s.created DESC
+                LIMIT 20
+                """,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+
+        return {
+            "mrr": totals["mrr_cents"] / 100,
+            "all_earnings": totals["all_earnings_cents"] / 100,
+            "earnings_this_month": totals["earnings_this_month_cents"] / 100,
+            "earnings_last_30": totals["earnings_last_30_cents"] / 100,
+            "active_count": totals["active"],
+            "total_count": totals["total"],
+            "new_this_month": totals["new_this_month"],
+            "new_last_30": totals["new_last_30"],
+            "churned_this_month": totals["churned_this_month"],
+            "created_last_30": totals["created_last_30"],
+            "by_month": {r["label"]: r["n"] for r in by_month},
+            "recent_canceled": [
+                {"customer_email": r["customer_email"] or "", "canceled_at": r["canceled_at"], "plan": r["plan"]}
+                for r in recent_canceled
+            ],
+            "mrr_last_month": totals["mrr_last_month_cents"] / 100,
+            "active_last_month": totals["active_last_month"],
+            "churned_last_month": totals["churned_last_month"],
+        }
+
+    async def get_saas_series(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Daily SaaS metrics between two dates (inclusive).
+
+        Days without activity are filled in; active subscribers and MRR carry
+        forward from the running total before the range.
+        """
+        async with self.db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                """
+                WITH days AS (
+                    SELECT d::date AS day FROM generate_series($1::date, $2::date, INTERVAL '1 day') AS d
+                ),
+                before AS (
+                    SELECT active_total, mrr_total_cents
+                    FROM saas_metric_snapshots
+                    WHERE snapshot_date < $1
+                    ORDER BY snapshot_date DESC
+                    LIMIT 1
+                ),
+                base AS (
+                    SELECT COALESCE(MAX(active_total), 0) AS active, COALESCE(MAX(mrr_total_cents), 0)::bigint AS mrr_cents
+                    FROM before
+                )
+                SELECT
+                    days.day,
+                    COALESCE(s.subscriptions_created, 0) AS subscriptions_created,
+                    COALESCE(s.new_subscribers, 0) AS new_subscribers,
+                    COALESCE(s.churned_subscribers, 0) AS churned_subscribers,
+                    COALESCE(s.earnings_cents, 0) AS earnings_cents,
+                    (base.active + SUM(COALESCE(s.active_delta, 0)) OVER w)::bigint AS active_subscribers,
+                    (base.mrr_cents + SUM(COALESCE(s.mrr_delta_cents, 0)) OVER w)::bigint AS mrr_cents
+                FROM days
+                CROSS JOIN base
+                LEFT JOIN saas_metric_snapshots s ON s.snapshot_date = days.day
+                WINDOW w AS (ORDER BY days.day)
+                ORDER BY days.day
+                """,
+                start,
+                end,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+
+        return [
+            {
+                "date": r["day"].isoformat(),
+                "mrr": r["mrr_cents"] / 100,
+                "activeSubscribers": r["active_subscribers"],
+                "newSubscribers": r["new_subscribers"],
+                "churnedSubscribers": r["churned_subscribers"],
+                "subscriptionsCreated": r["subscriptions_created"],
+                "earnings": r["earnings_cents"] / 100,
+            }
+            for r in rows
+        ]
+
+    async def subscription_records(self) -> List[Tuple]:
+        """All subscriptions as analytics records (SUBSCRIPTION_COLUMNS order)"""
+        async with self.db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT s.id, s.status,
+                       EXTRACT(EPOCH FROM s.created)::bigint,
+                       EXTRACT(EPOCH FROM s.canceled_at)::bigint,
+                       s.monthly_amount,
+                       s.price_ids[1],
+                       COALESCE(pr.name, 'Unknown Plan'),
+                       COALESCE(s.customer_email, '')
+                FROM stripe_subscriptions s
+                LEFT JOIN stripe_prices p ON p.id = s.price_ids[1]
+                LEFT JOIN stripe_products pr ON pr.id = p.product_id
+                ORDER BY s.created DESC
+                """,
+                timeout=settings.STRIPE_LIST_TIMEOUT_S
+            )
+        return [tuple(r) for r in rows]
+
+    async def list_subscribers(
+        self,
+        status: Optional[str] = None,
+        plan_id: Optional[str] = None,
+        created_after: Optional[int] = None,
+        created_before: Optional[int] = None,
+        after: Optional[Tuple[int, str]] = None,
+        limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        One page of subscribers with plan details, filtered in SQL.
+
+        Args:
+            status: Only subscriptions with this status
+            plan_id: Only subscriptions containing this price id
+            created_after: Unix timestamp lower bound (inclusive)
+            created_before: Unix timestamp upper bound (inclusive)
+            after: (created, subscription_id) of the last row already returned
+            limit: Page size
+
+        Returns:
+            (subscribers newest first, whether more rows follow)
+        """
+        after_created, after_id = after if after else (None, None)
+
+        async with self.db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT s.id, s.customer_id, s.customer_email, s.status,
+                       EXTRACT(EPOCH FROM s.created)::bigint AS created,
+                       EXTRACT(EPOCH FROM s.current_period_end)::bigint AS current_period_end,
+                       EXTRACT(EPOCH FROM s.canceled_at)::bigint AS canceled_at,
+                       COALESCE((
+                           SELECT jsonb_agg(i || jsonb_build_object('product_name', COALESCE(pr.name, 'Unknown Plan')))
+                           FROM jsonb_array_elements(s.items) AS i
+                           LEFT JOIN stripe_products pr ON pr.id = i->>'product_id'
+                       ), '[]'::jsonb) AS plans
+                FROM stripe_subscriptions s
+                WHERE ($1::text IS NULL OR s.status = $1)
+                AND ($2::text IS NULL OR s.price_ids @> ARRAY[$2::text])
+                AND ($3::timestamptz IS NULL OR s.created >= $3)
+                AND ($4::timestamptz IS NULL OR s.created <= $4)
+                AND ($5::timestamptz IS NULL OR (s.created, s.id) < ($5, $6::text))
+                ORDER BY s.created DESC, s.id DESC
+                LIMIT $7
+                """,
+                status,
+                plan_id,
+                _ts(created_after),
+                _ts(created_before),
+                _ts(after_created),
+                after_id,
+                limit + 1,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+
+        return [subscriber_entry(r) for r in rows[:limit]], len(rows) > limit
+
+    async def list_customer_invoices(self, customer_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """A customer's invoices, newest first, in the /api/stripe/invoices shape"""
+        async with self.db.get_connection(readonly=True) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT id, amount_due, amount_paid,
+                       EXTRACT(EPOCH FROM created)::bigint AS created,
+                       currency, hosted_invoice_url, invoice_pdf, status,
+                       EXTRACT(EPOCH FROM period_start)::bigint AS period_start,
+                       EXTRACT(EPOCH FROM period_end)::bigint AS period_end
+                FROM stripe_invoices
+                WHERE customer_id = $1
+                ORDER BY created DESC, id DESC
+                LIMIT $2
+                """,
+                customer_id,
+                limit,
+                timeout=settings.DB_READ_TIMEOUT_S
+            )
+        return [dict(r) for r in rows]
+
+
+def subscriber_entry(row: Any) -> Dict[str, Any]:
+    """Shape a mirror row like the live subscribers endpoint does"""
+    return {
+        "customer_id": row["customer_id"],
+        "subscription_id": row["id"],
+        "email": row["customer_email"] or "",
+        "status": row["status"],
+        "created": row["created"],
+        "current_period_end": row["current_period_end"],
+        "canceled_at": row["canceled_at"],
+        "is_active": row["status"] in ACTIVE_STATUSES,
+        "plans": row["plans"],
+    }
+
+
+stripe_mirror = StripeMirror(db_service)
@@ -0,0 +1,69 @@
+# tests/test_ai_recorder.py
+
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from services import ai_service as ai_module
+from services.ai_recorder import AIRecorder, iter_recordings, prompt_key
+from services.ai_service import AIService
+from utils.serialization import loads
+
+CORPUS = Path(__file__).resolve().parent.parent / "benchmarks" / "recordings"
+
+
+def _service(monkeypatch, recorder: AIRecorder) -> AIService:
+    monkeypatch.setattr(ai_module, "ai_recorder", recorder)
+    monkeypatch.setattr(ai_module.settings, "OPENAI_API_KEY", "test")
+    return AIService()
+
+
+def test_record_then_replay(tmp_path, monkeypatch):
+    service = _service(monkeypatch, AIRecorder("record", str(tmp_path)))
+    calls = []
+
+    async def fake_openai(prompt, model, max_tokens=None, temperature=None):
+        calls.append(prompt)
+        return '```json\n{"meals": [1, 2]}\n```'
+
+    monkeypatch.setattr(service, "call_openai", fake_openai)
+    plan = asyncio.run(service.generate_plan("meal prompt", "openai", "gpt-4o-mini", plan_type="meal"))
+    assert plan == {"meals": [1, 2]}
+
+    [entry] = list(iter_recordings(str(tmp_path)))
+    assert entry["key"] == prompt_key("openai", "gpt-4o-mini", "meal prompt")
+    assert entry["plan_type"] == "meal" and entry["response"].startswith("```json")
+    assert "meal prompt" not in (tmp_path / f"{entry['key']}.json").read_text()
+
+    # Replay needs neither the provider nor its key
+    monkeypatch.setattr(ai_module.settings, "OPENAI_API_KEY", "")
+    replayer = AIRecorder("replay", str(tmp_path), latency_scale=0)
+    monkeypatch.setattr(ai_module, "ai_recorder", replayer)
+    assert asyncio.run(service.generate_plan("meal prompt", "openai", "gpt-4o-mini")) == {"meals": [1, 2]}
+    assert len(calls) == 1
+
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(service.generate_plan("another prompt", "openai", "gpt-4o-mini", plan_type="meal"))
+    assert excinfo.value.status_code == 500
+    assert replayer.get_stats()["misses"] == 1
+
+
+def test_plan_type_match_replays_corpus(monkeypatch):
+    recorder = AIRecorder("replay", str(CORPUS), latency_scale=0, match="plan_type")
+    service = _service(monkeypatch, recorder)
+
+    meal = asyncio.run(service.generate_plan("unseen prompt", "openai", "gpt-4o-mini", plan_type="meal"))
+    workout = asyncio.run(service.generate_plan("unseen prompt", "openai", "gpt-4o-mini", plan_type="workout"))
+    assert "meals" in meal and "weekly_plan" in workout
+    assert recorder.get_stats()["substituted"] == 2
+
+
+def test_corpus_recordings_parse():
+    entries = list(iter_recordings(str(CORPUS)))
+    assert {e["plan_type"] for e in entries} == {"meal", "workout"}
+    for entry in entries:
+        assert entry["duration_s"] >= entry["ttft_s"] > 0
+        plan = loads(ai_module.ai_service.clean_json_response(entry["response"]))
+        assert ("meals" if entry["plan_type"] == "meal" else "weekly_plan") in plan
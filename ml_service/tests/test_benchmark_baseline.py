@@ -0,0 +1,58 @@
+# tests/test_benchmark_baseline.py
+
+import argparse
+
+from benchmarks import baseline
+
+
+def _args(tmp_path, **overrides) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    baseline.add_arguments(parser)
+    args = parser.parse_args(["--baseline", str(tmp_path / "bench.json")])
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+
+def test_find_regressions_uses_threshold_and_scale():
+    stored = {"fast": 10.0, "slow": 10.0, "removed": 5.0}
+    current = {"fast": 12.0, "slow": 13.0, "added": 99.0}
+
+    assert [r.case for r in baseline.find_regressions(stored, current, 0.25)] == ["slow"]
+    # Machine 40% slower overall: neither case regressed relative to it
+    assert baseline.find_regressions(stored, current, 0.25, scale=1.4) == []
+
+
+def test_small_absolute_slowdowns_are_noise():
+    # +100%, but only 0.5 us
+    assert baseline.find_regressions({"tiny": 0.5}, {"tiny": 1.0}, 0.5) == []
+    assert [r.case for r in baseline.find_regressions({"big": 5.0}, {"big": 10.0}, 0.5)] == ["big"]
+
+
+def test_median_scale_ignores_the_outlier():
+    stored = {"a": 10.0, "b": 20.0, "c": 30.0, "d": 40.0}
+    # Everything 20% slower, one case regressed 3x on top of that
+    current = {"a": 12.0, "b": 24.0, "c": 36.0, "d": 144.0}
+    assert abs(baseline.median_scale(stored, current) - 1.2) < 1e-9
+    assert [r.case for r in baseline.find_regressions(stored, current, 0.5, 1.2)] == ["d"]
+    # Too few shared cases for a median
+    assert baseline.median_scale({"a": 1.0, "b": 1.0}, {"a": 1.0, "b": 1.0}) is None
+
+
+def test_save_then_check(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline, "calibration_us", lambda: 100.0)
+    assert baseline.report("bench", {"case": 10.0}, _args(tmp_path, save=True)) == 0
+    stored = baseline.load_baseline("bench", tmp_path / "bench.json")
+    assert stored["results_us"] == {"case": 10.0}
+    assert stored["calibration_us"] == 100.0
+
+    assert baseline.report("bench", {"case": 11.0}, _args(tmp_path, check=True)) == 0
+    assert baseline.report("bench", {"case": 20.0}, _args(tmp_path, check=True)) == 1
+    # A noisy first measurement is re-run before failing
+    rerun = lambda names: {name: 10.5 for name in names}
+    assert baseline.report("bench", {"case": 20.0}, _args(tmp_path, check=True), rerun=rerun) == 0
+
+
+def test_check_without_baseline_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(baseline, "calibration_us", lambda: 100.0)
+    assert baseline.report("bench", {"case": 1.0}, _args(tmp_path, check=True)) == 1
@@ -0,0 +1,58 @@
+# tests/test_database.py
+
+import asyncio
+
+from services.database import DatabaseService
+
+
+class FakePool:
+    """Hands out connections until `available` runs out, then blocks"""
+
+    def __init__(self, available):
+        self.available = available
+        self.out = 0
+
+    def get_max_size(self):
+        return 10
+
+    def acquire(self, timeout=None):
+        pool = self
+
+        class Acquire:
+            async def __aenter__(self):
+                if pool.available == 0:
+                    await asyncio.sleep(3600)
+                pool.available -= 1
+                pool.out += 1
+                return self
+
+            async def __aexit__(self, *exc):
+                pool.available += 1
+                pool.out -= 1
+
+            async def fetchval(self, query, timeout=None):
+                return 1
+
+        return Acquire()
+
+
+def test_warm_up_checks_separate_connections():
+    db = DatabaseService()
+    db.pool = FakePool(available=4)
+
+    assert asyncio.run(db.warm_up(4)) == {"primary": 4}
+    assert db.pool.out == 0
+
+
+def test_cancelled_warm_up_releases_its_connections():
+    db = DatabaseService()
+    db.pool = FakePool(available=2)
+
+    async def run():
+        try:
+            await asyncio.wait_for(db.warm_up(4), 0.05)
+        except asyncio.TimeoutError:
+            pass
+
+    asyncio.run(run())
+    assert db.pool.out == 0 and db.pool.available == 2
@@ -0,0 +1,148 @@
+# tests/test_entitlements.py
+
+import asyncio
+
+from services import database as database_module
+from services.database import DatabaseService
+from services.entitlements import Entitlement, EntitlementCache
+
+
+def _cache(monkeypatch, plans):
+    db = DatabaseService()
+    cache = EntitlementCache(db, ttl_s=60, max_users=100)
+    loads = []
+
+    async def load(user_id):
+        loads.append(user_id)
+        plan_id, limit, used = plans[user_id]
+        return Entitlement(plan_id, limit, used)
+
+    monkeypatch.setattr(cache, "_load", load)
+    return db, cache, loads
+
+
+def test_cached_until_plan_changes(monkeypatch):
+    plans = {"u1": ("pro", 200, 10)}
+    db, cache, loads = _cache(monkeypatch, plans)
+
+    async def set_plan(user_id, plan_id):
+        plans[user_id] = (plan_id, 2, plans[user_id][2])
+        db._plans_changed([user_id])  # what set_user_plan does after its UPDATE
+
+    async def run():
+        first = await cache.get("u1")
+        second = await cache.get("u1")
+        await set_plan("u1", "free")
+        third = await cache.get("u1")
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert loads == ["u1", "u1"]
+    assert first.allows_generation and second.plan_id == "pro"
+    assert third.plan_id == "free" and not third.allows_generation
+
+
+def test_notify_wildcard_clears_everything(monkeypatch):
+    plans = {"u1": ("free", 2, 1), "u2": ("free", 2, 2)}
+    _, cache, loads = _cache(monkeypatch, plans)
+
+    async def run():
+        await cache.get("u1")
+        await cache.get("u2")
+        cache.invalidate("*")  # plans table changed
+        await cache.get("u1")
+
+    asyncio.run(run())
+    assert loads == ["u1", "u2", "u1"]
+
+
+def test_null_plan_or_limit_is_unlimited():
+    # refuse_quiz_over_quota compares against NULL and lets the insert through
+    assert Entitlement(None, None, 50).allows_generation
+    assert Entitlement("legacy", None, 50).allows_generation
+    assert Entitlement("free", 2, None).allows_generation
+    assert not Entitlement("free", 2, 3).allows_generation
+
+
+def test_missing_profile_is_not_cached(monkeypatch):
+    db = DatabaseService()
+    cache = EntitlementCache(db, ttl_s=60, max_users=100)
+    loads = []
+
+    async def load(user_id):
+        loads.append(user_id)
+        return None if len(loads) == 1 else Entitlement("free", 2, 1)
+
+    monkeypatch.setattr(cache, "_load", load)
+
+    async def run():
+        return await cache.get("u1"), await cache.get("u1")
+
+    first, second = asyncio.run(run())
+    assert first is None and second.plan_id == "free"
+    assert loads == ["u1", "u1"]
+
+
+class FakeListenConnection:
+    def __init__(self):
+        self.channels = {}
+        self.termination_listeners = []
+        self.closed = False
+
+    async def add_listener(self, channel, callback):
+        self.channels[channel] = callback
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.terminate()
+
+    def terminate(self):
+        self.closed = True
+        for callback in self.termination_listeners:
+            callback(self)
+
+    def notify(self, channel, payload):
+        self.channels[channel](self, 1, channel, payload)
+
+
+def test_listen_connection_is_restored(monkeypatch):
+    connections = []
+
+    async def connect(**kwargs):
+        if len(connections) == 1:
+            connections.append(None)
+            raise OSError("connection refused")
+        conn = FakeListenConnection()
+        connections.append(conn)
+        return conn
+
+    monkeypatch.setattr(database_module.asyncpg, "connect", connect)
+    monkeypatch.setattr(database_module, "LISTEN_RECONNECT_MIN_S", 0.0)
+    db, cache, loads = _cache(monkeypatch, {"u1": ("pro", 200, 10)})
+
+    async def run():
+        await cache.start()
+        await cache.get("u1")
+        connections[0].terminate()
+        listening_while_down = cache.get_stats()["listening"]
+        for _ in range(50):
+            await asyncio.sleep(0)
+            if db.is_listening:
+                break
+        # Invalidations missed while down: everything is reloaded
+        await cache.get("u1")
+        connections[-1].notify("entitlements", "u1")
+        await cache.get("u1")
+        await db.close()
+        return listening_while_down
+
+    listening_while_down = asyncio.run(run())
+    assert listening_while_down is False
+    assert len(connections) == 3 and connections[1] is None
+    assert cache.get_stats()["listening"]
+    assert loads == ["u1", "u1", "u1"]
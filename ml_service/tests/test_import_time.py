@@ -0,0 +1,36 @@
+# tests/test_import_time.py
+
+from benchmarks.bench_startup import cumulative_us, import_module, parse_importtime
+from config.settings import settings
+from services.ai_service import AIService
+
+PROVIDER_SDKS = {"openai", "anthropic", "google.generativeai", "llamaapi"}
+# `import app` measures 3-3.5 s here without provider SDKs (5.0 s with them). The
+# budget catches gross regressions; the module check is the strict guard
+APP_IMPORT_BUDGET_MS = 5000
+SETTINGS_IMPORT_BUDGET_MS = 500
+
+
+def test_app_import_skips_provider_sdks():
+    # import_module sets every provider key, so configured providers stay lazy too
+    rows = parse_importtime(import_module("app").stderr)
+    assert not PROVIDER_SDKS & {row.module for row in rows}
+    assert cumulative_us(rows, "app") / 1000 < APP_IMPORT_BUDGET_MS
+
+
+def test_settings_import_is_light():
+    rows = parse_importtime(import_module("config.settings").stderr)
+    assert "stripe" not in {row.module for row in rows}
+    assert cumulative_us(rows, "config.settings") / 1000 < SETTINGS_IMPORT_BUDGET_MS
+
+
+def test_clients_built_on_first_use(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "")
+    service = AIService()
+    assert service._clients == {}
+
+    client = service.openai_client
+    assert client is not None and service.openai_client is client
+    assert service.anthropic_client is None
+    assert "anthropic" not in service._clients
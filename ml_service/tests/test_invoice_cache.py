@@ -0,0 +1,105 @@
+# tests/test_invoice_cache.py
+
+import asyncio
+from types import SimpleNamespace
+
+from services import invoice_cache as invoice_cache_module
+from services.database import DatabaseService
+from services.invoice_cache import NOTIFY_CHANNEL, InvoiceCache
+
+
+def _invoice(invoice_id):
+    return SimpleNamespace(
+        id=invoice_id, amount_due=500, amount_paid=500, created=1700000000, currency="usd",
+        hosted_invoice_url=None, invoice_pdf=None, status="paid", period_start=None, period_end=None,
+    )
+
+
+def _patch_stripe(monkeypatch, calls, delay=0.0):
+    async def is_ready():
+        return False
+
+    async def call(fn, customer=None, limit=None):
+        calls.append(customer)
+        await asyncio.sleep(delay)
+        return SimpleNamespace(data=[_invoice(f"in_{len(calls)}")])
+
+    monkeypatch.setattr(invoice_cache_module.stripe_mirror, "is_ready", is_ready)
+    monkeypatch.setattr(invoice_cache_module.stripe_gateway, "call", call)
+
+
+def test_concurrent_misses_share_one_load(monkeypatch):
+    calls = []
+    _patch_stripe(monkeypatch, calls, delay=0.01)
+    cache = InvoiceCache(DatabaseService(), ttl_s=60, max_customers=10)
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_invoices("cus_1") for _ in range(5)))
+        again = await cache.get_invoices("cus_1")
+        return first, again
+
+    first, again = asyncio.run(run())
+    assert calls == ["cus_1"]
+    assert all(r[0]["id"] == "in_1" for r in first)
+    assert again[0]["id"] == "in_1"
+
+
+def test_invalidation_drops_entry_and_inflight_load(monkeypatch):
+    calls = []
+    _patch_stripe(monkeypatch, calls, delay=0.01)
+    cache = InvoiceCache(DatabaseService(), ttl_s=60, max_customers=10)
+
+    async def run():
+        loading = asyncio.create_task(cache.get_invoices("cus_1"))
+        await asyncio.sleep(0)
+        cache.invalidate("cus_1")  # webhook arrives mid-load
+        await loading
+        return await cache.get_invoices("cus_1")
+
+    latest = asyncio.run(run())
+    assert calls == ["cus_1", "cus_1"]
+    assert latest[0]["id"] == "in_2"
+
+
+class FakeNotifyBus:
+    """Stands in for the database of several workers: NOTIFY reaches every listener"""
+
+    def __init__(self):
+        self.listeners = []
+
+    def worker(self):
+        bus = self
+
+        class WorkerDB:
+            pool = object()
+
+            async def listen(self, channel, callback, on_state_change=None):
+                bus.listeners.append((channel, callback))
+                return True
+
+            async def notify(self, channel, payload):
+                for listened, callback in bus.listeners:
+                    if listened == channel:
+                        callback(payload)
+
+        return WorkerDB()
+
+
+def test_invalidation_reaches_other_workers(monkeypatch):
+    calls = []
+    _patch_stripe(monkeypatch, calls)
+    bus = FakeNotifyBus()
+    webhook_worker = InvoiceCache(bus.worker(), ttl_s=60, max_customers=10)
+    other_worker = InvoiceCache(bus.worker(), ttl_s=60, max_customers=10)
+
+    async def run():
+        await webhook_worker.start()
+        await other_worker.start()
+        await other_worker.get_invoices("cus_1")
+        await webhook_worker.invalidate_everywhere("cus_1")
+        return await other_worker.get_invoices("cus_1")
+
+    latest = asyncio.run(run())
+    assert latest[0]["id"] == "in_2"
+    assert other_worker.get_stats()["listening"]
+    assert [channel for channel, _ in bus.listeners] == [NOTIFY_CHANNEL, NOTIFY_CHANNEL]
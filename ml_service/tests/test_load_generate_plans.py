@@ -0,0 +1,61 @@
+# tests/test_load_generate_plans.py
+
+import argparse
+import asyncio
+from types import SimpleNamespace
+
+from benchmarks.load_generate_plans import LoadRun, _flatten, _metric_sum, parse_metrics, percentiles
+from utils.metrics import Registry
+
+
+def test_parse_metrics_reads_registry_output():
+    registry = Registry()
+    wait = registry.histogram("db_pool_acquire_wait_seconds", "wait", ("pool",), buckets=(0.01, 0.1))
+    wait.observe(0.005, "primary")
+    wait.observe(0.05, "primary")
+    wait.observe(0.5, "replica")
+    registry.gauge("db_pool_connections", "conns", ("pool", "state"),
+                   collect=lambda: {("primary", "in_use"): 7, ("primary", "idle"): 3})
+
+    samples = parse_metrics(registry.render())
+    assert _metric_sum(samples, "db_pool_acquire_wait_seconds_count", pool="primary") == 2
+    assert round(_metric_sum(samples, "db_pool_acquire_wait_seconds_sum"), 3) == 0.555
+    assert _metric_sum(samples, "db_pool_connections", pool="primary", state="in_use") == 7
+    assert _metric_sum(samples, "missing_metric") == 0
+
+
+def test_percentiles_and_flatten():
+    assert percentiles([])["p50"] is None
+    summary = percentiles([i / 100 for i in range(1, 101)])
+    assert summary["count"] == 100
+    assert (summary["p50"], summary["p99"], summary["max"]) == (0.51, 1.0, 1.0)
+
+    flat = _flatten({"latency_s": {"health_probe": summary}, "http_status": {"GET /x 200": 3}, "note": "x"})
+    assert flat["latency_s.health_probe.p90"] == 0.91
+    assert flat["http_status.GET /x 200"] == 3
+    assert "note" not in flat
+
+
+def test_counters_are_diffed_per_worker():
+    def render(worker, timeouts):
+        registry = Registry()
+        registry.constant_labels["worker"] = worker
+        registry.counter("db_pool_acquire_timeouts_total", "timeouts").inc(amount=timeouts)
+        return registry.render()
+
+    # Scrapes alternate between workers whose counters differ a lot
+    pages = iter([render("1", 100), render("2", 5), render("1", 103), render("2", 9)])
+
+    class Client:
+        async def get(self, path, headers=None):
+            return SimpleNamespace(status_code=200, text=next(pages))
+
+    run = LoadRun(argparse.Namespace(base_url="http://test", request_timeout=1, max_connections=1), [])
+    run.client = Client()
+
+    async def scrape_all():
+        for _ in range(4):
+            await run.scrape()
+
+    asyncio.run(scrape_all())
+    assert run._delta("db_pool_acquire_timeouts_total") == 7
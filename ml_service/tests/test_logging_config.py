@@ -0,0 +1,98 @@
+# tests/test_logging_config.py
+
+import io
+import logging
+import queue
+import sys
+
+import orjson
+
+from config.logging_config import (
+    ColoredFormatter,
+    ContextFilter,
+    JSONFormatter,
+    SamplingFilter,
+    _NonBlockingQueueHandler,
+    bind_log_context,
+    log_context,
+    parse_sample_rates,
+)
+
+
+def _json_logger(name: str) -> tuple:
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    handler.addFilter(ContextFilter())
+    test_logger = logging.getLogger(name)
+    test_logger.handlers = [handler]
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    return test_logger, stream
+
+
+def test_json_records_carry_context():
+    test_logger, stream = _json_logger("test.json_context")
+
+    with log_context(request_id="req-1"):
+        bind_log_context(user_id="u1", provider="openai", model="")
+        test_logger.info("generated %s", "meal")
+    test_logger.info("outside")
+
+    first, second = [orjson.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["message"] == "generated meal"
+    assert first["level"] == "INFO"
+    assert first["logger"] == "test.json_context"
+    assert first["request_id"] == "req-1"
+    assert first["user_id"] == "u1"
+    assert first["provider"] == "openai"
+    assert "model" not in first
+    assert "request_id" not in second
+
+
+def test_json_includes_exception():
+    test_logger, stream = _json_logger("test.json_exc")
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        test_logger.error("failed", exc_info=True)
+
+    entry = orjson.loads(stream.getvalue())
+    assert entry["exc_type"] == "ValueError"
+    assert "Traceback" in entry["exc_info"]
+
+
+def test_sampling_keeps_warnings(monkeypatch):
+    sampler = SamplingFilter(parse_sample_rates("ml_service.api=0, ml_service=1"))
+    monkeypatch.setattr("config.logging_config.random.random", lambda: 0.5)
+
+    def record(name: str, level: int) -> logging.LogRecord:
+        return logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+
+    assert not sampler.filter(record("ml_service.api", logging.INFO))
+    assert not sampler.filter(record("ml_service.api.sub", logging.INFO))
+    assert sampler.filter(record("ml_service.api", logging.WARNING))
+    assert sampler.filter(record("ml_service.db", logging.INFO))
+
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    handler = _NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    dropped = _NonBlockingQueueHandler.dropped
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+
+    handler.handle(logging.LogRecord("q", logging.ERROR, __file__, 1, "user %s", ("u1",), exc_info))
+    handler.handle(logging.LogRecord("q", logging.INFO, __file__, 1, "second", None, None))
+
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "user u1" and queued.args is None
+    assert queued.exc_info is not None and queued.exc_text is None
+    assert _NonBlockingQueueHandler.dropped == dropped + 1
+
+
+def test_colored_formatter_leaves_record_untouched():
+    record = logging.LogRecord("c", logging.INFO, __file__, 1, "hi", None, None)
+    assert "\033[32m" in ColoredFormatter("%(levelname)s %(message)s").format(record)
+    assert record.levelname == "INFO"
@@ -0,0 +1,54 @@
+# tests/test_metrics.py
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.metrics import MetricsMiddleware, Registry, registry
+
+
+def test_render_text_format():
+    reg = Registry()
+    requests = reg.counter("jobs_total", "Jobs run", ("kind",))
+    latency = reg.histogram("job_seconds", "Job latency", ("kind",), buckets=(0.1, 1.0))
+    reg.gauge("queue_depth", "Waiting jobs", collect=lambda: {(): 3})
+    reg.counter("dropped_total", "Dropped jobs", collect=lambda: {(): 7})
+
+    requests.inc("a")
+    requests.inc("a", amount=2)
+    latency.observe(0.1, "a")
+    latency.observe(0.5, "a")
+    latency.observe(5, "a")
+
+    text = reg.render()
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{kind="a"} 3' in text
+    assert 'job_seconds_bucket{kind="a",le="0.1"} 1' in text
+    assert 'job_seconds_bucket{kind="a",le="1.0"} 2' in text
+    assert 'job_seconds_bucket{kind="a",le="+Inf"} 3' in text
+    assert 'job_seconds_count{kind="a"} 3' in text
+    assert 'job_seconds_sum{kind="a"} 5.6' in text
+    assert "queue_depth 3" in text
+    assert "# TYPE dropped_total counter" in text and "dropped_total 7" in text
+
+    reg.constant_labels["worker"] = "42"
+    text = reg.render()
+    assert 'jobs_total{worker="42",kind="a"} 3' in text
+    assert 'queue_depth{worker="42"} 3' in text
+
+
+def test_middleware_labels_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/nope")
+
+    text = registry.render()
+    assert 'http_request_duration_seconds_count{route="/items/{item_id}",method="GET",status="200"} 2' in text
+    assert 'route="unmatched",method="GET",status="404"' in text
@@ -0,0 +1,85 @@
+# tests/test_mock_llm.py
+
+import asyncio
+
+import anthropic
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+from benchmarks.mock_llm import MockConfig, create_app
+from services.ai_service import AIService
+from utils.serialization import loads
+
+FAST = dict(ttft_ms=0, tokens_per_s=1_000_000, seed=1)
+
+
+def _service(mock_app) -> AIService:
+    """AIService with both SDK clients talking to the mock in-process"""
+    service = AIService()
+    transport = httpx.ASGITransport(app=mock_app)
+    service.openai_client = AsyncOpenAI(
+        api_key="mock",
+        base_url="http://mock/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport)
+    )
+    service.anthropic_client = anthropic.AsyncAnthropic(
+        api_key="mock",
+        base_url="http://mock",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport)
+    )
+    return service
+
+
+def test_openai_stream_returns_canned_workout_plan():
+    mock_app = create_app(MockConfig(**FAST))
+    service = _service(mock_app)
+
+    text = asyncio.run(service.call_openai('Return JSON with "weekly_plan"', "gpt-4o-mini"))
+    plan = loads(service.clean_json_response(text))
+    assert len(plan["weekly_plan"]) == 5
+
+    stats = TestClient(mock_app).get("/mock/stats").json()
+    assert stats["streamed"] == 1 and stats["completed"] == 1 and stats["in_flight"] == 0
+
+
+def test_anthropic_stream_returns_canned_meal_plan():
+    service = _service(create_app(MockConfig(**FAST)))
+
+    text = asyncio.run(service.call_anthropic("Build a meal plan", "claude-3-5-sonnet-20241022"))
+    assert "meals" in loads(service.clean_json_response(text))
+
+
+def test_non_streaming_openai_format():
+    client = TestClient(create_app(MockConfig(**FAST, fence=False)))
+    response = client.post("/v1/chat/completions", json={
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "user", "content": "meal plan please"}],
+    })
+    body = response.json()
+    assert body["object"] == "chat.completion"
+    assert "meals" in loads(body["choices"][0]["message"]["content"])
+    assert body["usage"]["completion_tokens"] > 0
+
+
+def test_rate_limit_injection():
+    mock_app = create_app(MockConfig(**FAST, rate_limit_rate=1.0))
+    service = _service(mock_app)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(service.call_openai("meal plan", "gpt-4o-mini"))
+
+    response = TestClient(mock_app).post("/v1/messages", json={"model": "claude", "messages": []})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1.0"
+    assert response.json()["error"]["type"] == "rate_limit_error"
+
+
+def test_warm_up_opens_provider_connections():
+    service = _service(create_app(MockConfig(**FAST)))
+    # The mock has no /v1/models; an error response still counts as connected
+    assert asyncio.run(service.warm_up(timeout_s=5)) == {"openai": True, "anthropic": True}
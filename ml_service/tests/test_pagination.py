@@ -0,0 +1,53 @@
+# tests/test_pagination.py
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(1700000000, "sub_1Abc:weird")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (1700000000, "sub_1Abc:weird")
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", encode_cursor(1, "x")[:-1] + "$", "bm9jb2xvbg"])
+def test_decode_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def _mirror_with(monkeypatch, count):
+    subscribers = [{"subscription_id": f"sub_{i}", "created": 1000 - i, "plans": []} for i in range(count)]
+
+    async def is_ready():
+        return True
+
+    async def list_subscribers(status, plan_id, created_after, created_before, after=None, limit=100):
+        start = 0 if after is None else next(i for i, s in enumerate(subscribers) if s["subscription_id"] == after[1]) + 1
+        return subscribers[start:start + limit], start + limit < len(subscribers)
+
+    monkeypatch.setattr(app_module.stripe_mirror, "is_ready", is_ready)
+    monkeypatch.setattr(app_module.stripe_mirror, "list_subscribers", list_subscribers)
+    return TestClient(app_module.app)
+
+
+def test_last_page_has_no_next_cursor(monkeypatch):
+    client = _mirror_with(monkeypatch, 4)
+
+    first = client.get("/api/admin/subscribers", params={"limit": 2}).json()
+    assert [s["subscription_id"] for s in first["subscribers"]] == ["sub_0", "sub_1"]
+    assert first["next_cursor"]
+
+    last = client.get("/api/admin/subscribers", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [s["subscription_id"] for s in last["subscribers"]] == ["sub_2", "sub_3"]
+    assert last["next_cursor"] is None
+
+
+def test_unknown_status_is_rejected(monkeypatch):
+    client = _mirror_with(monkeypatch, 1)
+
+    assert client.get("/api/admin/subscribers", params={"status": "bogus"}).status_code == 400
+    assert client.get("/api/admin/subscribers", params={"status": "all"}).status_code == 200
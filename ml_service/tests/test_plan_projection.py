@@ -0,0 +1,46 @@
+# tests/test_plan_projection.py
+
+import pytest
+
+from utils.projection import MAX_DEPTH, build_projection_sql, parse_fields
+
+
+def test_parse_fields_builds_nested_tree():
+    tree = parse_fields("meals.meal_name, meals.total_calories,daily_totals")
+    assert tree == {
+        "meals": {"meal_name": {}, "total_calories": {}},
+        "daily_totals": {},
+    }
+
+
+def test_shorter_path_selects_whole_subtree():
+    assert parse_fields("daily_totals,daily_totals.calories") == {"daily_totals": {}}
+    assert parse_fields("daily_totals.calories,daily_totals") == {"daily_totals": {}}
+
+
+@pytest.mark.parametrize("fields", [
+    "meals;drop table",
+    "meals..name",
+    "meals.meal-name",
+    ".".join(["a"] * (MAX_DEPTH + 1)),
+    ",".join(f"f{i}" for i in range(50)),
+])
+def test_parse_fields_rejects_bad_input(fields):
+    with pytest.raises(ValueError):
+        parse_fields(fields)
+
+
+def test_empty_projection_returns_column():
+    assert build_projection_sql("plan_data", {}) == ("plan_data", [])
+
+
+def test_projection_keys_are_bind_parameters():
+    sql, params = build_projection_sql(
+        "plan_data",
+        parse_fields("weekly_plan.day,weekly_plan.exercises.name"),
+        param_offset=1
+    )
+    assert params == ["weekly_plan", "day", "exercises", "name"]
+    assert "$2::text" in sql and "$5::text" in sql
+    assert "weekly_plan" not in sql
+    assert "jsonb_array_elements" in sql
@@ -0,0 +1,145 @@
+# tests/test_plan_store.py
+
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from services.database import DatabaseService
+
+
+class FakePlanStore:
+    """In-memory stand-in for the plan tables, matched on the statements DatabaseService sends"""
+
+    def __init__(self):
+        self.bodies = {}
+        self.plans = {}
+        self.versions = {}
+        self.bodies_sent = 0
+        self._ids = itertools.count(1)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    def _active(self, user_id):
+        return next((p for p in self.plans.values() if p["user_id"] == user_id), None)
+
+    async def fetchval(self, query, *args, timeout=None):
+        if "FROM plan_bodies" in query:
+            return 1 if args[0] in self.bodies else None
+        if "FROM plan_versions" in query:
+            user_id, plan_type, version = args
+            plan = self._active(user_id)
+            entry = plan and self.versions.get((plan_type, plan["id"], version))
+            return entry["content_hash"] if entry else None
+        raise AssertionError(query)
+
+    async def execute(self, query, *args, timeout=None):
+        if "INSERT INTO plan_bodies" in query:
+            self.bodies_sent += 1
+            self.bodies.setdefault(args[0], args[2])
+        elif "INSERT INTO plan_versions" in query:
+            plan_type, plan_id, user_id, version, plan_hash = args
+            self.versions.setdefault((plan_type, plan_id, version), {"content_hash": plan_hash})
+        else:
+            raise AssertionError(query)
+
+    async def fetchrow(self, query, *args, timeout=None):
+        if query.lstrip().startswith("INSERT INTO ai_"):
+            user_id, quiz_result_id, plan_data, plan_hash = args[0], args[1], args[2], args[6]
+            plan = self.plans.get((user_id, quiz_result_id))
+            if plan is None:
+                plan = self.plans[(user_id, quiz_result_id)] = {"id": next(self._ids), "user_id": user_id, "version": 1}
+            elif plan["content_hash"] != plan_hash:
+                plan["version"] += 1
+            plan.update(content_hash=plan_hash, plan_data=plan_data)
+            return {"id": plan["id"], "version": plan["version"]}
+        if query.lstrip().startswith("UPDATE"):
+            user_id, plan_hash, inline_copy = args
+            plan = self._active(user_id)
+            if plan is None or plan_hash not in self.bodies:
+                return None
+            plan["version"] += 1
+            plan.update(content_hash=plan_hash, plan_data=self.bodies[plan_hash] if inline_copy else None)
+            return {"id": plan["id"], "version": plan["version"]}
+        raise AssertionError(query)
+
+
+def make_db(store):
+    db = DatabaseService()
+    db.pool = object()
+
+    @asynccontextmanager
+    async def get_connection(readonly=False):
+        yield store
+
+    db.get_connection = get_connection
+    return db
+
+
+async def save(db, plan):
+    return await db.save_meal_plan("user-1", "quiz-1", plan, 2000, [], "")
+
+
+def test_version_bumps_only_when_content_changes():
+    store = FakePlanStore()
+    db = make_db(store)
+
+    async def scenario():
+        await save(db, {"meals": ["oats"]})
+        await save(db, {"meals": ["oats"]})
+        await save(db, {"meals": ["eggs"]})
+
+    asyncio.run(scenario())
+
+    plan = store.plans[("user-1", "quiz-1")]
+    assert plan["version"] == 2
+    assert sorted(version for _, _, version in store.versions) == [1, 2]
+
+
+def test_known_hash_skips_body_write():
+    store = FakePlanStore()
+    db = make_db(store)
+
+    async def scenario():
+        await save(db, {"meals": ["oats"]})
+        await save(db, {"meals": ["eggs"]})
+        await save(db, {"meals": ["oats"]})
+
+    asyncio.run(scenario())
+
+    assert len(store.bodies) == 2
+    assert store.bodies_sent == 2
+
+
+def test_rollback_is_recorded_as_new_version():
+    store = FakePlanStore()
+    db = make_db(store)
+
+    async def scenario():
+        await save(db, {"meals": ["oats"]})
+        await save(db, {"meals": ["eggs"]})
+        return await db.rollback_plan("user-1", "meal", 1)
+
+    new_version = asyncio.run(scenario())
+
+    assert new_version == 3
+    plan = store.plans[("user-1", "quiz-1")]
+    assert plan["content_hash"] == store.versions[("meal", plan["id"], 1)]["content_hash"]
+    assert store.versions[("meal", plan["id"], 3)] == store.versions[("meal", plan["id"], 1)]
+
+
+def test_rollback_to_unknown_version_returns_404(monkeypatch):
+    store = FakePlanStore()
+    db = make_db(store)
+    asyncio.run(save(db, {"meals": ["oats"]}))
+    monkeypatch.setattr(app_module.db_service, "pool", db.pool)
+    monkeypatch.setattr(app_module.db_service, "get_connection", db.get_connection)
+
+    response = TestClient(app_module.app).post("/plans/user-1/meal/rollback", json={"version": 7})
+
+    assert response.status_code == 404
+    assert store.plans[("user-1", "quiz-1")]["version"] == 1
@@ -0,0 +1,91 @@
+# tests/test_profiling.py
+
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app import app
+from config.settings import settings
+from utils import profiling
+
+
+def _spin_until(event: threading.Event) -> None:
+    while not event.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_folds_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=_spin_until, args=(stop,))
+    worker.start()
+    try:
+        stacks = profiling.sample_stacks([worker.ident], seconds=0.1, interval_s=0.001)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert stacks
+    assert any(stack.split(";")[-1].startswith("_spin_until (") for stack in stacks)
+    text = profiling.folded(stacks)
+    assert text.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+
+
+def test_dump_tasks_shows_pending_stack():
+    async def waiter(event: asyncio.Event):
+        await event.wait()
+
+    async def run():
+        event = asyncio.Event()
+        task = asyncio.create_task(waiter(event), name="waiter-task")
+        await asyncio.sleep(0)
+        dump = profiling.dump_tasks()
+        event.set()
+        await task
+        return dump
+
+    dump = asyncio.run(run())
+    entry = next(t for t in dump if t["name"] == "waiter-task")
+    assert entry["coro"].endswith("waiter")
+    assert entry["stack"][0].startswith("waiter (")
+
+
+def test_heap_snapshot_diff():
+    snapshots = profiling.HeapSnapshots()
+    try:
+        assert snapshots.take(frames=1, group_by="lineno", limit=5)["started"] is True
+        first = snapshots.take(frames=1, group_by="lineno", limit=5)
+        assert "growth" not in first
+        held = [bytearray(1024) for _ in range(200)]
+        second = snapshots.take(frames=1, group_by="lineno", limit=5)
+        assert second["growth"][0]["size_diff_bytes"] > 0
+        del held
+    finally:
+        snapshots.stop()
+    assert not snapshots.tracing
+
+
+def test_debug_endpoints_require_admin_token(monkeypatch):
+    client = TestClient(app)
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "")
+    assert client.get("/api/admin/debug/tasks").status_code == 404
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "secret")
+    assert client.get("/api/admin/debug/tasks").status_code == 403
+    assert client.get("/api/admin/debug/tasks", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.get("/api/admin/debug/tasks", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["count"] >= 1
+
+    start = time.monotonic()
+    response = client.get(
+        "/api/admin/debug/profile",
+        params={"seconds": 0.05, "mode": "cprofile"},
+        headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 200
+    assert "function calls" in response.text
+    assert time.monotonic() - start < 5
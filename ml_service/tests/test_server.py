@@ -0,0 +1,50 @@
+# tests/test_server.py
+
+import pytest
+
+import server
+
+
+def test_plan_workers_caps_by_connection_budget():
+    assert server.plan_workers(4, {"primary": 11}, 60) == (4, "4 CPUs; connection budget allows 5")
+
+    workers, reason = server.plan_workers(16, {"primary": 11}, 60)
+    assert workers == 5 and "capped" in reason
+    # The replica pool has its own budget on its own server
+    assert server.plan_workers(16, {"primary": 11, "replica": 20}, 60)[0] == 3
+    assert server.plan_workers(2, {"primary": 11}, 60, requested=8)[0] == 5
+    assert server.plan_workers(2, {"primary": 11}, 60, requested=3)[0] == 3
+
+    with pytest.raises(ValueError):
+        server.plan_workers(4, {"primary": 11}, 10)
+
+
+def test_connections_per_worker(monkeypatch):
+    monkeypatch.setattr(server.settings, "DB_POOL_MAX_SIZE", 10)
+    monkeypatch.setattr(server.settings, "DB_REPLICA_HOST", None)
+    monkeypatch.setattr(server.settings, "STRIPE_MIRROR_ENABLED", False)
+    assert server.connections_per_worker() == {"primary": 11}
+
+    # The reconcile lock holds one more
+    monkeypatch.setattr(server.settings, "STRIPE_MIRROR_ENABLED", True)
+    monkeypatch.setattr(server.settings, "STRIPE_MIRROR_RECONCILE_INTERVAL_S", 3600)
+    assert server.connections_per_worker() == {"primary": 12}
+    monkeypatch.setattr(server.settings, "STRIPE_MIRROR_ENABLED", False)
+
+    monkeypatch.setattr(server.settings, "DB_REPLICA_HOST", "replica")
+    monkeypatch.setattr(server.settings, "DB_REPLICA_POOL_MAX_SIZE", 20)
+    assert server.connections_per_worker() == {"primary": 11, "replica": 20}
+
+
+def test_available_cpus_respects_cgroup_quota(tmp_path, monkeypatch):
+    cpu_max = tmp_path / "cpu.max"
+    monkeypatch.setattr(server, "CGROUP_CPU_MAX", cpu_max)
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+
+    assert server.available_cpus() == 8  # no cgroup file
+    cpu_max.write_text("max 100000\n")
+    assert server.available_cpus() == 8
+    cpu_max.write_text("150000 100000\n")
+    assert server.available_cpus() == 2
+    cpu_max.write_text("50000 100000\n")
+    assert server.available_cpus() == 1
@@ -0,0 +1,64 @@
+# tests/test_status_batch_writer.py
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+from services.database import StatusBatchWriter
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, query, *args, timeout=None):
+        self.executed.append((query, args))
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.conn = FakeConnection()
+
+    @asynccontextmanager
+    async def get_connection(self, readonly=False):
+        yield self.conn
+
+
+def test_updates_are_coalesced_per_row():
+    """Many concurrent updates collapse into one statement per table, latest value wins"""
+    users = [str(uuid.uuid4()) for _ in range(10)]
+
+    async def scenario():
+        db = FakeDatabase()
+        writer = StatusBatchWriter(db, interval_s=0.01, max_batch=1000)
+        writer.start()
+        results = await asyncio.gather(*[
+            writer.submit(table, user, status, None)
+            for status in ("generating", "parsing", "completed")
+            for user in users
+            for table in StatusBatchWriter.TABLES
+        ])
+        await writer.stop()
+        return db.conn.executed, results, writer.get_stats()
+
+    executed, results, stats = asyncio.run(scenario())
+
+    assert all(results)
+    assert len(executed) == 2
+    for _, (user_ids, statuses, errors) in executed:
+        assert sorted(user_ids) == sorted(users)
+        assert set(statuses) == {"completed"}
+    assert stats["rows_written"] == 20
+    assert stats["updates_coalesced"] == 40
+
+
+def test_invalid_user_id_is_rejected_before_batching():
+    async def scenario():
+        writer = StatusBatchWriter(FakeDatabase(), interval_s=0.01, max_batch=10)
+        try:
+            await writer.submit("ai_meal_plans", "not-a-uuid", "failed", "boom")
+        except ValueError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
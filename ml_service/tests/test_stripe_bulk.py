@@ -0,0 +1,78 @@
+# tests/test_stripe_bulk.py
+
+import asyncio
+
+import stripe
+
+from services import stripe_bulk
+from services.stripe_bulk import BulkOperationRun, validate_operations
+
+
+def test_validate_operations():
+    errors = validate_operations([
+        {"op": "cancel-subscription", "subscription_id": "sub_1"},
+        {"op": "apply-coupon", "subscription_id": "sub_2"},
+        {"op": "delete-everything"},
+    ])
+    assert errors == ["1: missing coupon_id", "2: unknown op 'delete-everything'"]
+
+
+def test_validate_operations_rejects_non_uuid_user_ids():
+    errors = validate_operations([
+        {"op": "cancel-subscription", "subscription_id": "sub_1", "user_id": "6f1c2a9e-3b7d-4f5e-9a41-2d8c7e6b5a30"},
+        {"op": "cancel-subscription", "subscription_id": "sub_2", "user_id": "user_2"},
+    ])
+    assert errors == ["1: user_id is not a UUID"]
+
+
+def test_bulk_run(monkeypatch):
+    keys = []
+    attempts = {}
+    plan_batches = []
+
+    async def mutate(fn, subscription_id, idempotency_key=None, **kwargs):
+        keys.append(idempotency_key)
+        attempts[subscription_id] = attempts.get(subscription_id, 0) + 1
+        if subscription_id == "sub_limited" and attempts[subscription_id] == 1:
+            raise stripe.error.RateLimitError("slow down")
+        if subscription_id == "sub_missing":
+            raise stripe.error.InvalidRequestError("No such subscription", "id")
+        return stripe.Subscription.construct_from({"id": subscription_id, "status": "active"}, "sk_test")
+
+    async def set_user_plans(plans):
+        plan_batches.append(dict(plans))
+        return len(plans)
+
+    monkeypatch.setattr(stripe_bulk.stripe_gateway, "mutate", mutate)
+    monkeypatch.setattr(stripe_bulk.db_service, "set_user_plans", set_user_plans)
+    monkeypatch.setattr(stripe_bulk, "RATE_LIMIT_PAUSE_S", 0.0)
+
+    operations = [
+        {"op": "cancel-subscription", "subscription_id": f"sub_{i}", "user_id": f"user_{i}"} for i in range(5)
+    ] + [
+        {"op": "cancel-subscription", "subscription_id": "sub_limited", "user_id": "user_limited"},
+        {"op": "cancel-subscription", "subscription_id": "sub_missing", "user_id": "user_missing"},
+        {"op": "apply-coupon", "subscription_id": "sub_9", "coupon_id": "c", "idempotency_key": "mine"},
+    ]
+    run = BulkOperationRun(operations, batch_key="batch", concurrency=3, plan_batch_size=2)
+
+    async def collect():
+        return [entry async for entry in run.results()]
+
+    entries = asyncio.run(collect())
+    results = sorted(entries[:-1], key=lambda r: r["index"])
+    summary = entries[-1]["summary"]
+
+    assert [r["success"] for r in results] == [True] * 6 + [False, True]
+    assert summary["succeeded"] == 7 and summary["failed"] == 1
+    assert summary["rate_limit_pauses"] == 1
+
+    # Retried item reuses its key; client-supplied keys win
+    assert keys.count("batch:5") == 2
+    assert "mine" in keys
+
+    # Plans written in batches, none for the failed cancellation
+    applied = {k: v for batch in plan_batches for k, v in batch.items()}
+    assert set(applied) == {f"user_{i}" for i in range(5)} | {"user_limited"}
+    assert len(plan_batches) > 1
+    assert summary["plans_updated"] == 6
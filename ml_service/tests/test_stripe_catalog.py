@@ -0,0 +1,66 @@
+# tests/test_stripe_catalog.py
+
+import asyncio
+
+import stripe
+
+from services import stripe_catalog as catalog_module
+from services.stripe_catalog import StripeCatalog, UNKNOWN_PLAN
+
+
+def _price(price_id, product_id, name):
+    return stripe.Price.construct_from({
+        "id": price_id,
+        "object": "price",
+        "product": {"id": product_id, "object": "product", "name": name},
+    }, "sk_test")
+
+
+def test_preload_then_webhook_refresh(monkeypatch):
+    calls = []
+
+    async def fake_call(fn, *args, **kwargs):
+        calls.append(fn)
+        if fn is catalog_module._load_catalog:
+            return {"prod_1": "Pro"}, {"price_1": "prod_1"}
+        raise AssertionError("unexpected Stripe call")
+
+    monkeypatch.setattr(catalog_module.stripe_gateway, "call", fake_call)
+    catalog = StripeCatalog(ttl_s=0)
+
+    async def run():
+        first = await catalog.product_names(["price_1", "price_1", None])
+        catalog.apply_event({"type": "product.updated", "data": {"object": {"id": "prod_1", "name": "Pro+"}}})
+        catalog.apply_event({"type": "product.deleted", "data": {"object": {"id": "prod_1", "deleted": True}}})
+        return first, await catalog.product_name("price_1")
+
+    first, renamed = asyncio.run(run())
+    assert first == {"price_1": "Pro"}
+    assert renamed == "Pro+"
+    assert len(calls) == 1
+
+
+def test_concurrent_misses_share_one_fetch(monkeypatch):
+    retrieved = []
+
+    async def fake_call(fn, *args, **kwargs):
+        if fn is catalog_module._load_catalog:
+            return {}, {}
+        retrieved.append(args[0])
+        await asyncio.sleep(0.01)
+        if args[0] == "price_missing":
+            raise stripe.error.InvalidRequestError("No such price", "id")
+        return _price(args[0], "prod_2", "Annual")
+
+    monkeypatch.setattr(catalog_module.stripe_gateway, "call", fake_call)
+    catalog = StripeCatalog(ttl_s=0)
+
+    async def run():
+        return await asyncio.gather(
+            *(catalog.product_name("price_2") for _ in range(5)),
+            catalog.product_name("price_missing"),
+        )
+
+    names = asyncio.run(run())
+    assert names == ["Annual"] * 5 + [UNKNOWN_PLAN]
+    assert retrieved.count("price_2") == 1
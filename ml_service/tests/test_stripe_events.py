@@ -0,0 +1,38 @@
+# tests/test_stripe_events.py
+
+import asyncio
+
+from services import stripe_events
+from services.stripe_events import event_customer_id, handle_event
+
+
+def _event(event_type, obj):
+    return {"id": "evt_1", "type": event_type, "created": 1700000000, "data": {"object": obj}}
+
+
+def test_event_customer_id():
+    assert event_customer_id(_event("customer.updated", {"object": "customer", "id": "cus_1"})) == "cus_1"
+    assert event_customer_id(_event("invoice.paid", {"object": "invoice", "customer": "cus_2"})) == "cus_2"
+    assert event_customer_id(_event("invoice.paid", {"object": "invoice", "customer": {"id": "cus_3"}})) == "cus_3"
+    assert event_customer_id(_event("product.updated", {"object": "product", "id": "prod_1"})) is None
+
+
+def test_subscription_deleted_looks_up_user(monkeypatch):
+    calls = []
+
+    async def lookup_user_by_stripe(customer_id):
+        return "user_1" if customer_id == "cus_1" else None
+
+    async def set_user_plan(user_id, plan, customer_id=None):
+        calls.append((user_id, plan))
+
+    monkeypatch.setattr(stripe_events.db_service, "lookup_user_by_stripe", lookup_user_by_stripe)
+    monkeypatch.setattr(stripe_events.db_service, "set_user_plan", set_user_plan)
+    monkeypatch.setattr(stripe_events.db_service, "pool", None)
+
+    # Subscription objects have no client_reference_id
+    sub = {"object": "subscription", "id": "sub_1", "customer": "cus_1"}
+    asyncio.run(handle_event(_event("customer.subscription.deleted", sub)))
+    asyncio.run(handle_event(_event("customer.subscription.deleted", {**sub, "customer": "cus_x"})))
+
+    assert calls == [("user_1", "free")]
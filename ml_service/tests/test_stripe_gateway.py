@@ -0,0 +1,89 @@
+# tests/test_stripe_gateway.py
+
+import asyncio
+import time
+
+import pytest
+import stripe
+
+from services.stripe_gateway import StripeGateway
+
+
+def _gateway(**kwargs):
+    options = {"max_concurrency": 2, "request_timeout_s": 1, "max_retries": 2}
+    options.update(kwargs)
+    return StripeGateway(**options)
+
+
+def test_mutate_retries_with_one_idempotency_key(monkeypatch):
+    monkeypatch.setattr("services.stripe_gateway.random.random", lambda: 0.0)
+    monkeypatch.setattr("services.stripe_gateway.asyncio.sleep", _no_sleep)
+    keys = []
+
+    def flaky_modify(subscription_id, **params):
+        keys.append(params["idempotency_key"])
+        if len(keys) < 3:
+            raise stripe.error.APIConnectionError("connection reset")
+        return {"id": subscription_id}
+
+    gateway = _gateway()
+    result = asyncio.run(gateway.mutate(flaky_modify, "sub_1", cancel_at_period_end=True))
+
+    assert result == {"id": "sub_1"}
+    assert len(keys) == 3 and len(set(keys)) == 1
+    assert gateway.get_stats()["retries"] == 2
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def bad_request(**params):
+        calls.append(params)
+        raise stripe.error.InvalidRequestError("No such coupon", "coupon")
+
+    gateway = _gateway()
+    with pytest.raises(stripe.error.InvalidRequestError):
+        asyncio.run(gateway.call(bad_request, coupon="nope"))
+    assert len(calls) == 1
+
+
+def test_concurrency_is_bounded():
+    active = {"now": 0, "peak": 0}
+
+    def slow_call():
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.05)
+        active["now"] -= 1
+
+    async def run():
+        gateway = _gateway(max_concurrency=2)
+        await asyncio.gather(*(gateway.call(slow_call) for _ in range(6)))
+
+    asyncio.run(run())
+    assert active["peak"] <= 2
+
+
+def test_timed_out_call_holds_its_slot_until_the_thread_finishes():
+    finished = []
+
+    def stuck_call():
+        time.sleep(0.2)
+        finished.append(True)
+
+    async def run():
+        gateway = _gateway(max_concurrency=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await gateway.call(stuck_call, timeout=0.02)
+        held = gateway.get_stats()["in_flight"]
+        await gateway.call(lambda: None)
+        return held, gateway.get_stats()["in_flight"]
+
+    held, after = asyncio.run(run())
+    assert held == 1 and after == 0
+    # The next call only got the slot after the stuck one returned
+    assert finished == [True]
+
+
+async def _no_sleep(_delay):
+    return None
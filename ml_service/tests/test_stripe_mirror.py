@@ -0,0 +1,101 @@
+# tests/test_stripe_mirror.py
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import stripe
+
+from services.stripe_mirror import StripeMirror, subscription_row
+
+
+def _subscription():
+    return stripe.Subscription.construct_from({
+        "id": "sub_1",
+        "object": "subscription",
+        "status": "active",
+        "created": 1700000000,
+        "canceled_at": None,
+        "current_period_end": 1702592000,
+        "cancel_at_period_end": False,
+        "customer": {"id": "cus_1", "object": "customer", "email": "a@example.com"},
+        "items": {
+            "object": "list",
+            "data": [
+                {
+                    "id": "si_1",
+                    "object": "subscription_item",
+                    "quantity": 1,
+                    "price": {
+                        "id": "price_month",
+                        "object": "price",
+                        "product": "prod_1",
+                        "unit_amount": 999,
+                        "currency": "usd",
+                        "recurring": {"interval": "month", "interval_count": 1},
+                    },
+                },
+                {
+                    "id": "si_2",
+                    "object": "subscription_item",
+                    "quantity": 1,
+                    "price": {
+                        "id": "price_year",
+                        "object": "price",
+                        "product": {"id": "prod_2", "object": "product", "name": "Annual"},
+                        "unit_amount": 9900,
+                        "currency": "usd",
+                        "recurring": {"interval": "year", "interval_count": 1},
+                    },
+                },
+            ],
+        },
+    }, "sk_test")
+
+
+def test_subscription_row_flattens_items():
+    row = subscription_row(_subscription(), source_ts=123)
+    (sub_id, customer_id, email, status, price_ids, items, monthly_amount, *_rest, data, source_ts) = row
+
+    assert (sub_id, customer_id, email, status) == ("sub_1", "cus_1", "a@example.com", "active")
+    assert price_ids == ["price_month", "price_year"]
+    assert [i["product_id"] for i in items] == ["prod_1", "prod_2"]
+    # Only monthly prices count towards MRR, as in the live computation
+    assert monthly_amount == 999
+    assert type(data) is dict and type(data["customer"]) is dict
+    assert source_ts == 123
+
+
+def test_only_the_lock_holder_runs_reconcile_passes(monkeypatch):
+    held = set()
+
+    class SharedLockDB:
+        @asynccontextmanager
+        async def advisory_lock(self, name):
+            if name in held:
+                yield None
+                return
+            held.add(name)
+            try:
+                yield SimpleNamespace(is_closed=lambda: False)
+            finally:
+                held.discard(name)
+
+    passes = []
+    mirrors = [StripeMirror(SharedLockDB()) for _ in range(3)]
+    for i, mirror in enumerate(mirrors):
+        async def sync_all(i=i):
+            passes.append(i)
+            return {}
+        monkeypatch.setattr(mirror, "sync_all", sync_all)
+
+    async def run():
+        for mirror in mirrors:
+            mirror.start_reconcile_loop(0.001)
+        await asyncio.sleep(0.05)
+        for mirror in mirrors:
+            await mirror.stop()
+
+    asyncio.run(run())
+    assert len(passes) > 1 and set(passes) == {0}
+    assert not held
@@ -0,0 +1,94 @@
+# tests/test_subscription_analytics.py
+
+from datetime import datetime, timezone
+
+from benchmarks.bench_subscription_analytics import legacy_aggregates
+from benchmarks.fixtures import build_subscriptions
+from utils.subscription_analytics import (
+    churn_curve,
+    cohort_retention,
+    compute_saas_aggregates,
+    invoices_frame,
+    revenue_by_plan,
+    subscriptions_frame,
+)
+
+NOW = datetime(2026, 3, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _ts(year, month, day):
+    return int(datetime(year, month, day, tzinfo=timezone.utc).timestamp())
+
+
+def _sub(i, status, created, canceled_at=None, amount=1000, plan="Pro"):
+    return {
+        "subscription_id": f"sub_{i}",
+        "status": status,
+        "created": created,
+        "canceled_at": canceled_at,
+        "monthly_amount": amount,
+        "price_id": f"price_{plan.lower()}",
+        "plan": plan,
+        "customer_email": f"u{i}@example.com",
+    }
+
+
+def test_vectorized_metrics_match_python_loops():
+    subs, invoices = build_subscriptions(3000, int(NOW.timestamp()), seed=11)
+
+    expected = legacy_aggregates(subs, invoices, NOW)
+    actual = compute_saas_aggregates(subscriptions_frame(subs), invoices_frame(invoices), NOW)
+
+    assert actual == expected
+
+
+def test_empty_inputs():
+    agg = compute_saas_aggregates(subscriptions_frame([]), invoices_frame([]), NOW)
+    assert agg["total_count"] == 0 and agg["mrr"] == 0 and agg["by_month"] == {}
+    assert cohort_retention(subscriptions_frame([]), NOW) == []
+
+
+def test_last_month_is_as_of_30_days_ago():
+    # NOW - 30 days = 2026-02-13
+    subs = subscriptions_frame([
+        _sub(1, "active", _ts(2026, 1, 5)),
+        # Canceled after the cutoff: was still paying 30 days ago
+        _sub(2, "canceled", _ts(2026, 1, 10), canceled_at=_ts(2026, 2, 20), amount=500),
+        # Canceled inside the previous window
+        _sub(3, "canceled", _ts(2025, 12, 1), canceled_at=_ts(2026, 1, 20)),
+        # Created after the cutoff
+        _sub(4, "active", _ts(2026, 3, 1)),
+    ])
+    agg = compute_saas_aggregates(subs, invoices_frame([]), NOW)
+    assert agg["active_last_month"] == 2
+    assert agg["mrr_last_month"] == 15.0
+    assert agg["churned_last_month"] == 1
+
+
+def test_cohorts_revenue_and_churn():
+    subs = subscriptions_frame([
+        _sub(1, "active", _ts(2026, 1, 5)),
+        _sub(2, "canceled", _ts(2026, 1, 10), canceled_at=_ts(2026, 2, 20)),
+        _sub(3, "canceled", _ts(2026, 2, 1), canceled_at=_ts(2026, 2, 2), plan="Basic", amount=500),
+        _sub(4, "trialing", _ts(2026, 3, 1), plan="Basic", amount=500),
+        # Scheduled cancellation: still subscribed
+        _sub(5, "active", _ts(2026, 2, 3), canceled_at=_ts(2026, 3, 1)),
+    ])
+
+    cohorts = {c["cohort"]: c for c in cohort_retention(subs, NOW, months=3)}
+    assert cohorts["2026-01"]["size"] == 2
+    assert cohorts["2026-01"]["retention"] == [1.0, 0.5, 0.5]
+    assert cohorts["2026-02"]["retention"] == [0.5, 0.5]
+    assert cohorts["2026-03"]["retention"] == [1.0]
+
+    assert revenue_by_plan(subs) == [
+        {"plan": "Pro", "subscribers": 2, "mrr": 20.0, "arpu": 10.0},
+        {"plan": "Basic", "subscribers": 1, "mrr": 5.0, "arpu": 5.0},
+    ]
+
+    curve = {m["month"]: m for m in churn_curve(subs, NOW, months=3)}
+    assert curve["2026-02"]["activeAtStart"] == 2
+    assert curve["2026-02"]["new"] == 2
+    assert curve["2026-02"]["churned"] == 2
+    assert curve["2026-02"]["churnRate"] == 1.0
+    assert curve["2026-03"]["activeAtStart"] == 2
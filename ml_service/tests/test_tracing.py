@@ -0,0 +1,74 @@
+# tests/test_tracing.py
+
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.tracing import TracingMiddleware, annotate, current_trace, span, start_trace, to_otlp
+
+
+def test_spans_nest_under_trace():
+    with start_trace("generate.meal", user_id="u1") as trace:
+        with span("ai.request", provider="openai") as outer:
+            annotate(ttft_ms=12.5)
+            with span("parse") as inner:
+                pass
+
+    assert current_trace() is None
+    assert [s.name for s in trace.spans] == ["generate.meal", "ai.request", "parse"]
+    assert outer.parent_id == trace.root.span_id
+    assert inner.parent_id == outer.span_id
+    assert outer.attributes == {"provider": "openai", "ttft_ms": 12.5}
+    assert all(s.end_ns is not None for s in trace.spans)
+
+
+def test_span_outside_trace_is_noop():
+    with span("orphan") as s:
+        annotate(ignored=True)
+    assert s is None
+
+
+def test_background_task_trace_links_to_request():
+    async def run():
+        with start_trace("http") as request_trace:
+            async def job():
+                with start_trace("generate.workout") as job_trace:
+                    return job_trace
+            job_trace = await asyncio.create_task(job())
+        return request_trace, job_trace
+
+    request_trace, job_trace = asyncio.run(run())
+    assert job_trace.trace_id != request_trace.trace_id
+    assert job_trace.root.attributes["parent_trace_id"] == request_trace.trace_id
+
+
+def test_error_marks_span_and_otlp_status():
+    try:
+        with start_trace("generate.meal") as trace:
+            with span("db.save"):
+                raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    otlp_spans = to_otlp([trace])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(otlp_spans) == 2
+    assert otlp_spans[1]["status"] == {"code": 2}
+    assert otlp_spans[1]["parentSpanId"] == otlp_spans[0]["spanId"]
+    assert {"key": "error", "value": {"stringValue": "RuntimeError"}} in otlp_spans[1]["attributes"]
+
+
+def test_server_timing_header():
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/work")
+    async def work():
+        with span("db.read"):
+            pass
+        return {"ok": True}
+
+    response = TestClient(app).get("/work")
+    header = response.headers["server-timing"]
+    assert header.startswith("db-read;dur=")
+    assert ", total;dur=" in header
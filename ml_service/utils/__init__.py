@@ -2,6 +2,7 @@
 
 from .calculations import calculate_nutrition_profile, calculate_navy_bfp
 from .converters import parse_height, parse_weight, parse_measurement
+from .serialization import dumps, dumps_bytes, loads
 
 __all__ = [
     "calculate_nutrition_profile",
@@ -9,4 +10,7 @@ __all__ = [
     "parse_height",
     "parse_weight",
     "parse_measurement",
+    "dumps",
+    "dumps_bytes",
+    "loads",
 ]
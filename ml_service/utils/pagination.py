@@ -0,0 +1,37 @@
+"""Opaque keyset cursors for paginated endpoints"""
+
+import base64
+import binascii
+from typing import Tuple
+
+
+def encode_cursor(created: int, object_id: str) -> str:
+    """
+    Encode a (created, id) position as an opaque cursor.
+
+    Args:
+        created: Unix timestamp of the last returned row
+        object_id: Id of the last returned row (tie-breaker)
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = f"{created}:{object_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created, object_id = base64.urlsafe_b64decode(padded).decode("utf-8").split(":", 1)
+        if not object_id:
+            raise ValueError("empty id")
+        return int(created), object_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,206 @@
+"""
+On-demand diagnostics for a live worker: CPU profiles, heap snapshots and
+asyncio task dumps.
+
+Nothing here costs anything until it is asked for. The sampling profiler
+reads thread stacks from a helper thread (sys._current_frames), so the event
+loop keeps serving requests while it is being observed; its folded-stack
+output ("a;b;c 42" per line) loads directly into speedscope, flamegraph.pl
+or inferno. tracemalloc is started on the first snapshot and slows
+allocations noticeably until stopped again.
+"""
+
+import asyncio
+import cProfile
+import gc
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+
+def _fold(frame: Optional[FrameType]) -> str:
+    """Root-first, semicolon-separated stack of a frame"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(
+    thread_ids: Optional[List[int]],
+    seconds: float,
+    interval_s: float = 0.005
+) -> Dict[str, int]:
+    """
+    Sample thread stacks for a while (blocking; run it in a helper thread).
+
+    Args:
+        thread_ids: Threads to sample, or None for every thread but the sampler
+        seconds: Capture duration
+        interval_s: Time between samples
+
+    Returns:
+        Folded stack -> sample count. With several threads, stacks are
+        prefixed with the thread name.
+    """
+    own = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (thread_ids is not None and ident not in thread_ids):
+                continue
+            stack = _fold(frame)
+            if thread_ids is None or len(thread_ids) > 1:
+                stack = f"{names.get(ident, ident)};{stack}"
+            stacks[stack] += 1
+        time.sleep(interval_s)
+    return dict(stacks)
+
+
+def folded(stacks: Dict[str, int]) -> str:
+    """Collapsed-stack text, heaviest stacks first"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda s: -s[1]))
+
+
+async def sample_event_loop(seconds: float, all_threads: bool = False) -> str:
+    """
+    Folded stacks of the event loop thread (or all threads) over `seconds`.
+
+    Idle time shows up as stacks ending in the selector's select/poll call.
+    """
+    thread_ids = None if all_threads else [threading.get_ident()]
+    stacks = await asyncio.to_thread(sample_stacks, thread_ids, seconds)
+    return folded(stacks)
+
+
+async def cprofile_event_loop(seconds: float) -> cProfile.Profile:
+    """Deterministic profile of everything the event loop runs during `seconds`"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    return profiler
+
+
+def profile_stats_text(profiler: cProfile.Profile, sort: str = "cumulative", limit: int = 50) -> str:
+    """pstats report of the top functions"""
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def profile_stats_dump(profiler: cProfile.Profile) -> bytes:
+    """Raw .prof contents (snakeviz, flameprof, pstats.Stats(path))"""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+class HeapSnapshots:
+    """tracemalloc snapshots, each compared with the previous one"""
+
+    def __init__(self):
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def take(self, frames: int, group_by: str, limit: int) -> Dict[str, Any]:
+        """
+        Snapshot the heap, starting tracemalloc on first use.
+
+        Args:
+            frames: Traceback depth recorded per allocation (applies when starting)
+            group_by: 'lineno', 'filename' or 'traceback'
+            limit: Number of top entries returned
+
+        Returns:
+            Top allocation sites, and growth since the previous snapshot
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self._previous = None
+            return {"started": True, "message": "tracemalloc started; take another snapshot to see allocations"}
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        result: Dict[str, Any] = {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [_stat_dict(stat) for stat in snapshot.statistics(group_by)[:limit]],
+        }
+        if self._previous is not None:
+            result["growth"] = [
+                _stat_dict(diff) for diff in snapshot.compare_to(self._previous, group_by)[:limit]
+            ]
+        self._previous = snapshot
+        return result
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._previous = None
+
+
+def _stat_dict(stat: Any) -> Dict[str, Any]:
+    entry = {
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+    }
+    if isinstance(stat, tracemalloc.StatisticDiff):
+        entry["size_diff_bytes"] = stat.size_diff
+        entry["count_diff"] = stat.count_diff
+    return entry
+
+
+def count_objects(type_names: Optional[List[str]] = None, limit: int = 30) -> Dict[str, int]:
+    """
+    Live gc-tracked objects per type name.
+
+    Args:
+        type_names: Only count these types (e.g. ["GeneratePlansRequest"])
+        limit: Number of most common types returned when type_names is empty
+    """
+    counts: Counter = Counter(type(obj).__name__ for obj in gc.get_objects())
+    if type_names:
+        return {name: counts.get(name, 0) for name in type_names}
+    return dict(counts.most_common(limit))
+
+
+def dump_tasks(stack_limit: int = 20) -> List[Dict[str, Any]]:
+    """Every task on the running loop with its coroutine and current stack"""
+    tasks = []
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        tasks.append({
+            "name": task.get_name(),
+            "coro": getattr(coro, "__qualname__", repr(coro)),
+            "done": task.done(),
+            "cancelling": task.cancelling(),
+            "stack": [_frame_label(frame) for frame in task.get_stack(limit=stack_limit)],
+        })
+    tasks.sort(key=lambda t: t["coro"])
+    return tasks
+
+
+heap_snapshots = HeapSnapshots()
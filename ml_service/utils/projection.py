@@ -0,0 +1,109 @@
+"""Field projection for JSONB plan reads, pushed down to Postgres operators"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_FIELDS = 25
+MAX_DEPTH = 4
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9_]+$")
+
+FieldTree = Dict[str, Any]
+
+
+def parse_fields(fields: Optional[str]) -> FieldTree:
+    """
+    Parse a comma-separated list of dotted paths into a projection tree.
+
+    Arrays are traversed implicitly, so ``meals.meal_name`` selects the name of
+    every meal. A path that stops at a key returns that whole sub-document.
+
+    Args:
+        fields: e.g. "meals.meal_name,meals.total_calories,daily_totals"
+
+    Returns:
+        Nested dict of keys; an empty dict means "everything below here"
+
+    Raises:
+        ValueError: If a path is malformed, too deep, or there are too many paths
+
+    Examples:
+        >>> parse_fields("meals.meal_name,daily_totals")
+        {'meals': {'meal_name': {}}, 'daily_totals': {}}
+    """
+    tree: FieldTree = {}
+    if not fields:
+        return tree
+
+    paths = [p.strip() for p in fields.split(",") if p.strip()]
+    if len(paths) > MAX_FIELDS:
+        raise ValueError(f"Too many fields requested (max {MAX_FIELDS})")
+
+    for path in paths:
+        keys = path.split(".")
+        if len(keys) > MAX_DEPTH:
+            raise ValueError(f"Field '{path}' is nested too deeply (max {MAX_DEPTH} levels)")
+        if not all(_KEY_RE.match(k) for k in keys):
+            raise ValueError(f"Invalid field '{path}'")
+
+        node = tree
+        for i, key in enumerate(keys):
+            if key in node and not node[key]:
+                # A shorter path already selects this whole sub-document
+                break
+            if i == len(keys) - 1:
+                node[key] = {}
+            else:
+                node = node.setdefault(key, {})
+
+    return tree
+
+
+def build_projection_sql(column: str, tree: FieldTree, param_offset: int = 0) -> Tuple[str, List[str]]:
+    """
+    Build a SQL expression that projects ``tree`` out of a JSONB column.
+
+    Keys are passed as bind parameters, never interpolated.
+
+    Args:
+        column: JSONB column (or expression) to project from
+        tree: Projection tree from parse_fields; empty returns the column unchanged
+        param_offset: Number of bind parameters already used by the query
+
+    Returns:
+        Tuple of (sql_expression, key_parameters)
+    """
+    if not tree:
+        return column, []
+
+    params: List[str] = []
+    index: Dict[str, int] = {}
+
+    def param(key: str) -> str:
+        if key not in index:
+            params.append(key)
+            index[key] = param_offset + len(params)
+        return f"${index[key]}::text"
+
+    def build_object(src: str, node: FieldTree, depth: int) -> str:
+        pairs = ", ".join(
+            f"{param(key)}, {build(f'({src} -> {param(key)})', sub, depth + 1)}"
+            for key, sub in node.items()
+        )
+        return f"jsonb_build_object({pairs})"
+
+    def build(src: str, node: FieldTree, depth: int, allow_array: bool = True) -> str:
+        if not node:
+            return src
+        sql = f"CASE jsonb_typeof({src}) WHEN 'object' THEN {build_object(src, node, depth)} "
+        if allow_array:
+            # Project each element; nested arrays of arrays are returned as-is
+            alias = f"e{depth}"
+            element = build(f"{alias}.value", node, depth + 1, allow_array=False)
+            sql += (
+                f"WHEN 'array' THEN (SELECT COALESCE(jsonb_agg({element}), '[]'::jsonb) "
+                f"FROM jsonb_array_elements({src}) AS {alias}(value)) "
+            )
+        return sql + f"ELSE {src} END"
+
+    return build(column, tree, 0), params
@@ -0,0 +1,78 @@
+"""SaaS metric derivations shared by the live-Stripe and mirror code paths"""
+
+from typing import Any, Dict
+
+
+def build_saas_metrics(agg: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Derive the admin SaaS metrics response from raw aggregates.
+
+    Args:
+        agg: Aggregates with keys mrr, all_earnings, earnings_this_month,
+            earnings_last_30, active_count, total_count, new_this_month,
+            new_last_30, churned_this_month, created_last_30, by_month,
+            recent_canceled, mrr_last_month, active_last_month,
+            churned_last_month
+
+    Returns:
+        Response dict for /api/admin/saas-metrics
+    """
+    mrr = agg["mrr"]
+    active_count = agg["active_count"]
+    total_count = agg["total_count"]
+    churned_this_month = agg["churned_this_month"]
+
+    # --- Conversion rates
+    conversion_rate = (agg["new_this_month"] / total_count * 100) if total_count > 0 else 0
+    created_last_30 = agg["created_last_30"]
+    conversion_rate_last_30 = (agg["new_last_30"] / created_last_30 * 100) if created_last_30 > 0 else 0
+
+    # --- LTV for current period
+    arpu = mrr / active_count if active_count > 0 else 0
+
+    if (active_count + churned_this_month) > 0:
+        churn_rate = churned_this_month / (active_count + churned_this_month)
+    else:
+        churn_rate = 0
+
+    ltv = arpu / churn_rate if churn_rate > 0 else arpu * 12  # fallback assumption
+
+    # --- Previous month's LTV
+    active_last_month = agg["active_last_month"]
+    churned_last_month = agg["churned_last_month"]
+    arpu_last_month = agg["mrr_last_month"] / active_last_month if active_last_month > 0 else 0
+
+    if (active_last_month + churned_last_month) > 0:
+        churn_rate_last_month = churned_last_month / (active_last_month + churned_last_month)
+    else:
+        churn_rate_last_month = 0
+
+    if churn_rate_last_month > 0:
+        ltv_last_month = arpu_last_month / churn_rate_last_month
+    else:
+        ltv_last_month = arpu_last_month * 12
+
+    # --- LTV Growth
+    if ltv_last_month > 0:
+        ltv_growth_percent = ((ltv - ltv_last_month) / ltv_last_month) * 100
+    else:
+        ltv_growth_percent = 0
+
+    return {
+        "mrr": mrr,
+        "totalEarnings": agg["all_earnings"],
+        "earningsThisMonth": agg["earnings_this_month"],
+        "earningsLast30Days": agg["earnings_last_30"],
+        "activeSubscribers": active_count,
+        "totalSubscribers": total_count,
+        "newSubsThisMonth": agg["new_this_month"],
+        "churnedThisMonth": churned_this_month,
+        "subscribersByMonth": agg["by_month"],
+        "recentCanceled": agg["recent_canceled"],
+        "conversionRate": conversion_rate,
+        "conversionRateLast30Days": conversion_rate_last_30,
+        "arpu": round(arpu, 2),
+        "churnRate": round(churn_rate * 100, 2),
+        "ltv": round(ltv, 2),
+        "ltvGrowth": round(ltv_growth_percent, 2),
+    }
@@ -0,0 +1,69 @@
+"""Fast JSON serialization helpers backed by orjson"""
+
+import hashlib
+from typing import Any, Union
+
+import orjson
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serialize an object to UTF-8 encoded JSON bytes.
+
+    Args:
+        obj: JSON-serializable object (dicts, lists, datetimes, UUIDs, ...)
+
+    Returns:
+        JSON document as bytes
+    """
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Serialize an object to a JSON string.
+
+    Args:
+        obj: JSON-serializable object
+
+    Returns:
+        JSON document as str
+    """
+    return dumps_bytes(obj).decode("utf-8")
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """
+    Parse a JSON document.
+
+    Args:
+        data: JSON text or UTF-8 bytes
+
+    Returns:
+        Parsed Python object
+
+    Raises:
+        orjson.JSONDecodeError: If the document is invalid (subclass of json.JSONDecodeError)
+    """
+    return orjson.loads(data)
+
+
+def encode_jsonb(obj: Any) -> bytes:
+    """Encode a value for the Postgres jsonb binary wire format (version byte + JSON)"""
+    return b"\x01" + dumps_bytes(obj)
+
+
+def decode_jsonb(data: bytes) -> Any:
+    """Decode a value from the Postgres jsonb binary wire format"""
+    return orjson.loads(data[1:])
+
+
+def content_hash(obj: Any) -> str:
+    """
+    Stable SHA-256 of an object's canonical JSON (sorted keys).
+
+    Equal plans hash equally regardless of key order, so the hash can be used
+    as a content address.
+    """
+    canonical = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(canonical).hexdigest()
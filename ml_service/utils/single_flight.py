@@ -0,0 +1,103 @@
+"""Keyed TTL cache whose concurrent misses share one load"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlightCache(Generic[K, V]):
+    """
+    Values kept for ttl_s, at most max_entries of them (least recently used go first).
+
+    Concurrent misses for one key share a single load. invalidate() drops a
+    key's entry and bumps its generation, so a load that was already running
+    is returned to its callers but not cached; clear() does the same for
+    every key. Values for which cache_if returns False are returned but never
+    stored (e.g. "not found", which nothing would invalidate later).
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int, cache_if: Optional[Callable[[V], bool]] = None):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.cache_if = cache_if
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+        self._generations: Dict[K, int] = {}
+        self._epoch = 0
+        self._inflight: Dict[K, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _version(self, key: K) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(key, 0)
+
+    def _store(self, key: K, value: V) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: K, load: Callable[[K], Awaitable[V]]) -> V:
+        """
+        Cached value for a key, loading it on a miss.
+
+        Args:
+            key: Cache key
+            load: Called with the key on a miss (once for all concurrent misses)
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.stats["hits"] += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        self.stats["misses"] += 1
+        inflight = self._inflight.get(key)
+        if inflight:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        version = self._version(key)
+        try:
+            value = await load(key)
+            if self.ttl_s > 0 and version == self._version(key) and (self.cache_if is None or self.cache_if(value)):
+                self._store(key, value)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn about it being unretrieved
+            raise
+        finally:
+            if not future.done():
+                future.cancel()  # loader was cancelled; waiters must not hang
+            del self._inflight[key]
+
+    def invalidate(self, key: K) -> None:
+        """Drop a key's entry and keep a load in progress from being cached"""
+        self.stats["invalidations"] += 1
+        self._entries.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if len(self._generations) > self.max_entries:
+            # Counters only matter while a load is in flight
+            self._generations = {k: g for k, g in self._generations.items() if k in self._inflight}
+
+    def clear(self) -> None:
+        """Drop every entry and keep every load in progress from being cached"""
+        self.stats["invalidations"] += 1
+        self._entries.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entry count and hit counters"""
+        return {"entries": len(self._entries), **self.stats}
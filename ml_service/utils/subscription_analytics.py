@@ -0,0 +1,272 @@
+"""
+Vectorized subscription analytics backed by pandas.
+
+Subscriptions and invoices are loaded once into dataframes; every metric is
+then a handful of column operations instead of a Python pass over all
+subscriptions with a datetime conversion per element.
+
+Subscription records are dicts (or tuples in SUBSCRIPTION_COLUMNS order) with
+unix-second timestamps; monthly_amount is the cents total of the
+subscription's monthly prices, the same basis as MRR elsewhere.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+ACTIVE_STATUSES = ("active", "trialing", "past_due")
+NEW_STATUSES = ("active", "trialing")
+UNKNOWN_PLAN = "Unknown Plan"
+
+SUBSCRIPTION_COLUMNS = [
+    "subscription_id",
+    "status",
+    "created",
+    "canceled_at",
+    "monthly_amount",
+    "price_id",
+    "plan",
+    "customer_email",
+]
+INVOICE_COLUMNS = ["created", "amount_paid"]
+
+
+def _column(rows: List[Any], key: Any) -> list:
+    return [r[key] for r in rows]
+
+
+def _epoch_column(values: list) -> pd.Series:
+    """Unix seconds (None allowed) -> UTC datetimes with NaT, via a typed int64 array"""
+    seconds = np.array([v or 0 for v in values], dtype=np.int64)
+    stamps = pd.to_datetime(seconds, unit="s", utc=True)
+    return pd.Series(stamps.where(seconds > 0))
+
+
+def subscriptions_frame(records: Iterable[Any]) -> pd.DataFrame:
+    """
+    Build the subscriptions dataframe.
+
+    Columns are extracted into typed arrays one at a time; row-wise DataFrame
+    construction from Python objects costs several times more.
+
+    Args:
+        records: Dicts or tuples with SUBSCRIPTION_COLUMNS fields
+
+    Returns:
+        DataFrame with UTC datetime columns and categorical status/plan
+    """
+    rows = list(records)
+    keys = SUBSCRIPTION_COLUMNS if rows and isinstance(rows[0], dict) else range(len(SUBSCRIPTION_COLUMNS))
+    key = dict(zip(SUBSCRIPTION_COLUMNS, keys))
+
+    plans = [p or UNKNOWN_PLAN for p in _column(rows, key["plan"])]
+    return pd.DataFrame({
+        "subscription_id": _column(rows, key["subscription_id"]),
+        "status": pd.Categorical(_column(rows, key["status"])),
+        "created": _epoch_column(_column(rows, key["created"])),
+        "canceled_at": _epoch_column(_column(rows, key["canceled_at"])),
+        "monthly_amount": np.array([a or 0 for a in _column(rows, key["monthly_amount"])], dtype=np.int64),
+        "price_id": _column(rows, key["price_id"]),
+        "plan": pd.Categorical(plans),
+        "customer_email": _column(rows, key["customer_email"]),
+    })
+
+
+def invoices_frame(records: Iterable[Any]) -> pd.DataFrame:
+    """Build the invoices dataframe from dicts or (created, amount_paid) tuples"""
+    rows = list(records)
+    if rows and isinstance(rows[0], dict):
+        rows = [(r["created"], r["amount_paid"] or 0) for r in rows]
+    values = np.array(rows, dtype=np.int64).reshape(-1, 2)
+    return pd.DataFrame({
+        "created": pd.to_datetime(values[:, 0], unit="s", utc=True),
+        "amount_paid": values[:, 1],
+    })
+
+
+def _month_index(values: pd.Series) -> pd.Series:
+    """Months since year 0 (NaN for NaT), for cheap month arithmetic"""
+    return values.dt.year * 12 + values.dt.month - 1
+
+
+def _month_label(index: int) -> str:
+    return f"{int(index) // 12:04d}-{int(index) % 12 + 1:02d}"
+
+
+def _counted(subs: pd.DataFrame) -> pd.DataFrame:
+    """Subscriptions that were ever paying: currently active-like, or canceled after being so"""
+    return subs[subs["status"].isin(ACTIVE_STATUSES) | (subs["status"] == "canceled")]
+
+
+def _ended_at(subs: pd.DataFrame) -> pd.Series:
+    """Cancellation time for canceled subscriptions; NaT for scheduled or no cancellation"""
+    return subs["canceled_at"].where(subs["status"] == "canceled")
+
+
+def compute_saas_aggregates(subs: pd.DataFrame, invoices: pd.DataFrame, now: datetime) -> Dict[str, Any]:
+    """
+    Inputs for build_saas_metrics, with the same definitions as the mirror.
+
+    "Last month" values are point-in-time as of 30 days ago: subscriptions
+    created before then that were paying and not yet canceled, and those
+    canceled in the 30 days before that. recent_canceled entries carry
+    price_id; the caller resolves plan names.
+    """
+    start_of_month = pd.Timestamp(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+    last_30 = pd.Timestamp(now - timedelta(days=30))
+    previous_window = last_30 - pd.Timedelta(days=30)
+
+    status = subs["status"]
+    created = subs["created"]
+    canceled_at = subs["canceled_at"]
+    amount = subs["monthly_amount"]
+
+    active = status.isin(ACTIVE_STATUSES)
+    new = status.isin(NEW_STATUSES)
+    since_month = created >= start_of_month
+    since_30 = created >= last_30
+    ended_by_last_30 = (status == "canceled") & (canceled_at < last_30)
+    counted = active | ((status == "canceled") & canceled_at.notna())
+    active_last_month = (created < last_30) & counted & ~ended_by_last_30
+
+    by_month = _month_index(created).value_counts().sort_index()
+
+    recent = subs.loc[status == "canceled", ["customer_email", "canceled_at", "price_id"]].head(20)
+    recent_canceled = [
+        {
+            "customer_email": email or "",
+            "canceled_at": int(ts.timestamp()) if not pd.isna(ts) else None,
+            "price_id": price_id,
+        }
+        for email, ts, price_id in recent.itertuples(index=False, name=None)
+    ]
+
+    invoice_created = invoices["created"]
+    paid = invoices["amount_paid"]
+
+    return {
+        "mrr": int(amount[active].sum()) / 100,
+        "all_earnings": int(paid.sum()) / 100,
+        "earnings_this_month": int(paid[invoice_created >= start_of_month].sum()) / 100,
+        "earnings_last_30": int(paid[invoice_created >= last_30].sum()) / 100,
+        "active_count": int(active.sum()),
+        "total_count": len(subs),
+        "new_this_month": int((since_month & new).sum()),
+        "new_last_30": int((since_30 & new).sum()),
+        "churned_this_month": int((canceled_at >= start_of_month).sum()),
+        "created_last_30": int(since_30.sum()),
+        "by_month": {_month_label(m): int(n) for m, n in by_month.items()},
+        "recent_canceled": recent_canceled,
+        "mrr_last_month": int(amount[active_last_month].sum()) / 100,
+        "active_last_month": int(active_last_month.sum()),
+        "churned_last_month": int(((canceled_at >= previous_window) & (canceled_at < last_30)).sum()),
+    }
+
+
+def cohort_retention(subs: pd.DataFrame, now: datetime, months: int = 12) -> List[Dict[str, Any]]:
+    """
+    Monthly signup cohorts and the share still subscribed after each month.
+
+    retention[k] is the fraction of the cohort not canceled by the end of its
+    k-th month (0 = signup month). Months that have not happened yet are omitted.
+
+    Args:
+        subs: Subscriptions dataframe
+        now: Reference time (current month is the last cohort)
+        months: Number of cohorts, and maximum offset, to report
+    """
+    counted = _counted(subs)
+    now_index = now.year * 12 + now.month - 1
+    cohort = _month_index(counted["created"]).to_numpy()
+    in_range = cohort >= now_index - months + 1
+    cohort = cohort[in_range]
+
+    # Whole months survived; canceled in the signup month -> 0, never canceled -> inf
+    lifetime = (_month_index(_ended_at(counted)).to_numpy()[in_range] - cohort)
+    lifetime = np.where(np.isnan(lifetime), np.inf, lifetime)
+
+    offsets = np.arange(months)
+    retained = lifetime[:, None] > offsets[None, :]
+
+    if not len(cohort):
+        return []
+
+    frame = pd.DataFrame(retained, columns=offsets)
+    frame["cohort"] = cohort.astype("int64")
+    grouped = frame.groupby("cohort")
+    sizes = grouped.size()
+    rates = grouped.sum().div(sizes, axis=0)
+
+    result = []
+    for cohort_index, row in rates.iterrows():
+        elapsed = now_index - int(cohort_index) + 1
+        result.append({
+            "cohort": _month_label(cohort_index),
+            "size": int(sizes[cohort_index]),
+            "retention": [round(float(r), 4) for r in row.to_numpy()[:elapsed]],
+        })
+    return result
+
+
+def revenue_by_plan(subs: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Active subscribers, MRR and ARPU per plan, highest MRR first"""
+    active = subs[subs["status"].isin(ACTIVE_STATUSES)]
+    grouped = active.groupby("plan", observed=True)["monthly_amount"].agg(["size", "sum"])
+    grouped = grouped.sort_values("sum", ascending=False)
+
+    return [
+        {
+            "plan": plan,
+            "subscribers": int(row["size"]),
+            "mrr": int(row["sum"]) / 100,
+            "arpu": round(int(row["sum"]) / 100 / int(row["size"]), 2),
+        }
+        for plan, row in grouped.iterrows()
+    ]
+
+
+def churn_curve(subs: pd.DataFrame, now: datetime, months: int = 12) -> List[Dict[str, Any]]:
+    """
+    Monthly churn: subscribers active at the start of each month, new and
+    churned during it, and churn rate (churned / active at start).
+
+    The current month is included and is partial.
+    """
+    counted = _counted(subs)
+    created = np.sort(counted["created"].to_numpy(dtype="datetime64[ns]"))
+    ended = np.sort(_ended_at(counted).dropna().to_numpy(dtype="datetime64[ns]"))
+
+    current = pd.Timestamp(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)).tz_localize(None)
+    starts = pd.date_range(end=current, periods=months, freq="MS")
+    bounds = starts.append(pd.DatetimeIndex([current + pd.offsets.MonthBegin(1)])).to_numpy(dtype="datetime64[ns]")
+
+    created_before = np.searchsorted(created, bounds, side="left")
+    ended_before = np.searchsorted(ended, bounds, side="left")
+
+    active_at_start = created_before[:-1] - ended_before[:-1]
+    new = np.diff(created_before)
+    churned = np.diff(ended_before)
+    rate = np.divide(churned, active_at_start, out=np.zeros(months), where=active_at_start > 0)
+
+    return [
+        {
+            "month": start.strftime("%Y-%m"),
+            "activeAtStart": int(a),
+            "new": int(n),
+            "churned": int(c),
+            "churnRate": round(float(r), 4),
+        }
+        for start, a, n, c, r in zip(starts, active_at_start, new, churned, rate)
+    ]
+
+
+def subscription_analytics(subs: pd.DataFrame, now: datetime, months: int = 12) -> Dict[str, Any]:
+    """Cohort retention, revenue by plan and churn curve in one response"""
+    return {
+        "cohorts": cohort_retention(subs, now, months),
+        "revenueByPlan": revenue_by_plan(subs),
+        "churnCurve": churn_curve(subs, now, months),
+    }
+
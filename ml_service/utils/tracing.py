@@ -0,0 +1,285 @@
+"""
+Lightweight request and generation tracing.
+
+A trace is a list of timed spans collected in a contextvar, so code deep in a
+call stack can open a span without passing anything around. Every finished
+span also feeds the trace_span_duration_seconds histogram, which is usually
+enough to find p99 contributors from /metrics alone. Sampled traces are
+exported in OTLP/JSON: appended to a file as one line per trace, and/or
+posted to an OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces).
+Export runs on a background thread; when its queue is full, traces are
+dropped rather than slowing requests down.
+"""
+
+import contextvars
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import settings
+from config.logging_config import log_context, logger
+from utils.metrics import registry
+from utils.serialization import dumps_bytes
+
+SPAN_DURATION = registry.histogram(
+    "trace_span_duration_seconds",
+    "Duration of traced phases by trace and span name",
+    ("trace", "span"),
+)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed phase of a trace"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans of one request or background job, rooted at a span named after the trace"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], sampled: bool):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.sampled = sampled
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = [self.root]
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: finished child spans, then the total so far"""
+        parts = [
+            f"{span.name.replace('.', '-')};dur={span.duration_ms:.1f}"
+            for span in self.spans[1:]
+            if span.end_ns is not None
+        ]
+        parts.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(parts)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Add attributes to the innermost open span (no-op outside a trace)"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a phase of the current trace.
+
+    Outside a trace this only costs a contextvar lookup.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else trace.root.span_id, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        SPAN_DURATION.observe(current.duration_ms / 1000, trace.name, name)
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """
+    Start a new trace in the current context (a request, or a background task).
+
+    Args:
+        name: Trace name, e.g. "generate.meal"; also the root span name
+        **attributes: Identifiers to attach, e.g. user_id, quiz_result_id
+    """
+    parent = _current_trace.get()
+    if parent is not None:
+        # Background work started from a request links back to it
+        attributes.setdefault("parent_trace_id", parent.trace_id)
+    trace = Trace(name, attributes, sampled=random.random() < settings.TRACE_SAMPLE_RATE)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(trace.root)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.root.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        trace.root.end_ns = time.time_ns()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        SPAN_DURATION.observe(trace.root.duration_ms / 1000, name, name)
+        if trace.sampled:
+            exporter.submit(trace)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    """OTLP/JSON ExportTraceServiceRequest for a batch of traces"""
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": item.span_id,
+                "name": item.name,
+                "kind": 2 if item is trace.root else 1,
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.end_ns or item.start_ns),
+                "attributes": _otlp_attributes(item.attributes),
+            }
+            if item.parent_id:
+                otlp_span["parentSpanId"] = item.parent_id
+            if "error" in item.attributes:
+                otlp_span["status"] = {"code": 2}
+            spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": settings.TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "ml_service"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Background-thread export of finished traces to a JSONL file and/or OTLP/HTTP collector"""
+
+    BATCH_SIZE = 64
+
+    def __init__(self, file_path: str, collector_url: str, max_queue: int):
+        self.file_path = file_path
+        self.collector_url = collector_url
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.collector_url)
+
+    def submit(self, trace: Trace) -> None:
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._export(batch)
+            except Exception as e:
+                logger.warning(f"Trace export failed ({len(batch)} traces): {e}")
+
+    def _export(self, batch: List[Trace]) -> None:
+        if self.file_path:
+            with open(self.file_path, "ab") as f:
+                for trace in batch:
+                    f.write(dumps_bytes(to_otlp([trace])) + b"\n")
+        if self.collector_url:
+            import httpx
+
+            httpx.post(
+                self.collector_url,
+                content=dumps_bytes(to_otlp(batch)),
+                headers={"Content-Type": "application/json"},
+                timeout=5.0
+            )
+
+
+exporter = TraceExporter(
+    file_path=settings.TRACE_EXPORT_FILE,
+    collector_url=settings.TRACE_COLLECTOR_URL,
+    max_queue=settings.TRACE_EXPORT_QUEUE_SIZE,
+)
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware: one trace per HTTP request, reported back in a
+    Server-Timing header (spans finished by the time the response starts).
+    Also scopes the request's log context (request_id).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Log records of this request carry its id: the caller's X-Request-ID, else the trace id
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:128]
+        if not settings.TRACING_ENABLED:
+            with log_context(request_id=request_id or uuid.uuid4().hex):
+                await self.app(scope, receive, send)
+            return
+
+        with start_trace("http", method=scope["method"], path=scope["path"]) as trace, \
+                log_context(request_id=request_id or trace.trace_id):
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    trace.root.attributes["status"] = message["status"]
+                    if settings.SERVER_TIMING_ENABLED:
+                        headers = list(message.get("headers", []))
+                        headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                        message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,43 @@
+-- =============================================
+-- Content-addressed plan storage
+-- Plan bodies are stored once, keyed by the SHA-256 of their canonical JSON.
+-- ai_meal_plans / ai_workout_plans point at a body via content_hash, and every
+-- change of pointer is recorded in plan_versions for rollback.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS plan_bodies (
+    content_hash TEXT NOT NULL,
+    plan_type TEXT NOT NULL CHECK (plan_type IN ('meal', 'workout')),
+    body JSONB NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (content_hash)
+);
+
+CREATE TABLE IF NOT EXISTS plan_versions (
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
+    plan_type TEXT NOT NULL CHECK (plan_type IN ('meal', 'workout')),
+    plan_id UUID NOT NULL,
+    user_id UUID NOT NULL,
+    version INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (id),
+    UNIQUE (plan_type, plan_id, version),
+    FOREIGN KEY (user_id) REFERENCES profiles(id),
+    FOREIGN KEY (content_hash) REFERENCES plan_bodies(content_hash)
+);
+
+ALTER TABLE ai_meal_plans ADD COLUMN IF NOT EXISTS content_hash TEXT REFERENCES plan_bodies(content_hash);
+ALTER TABLE ai_meal_plans ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 0;
+ALTER TABLE ai_workout_plans ADD COLUMN IF NOT EXISTS content_hash TEXT REFERENCES plan_bodies(content_hash);
+ALTER TABLE ai_workout_plans ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_plan_versions_plan ON plan_versions(plan_type, plan_id, version DESC);
+CREATE INDEX IF NOT EXISTS idx_plan_versions_user_id ON plan_versions(user_id);
+CREATE INDEX IF NOT EXISTS idx_ai_meal_plans_content_hash ON ai_meal_plans(content_hash);
+CREATE INDEX IF NOT EXISTS idx_ai_workout_plans_content_hash ON ai_workout_plans(content_hash);
+
+-- Service-only tables: no client policies
+ALTER TABLE plan_bodies ENABLE ROW LEVEL SECURITY;
+ALTER TABLE plan_versions ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,99 @@
+-- =============================================
+-- Local Stripe mirror
+-- Kept current by /api/stripe/webhook and a resumable backfill/reconcile job
+-- (ml_service/services/stripe_mirror.py). Admin endpoints read from here
+-- instead of paging through the Stripe API.
+-- source_ts is the Stripe event (or fetch) time of the row's data; older data
+-- never overwrites newer data.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS stripe_products (
+    id TEXT NOT NULL,
+    name TEXT,
+    active BOOLEAN DEFAULT true,
+    data JSONB NOT NULL,
+    source_ts BIGINT NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS stripe_prices (
+    id TEXT NOT NULL,
+    product_id TEXT,
+    nickname TEXT,
+    unit_amount BIGINT,
+    currency TEXT,
+    recurring_interval TEXT,
+    recurring_interval_count INTEGER,
+    active BOOLEAN DEFAULT true,
+    data JSONB NOT NULL,
+    source_ts BIGINT NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS stripe_subscriptions (
+    id TEXT NOT NULL,
+    customer_id TEXT,
+    customer_email TEXT,
+    status TEXT NOT NULL,
+    price_ids TEXT[] NOT NULL DEFAULT '{}',
+    items JSONB NOT NULL DEFAULT '[]',
+    monthly_amount BIGINT NOT NULL DEFAULT 0,
+    cancel_at_period_end BOOLEAN DEFAULT false,
+    created TIMESTAMPTZ NOT NULL,
+    canceled_at TIMESTAMPTZ,
+    current_period_end TIMESTAMPTZ,
+    data JSONB NOT NULL,
+    source_ts BIGINT NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS stripe_invoices (
+    id TEXT NOT NULL,
+    customer_id TEXT,
+    subscription_id TEXT,
+    status TEXT,
+    collection_method TEXT,
+    amount_due BIGINT,
+    amount_paid BIGINT NOT NULL DEFAULT 0,
+    currency TEXT,
+    created TIMESTAMPTZ NOT NULL,
+    period_start TIMESTAMPTZ,
+    period_end TIMESTAMPTZ,
+    hosted_invoice_url TEXT,
+    invoice_pdf TEXT,
+    data JSONB NOT NULL,
+    source_ts BIGINT NOT NULL DEFAULT 0,
+    synced_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (id)
+);
+
+-- Backfill/reconcile progress per resource; cursor is the last Stripe id written
+CREATE TABLE IF NOT EXISTS stripe_sync_state (
+    resource TEXT NOT NULL,
+    cursor TEXT,
+    run_started_at TIMESTAMPTZ,
+    last_completed_at TIMESTAMPTZ,
+    rows_synced BIGINT DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (resource)
+);
+
+CREATE INDEX IF NOT EXISTS idx_stripe_prices_product_id ON stripe_prices(product_id);
+CREATE INDEX IF NOT EXISTS idx_stripe_subscriptions_status ON stripe_subscriptions(status);
+CREATE INDEX IF NOT EXISTS idx_stripe_subscriptions_created ON stripe_subscriptions(created DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_stripe_subscriptions_canceled_at ON stripe_subscriptions(canceled_at);
+CREATE INDEX IF NOT EXISTS idx_stripe_subscriptions_customer_id ON stripe_subscriptions(customer_id);
+CREATE INDEX IF NOT EXISTS idx_stripe_subscriptions_price_ids ON stripe_subscriptions USING GIN (price_ids);
+CREATE INDEX IF NOT EXISTS idx_stripe_invoices_customer_created ON stripe_invoices(customer_id, created DESC);
+CREATE INDEX IF NOT EXISTS idx_stripe_invoices_subscription_id ON stripe_invoices(subscription_id);
+CREATE INDEX IF NOT EXISTS idx_stripe_invoices_created ON stripe_invoices(created);
+
+-- Service-only tables: no client policies
+ALTER TABLE stripe_products ENABLE ROW LEVEL SECURITY;
+ALTER TABLE stripe_prices ENABLE ROW LEVEL SECURITY;
+ALTER TABLE stripe_subscriptions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE stripe_invoices ENABLE ROW LEVEL SECURITY;
+ALTER TABLE stripe_sync_state ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,152 @@
+-- =============================================
+-- Daily SaaS metric snapshots
+-- One row per UTC day holding that day's changes (new/churned subscribers,
+-- active and MRR movements, invoice earnings). Rows are maintained by triggers
+-- on the Stripe mirror tables, so every webhook or backfill write updates them
+-- incrementally. Point-in-time values (active subscribers, MRR) are running
+-- sums over days, so metrics never rescan the subscription list.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS saas_metric_snapshots (
+    snapshot_date DATE NOT NULL,
+    subscriptions_created INTEGER NOT NULL DEFAULT 0,
+    new_subscribers INTEGER NOT NULL DEFAULT 0,
+    churned_subscribers INTEGER NOT NULL DEFAULT 0,
+    active_delta INTEGER NOT NULL DEFAULT 0,
+    mrr_delta_cents BIGINT NOT NULL DEFAULT 0,
+    earnings_cents BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (snapshot_date)
+);
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one subscription's contribution.
+-- A subscription counts as active with its MRR from the day it was created;
+-- once canceled it stops counting on the day of cancellation.
+CREATE OR REPLACE FUNCTION apply_subscription_to_snapshots(
+    p_status TEXT,
+    p_created TIMESTAMPTZ,
+    p_canceled_at TIMESTAMPTZ,
+    p_monthly_amount BIGINT,
+    p_sign INTEGER
+)
+RETURNS VOID AS $$
+DECLARE
+    counted BOOLEAN := p_status IN ('active', 'trialing', 'past_due')
+                       OR (p_status = 'canceled' AND p_canceled_at IS NOT NULL);
+BEGIN
+    INSERT INTO saas_metric_snapshots
+        (snapshot_date, subscriptions_created, new_subscribers, active_delta, mrr_delta_cents)
+    VALUES (
+        (p_created AT TIME ZONE 'UTC')::date,
+        p_sign,
+        CASE WHEN p_status IN ('active', 'trialing') THEN p_sign ELSE 0 END,
+        CASE WHEN counted THEN p_sign ELSE 0 END,
+        CASE WHEN counted THEN p_sign * p_monthly_amount ELSE 0 END
+    )
+    ON CONFLICT (snapshot_date) DO UPDATE SET
+        subscriptions_created = saas_metric_snapshots.subscriptions_created + EXCLUDED.subscriptions_created,
+        new_subscribers = saas_metric_snapshots.new_subscribers + EXCLUDED.new_subscribers,
+        active_delta = saas_metric_snapshots.active_delta + EXCLUDED.active_delta,
+        mrr_delta_cents = saas_metric_snapshots.mrr_delta_cents + EXCLUDED.mrr_delta_cents,
+        updated_at = now();
+
+    IF p_canceled_at IS NOT NULL THEN
+        INSERT INTO saas_metric_snapshots
+            (snapshot_date, churned_subscribers, active_delta, mrr_delta_cents)
+        VALUES (
+            (p_canceled_at AT TIME ZONE 'UTC')::date,
+            p_sign,
+            CASE WHEN counted AND p_status = 'canceled' THEN -p_sign ELSE 0 END,
+            CASE WHEN counted AND p_status = 'canceled' THEN -p_sign * p_monthly_amount ELSE 0 END
+        )
+        ON CONFLICT (snapshot_date) DO UPDATE SET
+            churned_subscribers = saas_metric_snapshots.churned_subscribers + EXCLUDED.churned_subscribers,
+            active_delta = saas_metric_snapshots.active_delta + EXCLUDED.active_delta,
+            mrr_delta_cents = saas_metric_snapshots.mrr_delta_cents + EXCLUDED.mrr_delta_cents,
+            updated_at = now();
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_invoice_to_snapshots(
+    p_created TIMESTAMPTZ,
+    p_amount_paid BIGINT,
+    p_sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO saas_metric_snapshots (snapshot_date, earnings_cents)
+    VALUES ((p_created AT TIME ZONE 'UTC')::date, p_sign * p_amount_paid)
+    ON CONFLICT (snapshot_date) DO UPDATE SET
+        earnings_cents = saas_metric_snapshots.earnings_cents + EXCLUDED.earnings_cents,
+        updated_at = now();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stripe_subscriptions_snapshot_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (OLD.status, OLD.created, OLD.canceled_at, OLD.monthly_amount)
+           IS NOT DISTINCT FROM (NEW.status, NEW.created, NEW.canceled_at, NEW.monthly_amount) THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_subscription_to_snapshots(OLD.status, OLD.created, OLD.canceled_at, OLD.monthly_amount, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_subscription_to_snapshots(NEW.status, NEW.created, NEW.canceled_at, NEW.monthly_amount, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION stripe_invoices_snapshot_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND (OLD.created, OLD.amount_paid) IS NOT DISTINCT FROM (NEW.created, NEW.amount_paid) THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_invoice_to_snapshots(OLD.created, OLD.amount_paid, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_invoice_to_snapshots(NEW.created, NEW.amount_paid, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute every snapshot row from the mirror (repair tool; not needed in normal operation)
+CREATE OR REPLACE FUNCTION rebuild_saas_metric_snapshots()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE saas_metric_snapshots IN EXCLUSIVE MODE;
+    DELETE FROM saas_metric_snapshots;
+    PERFORM apply_subscription_to_snapshots(status, created, canceled_at, monthly_amount, 1)
+    FROM stripe_subscriptions;
+    PERFORM apply_invoice_to_snapshots(created, amount_paid, 1)
+    FROM stripe_invoices;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_stripe_subscriptions_snapshots ON stripe_subscriptions;
+CREATE TRIGGER trigger_stripe_subscriptions_snapshots
+    AFTER INSERT OR UPDATE OR DELETE ON stripe_subscriptions
+    FOR EACH ROW
+    EXECUTE FUNCTION stripe_subscriptions_snapshot_trigger();
+
+DROP TRIGGER IF EXISTS trigger_stripe_invoices_snapshots ON stripe_invoices;
+CREATE TRIGGER trigger_stripe_invoices_snapshots
+    AFTER INSERT OR UPDATE OR DELETE ON stripe_invoices
+    FOR EACH ROW
+    EXECUTE FUNCTION stripe_invoices_snapshot_trigger();
+
+-- Seed from anything already mirrored
+SELECT rebuild_saas_metric_snapshots();
+
+-- Service-only table: no client policies
+ALTER TABLE saas_metric_snapshots ENABLE ROW LEVEL SECURITY;
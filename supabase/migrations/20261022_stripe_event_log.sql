@@ -0,0 +1,35 @@
+-- =============================================
+-- Stripe webhook event log
+-- /api/stripe/webhook stores each verified event here (idempotent on the
+-- Stripe event id) and acknowledges immediately. A background consumer
+-- (ml_service/services/stripe_events.py) processes events in Stripe creation
+-- order per customer, retrying failures with backoff.
+-- status: pending -> processing -> processed | failed (retry scheduled) | dead
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS stripe_events (
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    customer_id TEXT,
+    stripe_created BIGINT NOT NULL,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'processing', 'processed', 'failed', 'dead')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_at TIMESTAMPTZ,
+    last_error TEXT,
+    received_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    processed_at TIMESTAMPTZ,
+    PRIMARY KEY (id)
+);
+
+-- Work queue: only unfinished events, ordered per customer lane
+CREATE INDEX IF NOT EXISTS idx_stripe_events_queue
+    ON stripe_events ((COALESCE(customer_id, id)), stripe_created, received_at, id)
+    WHERE status IN ('pending', 'processing', 'failed');
+CREATE INDEX IF NOT EXISTS idx_stripe_events_customer_id ON stripe_events(customer_id, stripe_created);
+CREATE INDEX IF NOT EXISTS idx_stripe_events_received_at ON stripe_events(received_at);
+
+-- Service-only table: no client policies
+ALTER TABLE stripe_events ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,37 @@
+-- =============================================
+-- Entitlement change notifications
+-- The ML service caches each user's plan and AI generation usage
+-- (ml_service/services/entitlements.py). Any change to a profile's plan or
+-- usage counter, or to a plan's limits, is announced on the
+-- 'entitlements' channel so every service instance drops its cached copy.
+-- Payload: the profile id, or '*' when a plan definition changed.
+-- =============================================
+
+CREATE OR REPLACE FUNCTION notify_profile_entitlement_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('entitlements', NEW.id::text);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_plan_entitlement_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('entitlements', '*');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_profiles_entitlement_notify ON profiles;
+CREATE TRIGGER trg_profiles_entitlement_notify
+    AFTER UPDATE OF plan_id, ai_gen_quiz_count ON profiles
+    FOR EACH ROW
+    WHEN (OLD.plan_id IS DISTINCT FROM NEW.plan_id OR OLD.ai_gen_quiz_count IS DISTINCT FROM NEW.ai_gen_quiz_count)
+    EXECUTE FUNCTION notify_profile_entitlement_change();
+
+DROP TRIGGER IF EXISTS trg_plans_entitlement_notify ON plans;
+CREATE TRIGGER trg_plans_entitlement_notify
+    AFTER INSERT OR UPDATE OR DELETE ON plans
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_plan_entitlement_change();
@@ -0,0 +1,166 @@
+-- =============================================
+-- Running totals on SaaS metric snapshots
+-- Each daily row also carries active subscribers, MRR, subscriptions created
+-- and earnings accumulated through the end of that day, so current values are
+-- the latest row and "as of 30 days ago" values are the latest row before
+-- that date. Reads no longer sum the whole table.
+-- =============================================
+
+ALTER TABLE saas_metric_snapshots ADD COLUMN IF NOT EXISTS active_total INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE saas_metric_snapshots ADD COLUMN IF NOT EXISTS mrr_total_cents BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE saas_metric_snapshots ADD COLUMN IF NOT EXISTS created_total INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE saas_metric_snapshots ADD COLUMN IF NOT EXISTS earnings_total_cents BIGINT NOT NULL DEFAULT 0;
+
+-- Add deltas to one day's row and carry them into the running totals of that
+-- day and every later day. The new row's totals start from the previous day's,
+-- so writers are serialized with an advisory lock. rebuild_saas_metric_snapshots
+-- sets saas_snapshots.defer_totals and recomputes the totals once at the end.
+CREATE OR REPLACE FUNCTION add_to_saas_snapshot(
+    p_date DATE,
+    p_created INTEGER,
+    p_new INTEGER,
+    p_churned INTEGER,
+    p_active INTEGER,
+    p_mrr BIGINT,
+    p_earnings BIGINT
+)
+RETURNS VOID AS $$
+DECLARE
+    defer_totals BOOLEAN := COALESCE(current_setting('saas_snapshots.defer_totals', true), '') = 'on';
+BEGIN
+    IF NOT defer_totals THEN
+        PERFORM pg_advisory_xact_lock(hashtext('saas_metric_snapshots'));
+    END IF;
+
+    INSERT INTO saas_metric_snapshots (
+        snapshot_date, subscriptions_created, new_subscribers, churned_subscribers,
+        active_delta, mrr_delta_cents, earnings_cents,
+        active_total, mrr_total_cents, created_total, earnings_total_cents
+    )
+    SELECT
+        p_date, p_created, p_new, p_churned, p_active, p_mrr, p_earnings,
+        COALESCE(prev.active_total, 0) + p_active,
+        COALESCE(prev.mrr_total_cents, 0) + p_mrr,
+        COALESCE(prev.created_total, 0) + p_created,
+        COALESCE(prev.earnings_total_cents, 0) + p_earnings
+    FROM (SELECT 1) AS one
+    LEFT JOIN LATERAL (
+        SELECT active_total, mrr_total_cents, created_total, earnings_total_cents
+        FROM saas_metric_snapshots
+        WHERE snapshot_date < p_date AND NOT defer_totals
+        ORDER BY snapshot_date DESC
+        LIMIT 1
+    ) AS prev ON true
+    ON CONFLICT (snapshot_date) DO UPDATE SET
+        subscriptions_created = saas_metric_snapshots.subscriptions_created + EXCLUDED.subscriptions_created,
+        new_subscribers = saas_metric_snapshots.new_subscribers + EXCLUDED.new_subscribers,
+        churned_subscribers = saas_metric_snapshots.churned_subscribers + EXCLUDED.churned_subscribers,
+        active_delta = saas_metric_snapshots.active_delta + EXCLUDED.active_delta,
+        mrr_delta_cents = saas_metric_snapshots.mrr_delta_cents + EXCLUDED.mrr_delta_cents,
+        earnings_cents = saas_metric_snapshots.earnings_cents + EXCLUDED.earnings_cents,
+        active_total = saas_metric_snapshots.active_total + EXCLUDED.active_delta,
+        mrr_total_cents = saas_metric_snapshots.mrr_total_cents + EXCLUDED.mrr_delta_cents,
+        created_total = saas_metric_snapshots.created_total + EXCLUDED.subscriptions_created,
+        earnings_total_cents = saas_metric_snapshots.earnings_total_cents + EXCLUDED.earnings_cents,
+        updated_at = now();
+
+    -- Webhooks mostly write today's row, so this usually touches nothing
+    IF NOT defer_totals AND (p_active <> 0 OR p_mrr <> 0 OR p_created <> 0 OR p_earnings <> 0) THEN
+        UPDATE saas_metric_snapshots SET
+            active_total = active_total + p_active,
+            mrr_total_cents = mrr_total_cents + p_mrr,
+            created_total = created_total + p_created,
+            earnings_total_cents = earnings_total_cents + p_earnings
+        WHERE snapshot_date > p_date;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Same contribution rules as before (see 20261021_saas_metric_snapshots.sql)
+CREATE OR REPLACE FUNCTION apply_subscription_to_snapshots(
+    p_status TEXT,
+    p_created TIMESTAMPTZ,
+    p_canceled_at TIMESTAMPTZ,
+    p_monthly_amount BIGINT,
+    p_sign INTEGER
+)
+RETURNS VOID AS $$
+DECLARE
+    counted BOOLEAN := p_status IN ('active', 'trialing', 'past_due')
+                       OR (p_status = 'canceled' AND p_canceled_at IS NOT NULL);
+BEGIN
+    PERFORM add_to_saas_snapshot(
+        (p_created AT TIME ZONE 'UTC')::date,
+        p_sign,
+        CASE WHEN p_status IN ('active', 'trialing') THEN p_sign ELSE 0 END,
+        0,
+        CASE WHEN counted THEN p_sign ELSE 0 END,
+        CASE WHEN counted THEN p_sign * p_monthly_amount ELSE 0 END,
+        0
+    );
+
+    IF p_canceled_at IS NOT NULL THEN
+        PERFORM add_to_saas_snapshot(
+            (p_canceled_at AT TIME ZONE 'UTC')::date,
+            0,
+            0,
+            p_sign,
+            CASE WHEN counted AND p_status = 'canceled' THEN -p_sign ELSE 0 END,
+            CASE WHEN counted AND p_status = 'canceled' THEN -p_sign * p_monthly_amount ELSE 0 END,
+            0
+        );
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION apply_invoice_to_snapshots(
+    p_created TIMESTAMPTZ,
+    p_amount_paid BIGINT,
+    p_sign INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    PERFORM add_to_saas_snapshot((p_created AT TIME ZONE 'UTC')::date, 0, 0, 0, 0, 0, p_sign * p_amount_paid);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Running totals from the per-day deltas in one pass
+CREATE OR REPLACE FUNCTION recompute_saas_running_totals()
+RETURNS VOID AS $$
+BEGIN
+    UPDATE saas_metric_snapshots s SET
+        active_total = t.active_total,
+        mrr_total_cents = t.mrr_total_cents,
+        created_total = t.created_total,
+        earnings_total_cents = t.earnings_total_cents
+    FROM (
+        SELECT
+            snapshot_date,
+            SUM(active_delta) OVER w AS active_total,
+            SUM(mrr_delta_cents) OVER w AS mrr_total_cents,
+            SUM(subscriptions_created) OVER w AS created_total,
+            SUM(earnings_cents) OVER w AS earnings_total_cents
+        FROM saas_metric_snapshots
+        WINDOW w AS (ORDER BY snapshot_date)
+    ) t
+    WHERE t.snapshot_date = s.snapshot_date;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rebuild_saas_metric_snapshots()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE saas_metric_snapshots IN EXCLUSIVE MODE;
+    PERFORM set_config('saas_snapshots.defer_totals', 'on', true);
+    DELETE FROM saas_metric_snapshots;
+    PERFORM apply_subscription_to_snapshots(status, created, canceled_at, monthly_amount, 1)
+    FROM stripe_subscriptions;
+    PERFORM apply_invoice_to_snapshots(created, amount_paid, 1)
+    FROM stripe_invoices;
+    PERFORM set_config('saas_snapshots.defer_totals', 'off', true);
+    PERFORM recompute_saas_running_totals();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Seed totals for rows written before this migration
+SELECT recompute_saas_running_totals();